@@ -0,0 +1,69 @@
+""" Benchmark matching installed packages against requirements files.
+
+Usage: python -m benchmarks.bench_compare [num_packages] [num_files]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from pipwrap.requirement import parse
+from pipwrap.api import Project, RequirementsFile
+from pipwrap.index import InstalledIndex
+
+
+def _synthetic_installed(num_packages):
+    lines = ['package-%d==1.%d' % (i, i) for i in range(num_packages)]
+    lines.extend('-e http://example.com/repo-%d.git' % i for i in range(num_packages // 100))
+    return set(parse('\n'.join(lines)))
+
+
+def _synthetic_requirement_files(num_packages, num_files):
+    req_files = {}
+    for file_number in range(num_files):
+        lines = ['Package_%d' % i for i in range(file_number, num_packages, num_files)]
+        req_file = RequirementsFile()
+        req_file.packages = set(parse('\n'.join(lines)))
+        req_files['file-%d.txt' % file_number] = req_file
+    return req_files
+
+
+def _naive_compare(installed_set, requirement_files):
+    missing_set = installed_set.copy()
+    for req_file in requirement_files.values():
+        for requirement in req_file.packages:
+            for installed in installed_set:
+                if ((installed.name and installed.name.lower() == requirement.name.lower()) or
+                        installed.line == requirement.line):
+                    req_file.found.add(requirement.line)
+                    missing_set.discard(installed)
+                    break
+    return requirement_files, missing_set
+
+
+def _time(function, *args):
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def main(num_packages=10000, num_files=15):
+    installed = _synthetic_installed(num_packages)
+    req_files = _synthetic_requirement_files(num_packages, num_files)
+    project = Project('requirements')
+
+    indexed = _time(lambda: project.compare(InstalledIndex(installed), req_files))
+    print('indexed: %d packages, %d files: %.4fs' % (num_packages, num_files, indexed))
+
+    # The naive scan is quadratic, so only compare against it on a sample
+    sample_size = min(num_packages, 2000)
+    sample_installed = _synthetic_installed(sample_size)
+    sample_files = _synthetic_requirement_files(sample_size, num_files)
+    naive = _time(_naive_compare, sample_installed, sample_files)
+    indexed = _time(lambda: project.compare(
+        InstalledIndex(sample_installed), sample_files))
+    print('naive vs indexed (%d packages): %.4fs vs %.4fs' % (sample_size, naive, indexed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,94 @@
+""" Measure peak memory of reading a generated constraints file, streamed as pipwrap does and,
+for comparison, read into memory whole before parsing, and of finding installed packages.
+
+With the same number of packages, streaming peaks at about the same memory however many
+--hash lines each requirement has, while reading whole files grows with the file size. Peak
+memory per installed package stays the same as the number of packages grows.
+
+Usage: python -m benchmarks.bench_memory [--packages 20000] [--hashes 0,10,40]
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from pipwrap.api import Environment
+from pipwrap.parsing import read_requirements_file
+from pipwrap.requirement import parse
+from .synthetic import create_site_packages
+
+
+def write_constraints_file(filename, num_packages, hashes_per_package):
+    """ Write a pip-compile style constraints file, with --hash continuation lines
+    :return: Size of the file in bytes
+    """
+    with open(filename, 'w') as output:
+        for i in range(num_packages):
+            output.write('package-%d==1.%d' % (i, i % 50))
+            for j in range(hashes_per_package):
+                output.write(' \\\n    --hash=sha256:%064x' % (i * 1000 + j))
+            output.write('\n')
+    return os.path.getsize(filename)
+
+
+def _peak(function):
+    """ Run a function under tracemalloc
+    :return: Peak memory allocated while it ran, in bytes
+    """
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Keep the result alive until the peak is measured
+    del result
+    return peak
+
+
+def _read_whole(filename):
+    with io.open(filename, 'rb') as requirements_file:
+        content = requirements_file.read().decode('utf-8')
+    lines = content.splitlines(True)
+    return lines, set(parse(content, filename))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--packages', type=int, default=20000)
+    parser.add_argument('--hashes', default='0,10,40',
+                        help='Comma-separated numbers of --hash lines per requirement')
+    args = parser.parse_args(argv)
+
+    base_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(base_dir, 'constraints.txt')
+        print('%-24s %12s %14s %14s' % ('Constraints file', 'size (KiB)', 'streamed (KiB)',
+                                        'whole (KiB)'))
+        for hashes in [int(value) for value in args.hashes.split(',')]:
+            size = write_constraints_file(filename, args.packages, hashes)
+            streamed = _peak(lambda: read_requirements_file(filename))
+            whole = _peak(lambda: _read_whole(filename))
+            label = '%d packages x %d hashes' % (args.packages, hashes)
+            print('%-24s %12d %14d %14d' % (label, size // 1024, streamed // 1024,
+                                            whole // 1024))
+
+        print('\n%-24s %12s %14s' % ('Installed packages', 'peak (KiB)', 'per package (B)'))
+        for num_packages in (args.packages // 4, args.packages // 2, args.packages):
+            site_packages = os.path.join(base_dir, 'site-packages-%d' % num_packages)
+            create_site_packages(site_packages, num_packages)
+            peak = _peak(lambda: Environment(paths=[site_packages]).installed_index)
+            print('%-24s %12d %14d' % ('%d installed' % num_packages, peak // 1024,
+                                       peak // num_packages))
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
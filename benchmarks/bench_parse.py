@@ -0,0 +1,55 @@
+""" Benchmark parsing requirements, against requirements-parser if it is installed.
+
+Usage: python -m benchmarks.bench_parse [num_lines] [repeat]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from pipwrap.requirement import parse
+
+
+def _synthetic_requirements(num_lines):
+    lines = ['# Generated requirements', '-r common.txt']
+    for i in range(num_lines):
+        kind = i % 20
+        if kind == 0:
+            lines.append('-e git+https://example.com/repo-%d.git@%040x#egg=package-%d' % (i, i, i))
+        elif kind == 1:
+            lines.append('package_%d[extra]>=1.0,<2.0  # pinned below 2' % i)
+        else:
+            lines.append('package-%d==1.%d' % (i, i % 50))
+    return '\n'.join(lines) + '\n'
+
+
+def _time(function, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function(text)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    num_lines = int(argv[0]) if argv else 20000
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    text = _synthetic_requirements(num_lines)
+
+    seconds = _time(lambda text: list(parse(text)), text, repeat)
+    print('pipwrap: %d lines: %.4fs' % (num_lines, seconds))
+    try:
+        import requirements
+    except ImportError:
+        print('requirements-parser is not installed; skipping comparison')
+        return 0
+    other = _time(lambda text: list(requirements.parse(text)), text, repeat)
+    print('requirements-parser: %d lines: %.4fs (%.1fx)' % (num_lines, other, other / seconds))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+""" Benchmark each phase of lint, -r and -x against synthetic environments, and compare the
+results with an earlier run to catch regressions.
+
+Usage: python -m benchmarks.bench_phases [--sizes 100,1000,20000] [--output results.json]
+                                         [--baseline results.json]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from pipwrap.api import Environment, Project
+from pipwrap.rules import PlacementRules
+from .synthetic import create_requirements_tree, create_site_packages
+
+
+PHASES = ('discovery', 'parsing', 'comparison', 'dependencies', 'writing')
+
+# Differences smaller than this are noise, whatever the relative change
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _time(function):
+    start = time.time()
+    result = function()
+    return time.time() - start, result
+
+
+def run_phases(site_packages, requirements_dir):
+    """ Time each phase once, from a cold start
+    :return: Dictionary, keyed by phase, of seconds
+    """
+    timings = {}
+    environment = Environment(paths=[site_packages])
+    project = Project(requirements_dir)
+
+    timings['discovery'], _ = _time(lambda: environment.installed_index)
+    timings['parsing'], _ = _time(lambda: project.req_files)
+    timings['comparison'], _ = _time(lambda: (list(project.iter_discrepancies(environment)),
+                                              project.find_include_problems()))
+    timings['dependencies'], _ = _time(lambda: project.removal_plan(environment))
+    # Writing rewrites every file, since generate pins each requirement to its installed version
+    timings['writing'], _ = _time(lambda: project.generate(
+        environment, PlacementRules(default='env-0.txt'), clean=True))
+    return timings
+
+
+def benchmark(size, num_files, depth, repeat):
+    """ Benchmark one environment size, keeping the fastest of several runs of each phase
+    :return: Dictionary, keyed by phase, of seconds
+    """
+    best = {}
+    for _ in range(repeat):
+        base_dir = tempfile.mkdtemp()
+        try:
+            site_packages = os.path.join(base_dir, 'site-packages')
+            requirements_dir = os.path.join(base_dir, 'requirements')
+            packages = create_site_packages(site_packages, size)
+            create_requirements_tree(requirements_dir, packages, num_files, depth)
+            for phase, seconds in run_phases(site_packages, requirements_dir).items():
+                best[phase] = min(seconds, best.get(phase, seconds))
+        finally:
+            shutil.rmtree(base_dir, ignore_errors=True)
+    return best
+
+
+def find_regressions(results, baseline, tolerance):
+    """ Compare results with a baseline run
+    :return: List of (size, phase, baseline seconds, seconds) that got slower than tolerance
+    """
+    previous = dict(((result['size'], result['phase']), result['seconds'])
+                    for result in baseline['results'])
+    regressions = []
+    for result in results['results']:
+        old = previous.get((result['size'], result['phase']))
+        if old is None:
+            continue
+        if (result['seconds'] > old * (1 + tolerance) and
+                result['seconds'] - old > MIN_REGRESSION_SECONDS):
+            regressions.append((result['size'], result['phase'], old, result['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark pipwrap phases.')
+    parser.add_argument('--sizes', default='100,1000,5000,20000',
+                        help='Comma-separated numbers of installed packages.')
+    parser.add_argument('--files', type=int, default=15, help='Requirements files per tree.')
+    parser.add_argument('--depth', type=int, default=5, help='Length of the -r include chain.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per size; the fastest time of each phase is kept.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    parser.add_argument('--baseline', help='Results of an earlier run to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Relative slowdown reported as a regression (default: 0.25).')
+    args = parser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'files': args.files,
+        'depth': args.depth,
+        'results': [],
+    }
+    print('%8s  %s' % ('packages', '  '.join('%12s' % phase for phase in PHASES)))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        timings = benchmark(size, args.files, args.depth, args.repeat)
+        print('%8d  %s' % (size, '  '.join('%11.4fs' % timings[phase] for phase in PHASES)))
+        for phase in PHASES:
+            results['results'].append({'size': size, 'phase': phase,
+                                       'seconds': timings[phase]})
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for size, phase, old, new in regressions:
+            print('REGRESSION: %s with %d packages: %.4fs -> %.4fs' % (phase, size, old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+""" Generate synthetic virtualenvs and requirements trees for benchmarks. """
+import json
+import os
+import random
+
+
+def _write(path, content):
+    with open(path, 'w') as output:
+        output.write(content)
+
+
+def create_site_packages(site_packages, num_packages, vcs_fraction=0.02, editable_fraction=0.01,
+                         max_dependencies=3, seed=0):
+    """ Create fake installed distributions, as pip would leave them in site-packages
+    :param site_packages: Directory to create the distributions in
+    :param num_packages: Number of distributions
+    :param vcs_fraction: Fraction installed from VCS, with a PEP 610 direct_url.json
+    :param editable_fraction: Fraction installed in development mode, with an .egg-link
+    :param max_dependencies: Maximum Requires-Dist entries per distribution, each on a
+        distribution created earlier so the dependency graph is acyclic
+    :param seed: Random seed, so the same arguments always create the same environment
+    :return: List of (name, version, freeze line) of the distributions
+    """
+    generator = random.Random(seed)
+    if not os.path.exists(site_packages):
+        os.makedirs(site_packages)
+    packages = []
+    for i in range(num_packages):
+        name = 'package-%d' % i
+        version = '1.%d' % (i % 50)
+        kind = generator.random()
+        if kind < editable_fraction:
+            project_dir = os.path.join(site_packages, 'src', name)
+            _write(os.path.join(site_packages, '%s.egg-link' % name), '%s\n.\n' % project_dir)
+            packages.append((name, version, '-e %s#egg=%s' % (project_dir, name)))
+            continue
+
+        dist_info = os.path.join(site_packages, '%s-%s.dist-info' % (name.replace('-', '_'),
+                                                                     version))
+        os.makedirs(dist_info)
+        lines = ['Metadata-Version: 2.1', 'Name: %s' % name, 'Version: %s' % version]
+        if i:
+            for _ in range(generator.randint(0, max_dependencies)):
+                lines.append('Requires-Dist: package-%d' % generator.randrange(i))
+        _write(os.path.join(dist_info, 'METADATA'), '\n'.join(lines) + '\n\nDescription\n')
+
+        line = '%s==%s' % (name, version)
+        if kind < editable_fraction + vcs_fraction:
+            url = 'https://example.com/%s.git' % name
+            commit_id = '%040x' % i
+            _write(os.path.join(dist_info, 'direct_url.json'),
+                   json.dumps({'url': url, 'vcs_info': {'vcs': 'git', 'commit_id': commit_id}}))
+            line = 'git+%s@%s#egg=%s' % (url, commit_id, name)
+        packages.append((name, version, line))
+    return packages
+
+
+def create_requirements_tree(requirements_dir, packages, num_files=15, depth=5,
+                             missing_fraction=0.02, seed=0):
+    """ Create requirements files listing installed packages. The first depth files form a
+        chain, each including the previous one with -r, and every other file includes the end
+        of the chain, so resolving environments exercises deep nesting.
+    :param requirements_dir: Directory to create the files in
+    :param packages: Installed packages, as returned by create_site_packages
+    :param num_files: Number of requirements files
+    :param depth: Length of the chain of -r includes
+    :param missing_fraction: Fraction of extra requirements that are not installed
+    :param seed: Random seed
+    :return: Sorted list of filenames
+    """
+    generator = random.Random(seed)
+    if not os.path.exists(requirements_dir):
+        os.makedirs(requirements_dir)
+    filenames = ['env-%d.txt' % i for i in range(num_files)]
+    contents = dict((filename, []) for filename in filenames)
+    chain_end = filenames[min(depth, num_files) - 1]
+    for i, filename in enumerate(filenames):
+        if 0 < i < depth:
+            contents[filename].append('-r %s' % filenames[i - 1])
+        elif i >= depth:
+            contents[filename].append('-r %s' % chain_end)
+
+    for i, (name, version, line) in enumerate(packages):
+        filename = filenames[i % num_files]
+        if line.startswith('-e ') or line.startswith('git+'):
+            contents[filename].append(line)
+        else:
+            # Mix of spellings and specifiers, as in hand-maintained files
+            contents[filename].append(generator.choice([
+                name, name.replace('-', '_'), '%s==%s' % (name, version), '%s>=1.0' % name,
+            ]))
+    for i in range(int(len(packages) * missing_fraction)):
+        contents[filenames[i % num_files]].append('not-installed-%d' % i)
+
+    for filename in filenames:
+        _write(os.path.join(requirements_dir, filename), '\n'.join(contents[filename]) + '\n')
+    return filenames
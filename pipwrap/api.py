@@ -0,0 +1,958 @@
+import copy
+import os
+import sys
+
+from . import discovery
+from .cache import fingerprint_environment
+from .graph import DependencyGraph
+from .includes import IncludeGraph
+from .index import InstalledIndex, requirement_key
+from .markers import MarkerEvaluator, get_marker_environment
+from .parsing import RequirementsFile, read_requirements_file
+from .profiling import NULL_PROFILER
+from .requirement import Requirement, parse
+from .rules import PlacementRules
+from .versions import VersionChecker
+from .wheelhouse import get_supported_tags
+from .writing import write_atomic
+
+
+DEFAULT_REQUIREMENTS_FILE = 'requirements.txt'
+PARALLEL_WRITE_THRESHOLD = 4
+WRITE_THREADS = 8
+
+
+def get_key(requirement):
+    return requirement.name or requirement.path or requirement.uri
+
+
+def get_package_text(package):
+    package_text = package.name
+    if not package_text:
+        package_text = package.line
+    return package_text
+
+
+def get_installed_version(package):
+    for spec in package.specs:
+        if spec[0] == '==':
+            return spec[1]
+    return None
+
+
+def format_requirements_line(package):
+    if package.uri or package.path:
+        text = package.line
+    else:
+        specs = ['%s%s' % (spec[0], spec[1]) for spec in package.specs]
+        text = '%s%s' % (package.name, ','.join(specs))
+        if package.markers:
+            text = '%s; %s' % (text, package.markers)
+    return '%s\n' % text
+
+
+def render_requirements_file(req_file, clean=False):
+    """ Render a requirements file
+    :param req_file: RequirementsFile
+    :param clean: If True, only write packages found installed
+    :return: Content of the requirements file
+    """
+    lines = list(req_file.included_files)
+    for package in sorted(req_file.packages, key=get_key):
+        # If clean isn't specified, write all packages originally in requirements
+        if not clean or package.line in req_file.found:
+            lines.append(format_requirements_line(package))
+    return ''.join(lines)
+
+
+def render_lockfile(root, packages, hashes=None):
+    """ Render a lock file, pinning every package to its installed version
+    :param root: Filename of the environment's requirements file
+    :param packages: Installed packages, sorted
+    :param hashes: Optional dictionary, keyed by requirement key, of lists of archive hashes.
+        pip requires a hash for every package once any has one, so every package must have one.
+    :return: Content of the lock file
+    :raises: ValueError if hashes are given but some packages have none
+    """
+    if hashes is not None:
+        unhashed = [get_package_text(package) for package in packages
+                    if not hashes.get(requirement_key(package))]
+        if unhashed:
+            raise ValueError('no hashes for %s' % ', '.join(unhashed))
+    lines = ['# Locked from %s by pipwrap\n' % root]
+    for package in packages:
+        line = format_requirements_line(package)
+        for file_hash in (hashes or {}).get(requirement_key(package), []):
+            line = '%s \\\n    --hash=%s\n' % (line.rstrip('\n'), file_hash)
+        lines.append(line)
+    return ''.join(lines)
+
+
+def _copy_requirements_files(req_files):
+    """ Copy requirements files deeply enough that updating them leaves the originals intact """
+    copies = {}
+    for filename, req_file in req_files.items():
+        req_file_copy = RequirementsFile()
+        req_file_copy.included_files = list(req_file.included_files)
+        req_file_copy.packages = set(copy.copy(package) for package in req_file.packages)
+        copies[filename] = req_file_copy
+    return copies
+
+
+class Environment(object):
+    """ Packages installed in one virtualenv. Installed packages and their dependency graph are
+        found once and reused until refresh() is called.
+
+        By default packages are discovered from the target interpreter, but any source can be
+        injected: installed may be an iterable of pip freeze style lines or parsed requirements,
+        or a callable returning one. The dependencies of injected packages are unknown unless a
+        DependencyGraph is passed as dependency_graph; the graph is never read from this host.
+
+        Environment markers on requirements are evaluated against the target interpreter, with
+        any variables in markers overriding its values, e.g. {'sys_platform': 'win32'}.
+    """
+
+    def __init__(self, python=None, paths=None, discovery='metadata', cache=None,
+                 installed=None, dependency_graph=None, profiler=NULL_PROFILER, markers=None):
+        self.python = python
+        self.paths = paths
+        self.discovery = discovery
+        self.cache = cache
+        self.profiler = profiler
+        self.marker_overrides = markers or {}
+        self._installed = installed
+        self._injected_graph = dependency_graph
+        # Shared with the views returned by with_markers, so the interpreter is only asked once
+        self._interpreter_markers = {}
+        self._marker_environment = None
+        self._markers = None
+        self._supported_tags = None
+        self.refresh()
+
+    def refresh(self):
+        """ Forget installed packages, so they are found again on next use """
+        self._search_paths = None
+        self._installed_index = None
+        self._dependency_graph = self._injected_graph
+
+    @property
+    def marker_environment(self):
+        """ Dictionary of the PEP 508 marker variables of the target interpreter, with overrides
+        """
+        if self._marker_environment is None:
+            if not self._interpreter_markers:
+                self._interpreter_markers.update(get_marker_environment(self.python))
+            self._marker_environment = dict(self._interpreter_markers, **self.marker_overrides)
+        return self._marker_environment
+
+    @property
+    def markers(self):
+        """ MarkerEvaluator for the marker environment """
+        if self._markers is None:
+            self._markers = MarkerEvaluator(lambda: self.marker_environment)
+        return self._markers
+
+    @property
+    def supported_tags(self):
+        """ Set of the wheel tags the target interpreter can install """
+        if self._supported_tags is None:
+            self._supported_tags = frozenset(get_supported_tags(self.python))
+        return self._supported_tags
+
+    def with_markers(self, markers):
+        """ Get a view of the same installed packages under other marker variables, e.g. to
+            check requirements for several platforms without discovering packages again
+        :param markers: Dictionary of marker variables overriding the target interpreter's
+        :return: Environment
+        """
+        self.installed_index
+        environment = copy.copy(self)
+        environment.marker_overrides = dict(self.marker_overrides, **markers)
+        environment._marker_environment = None
+        environment._markers = None
+        environment._dependency_graph = self._injected_graph
+        return environment
+
+    @property
+    def search_paths(self):
+        if self._search_paths is None:
+            if self.paths is not None:
+                self._search_paths = self.paths
+            else:
+                self._search_paths = discovery.get_search_paths(self.python)
+        return self._search_paths
+
+    def _discover(self, paths=None):
+        if self.discovery == 'freeze':
+            return discovery.iter_freeze(self.python)
+        return discovery.scan_installed(self.search_paths if paths is None else paths)
+
+    def _iter_discovered(self):
+        """ Find installed packages using the selected discovery backend, through the cache.
+            Without a cache, lines are passed on as the backend finds them.
+        :return: Iterable of pip freeze style lines
+        """
+        if self.cache is None:
+            return self._discover()
+        paths = self.search_paths
+        key = fingerprint_environment(paths, self.discovery, self.python or sys.executable,
+                                      os.environ.get('PATH', ''))
+        installed = self.cache.get(key)
+        if installed is not None:
+            return installed.splitlines()
+        lines = list(self._discover(paths))
+        self.cache.set(key, '\n'.join(lines))
+        return lines
+
+    def _iter_installed_packages(self):
+        installed = self._installed
+        if installed is None:
+            # Each line is parsed as soon as it is found, so only the parsed packages are kept
+            return parse(self._iter_discovered())
+        if callable(installed):
+            installed = installed()
+        return (package if hasattr(package, 'line') else Requirement.parse(package.strip())
+                for package in installed)
+
+    @property
+    def installed_index(self):
+        """ InstalledIndex of installed packages """
+        if self._installed_index is None:
+            with self.profiler.phase('discovery'):
+                self._installed_index = InstalledIndex(self._iter_installed_packages())
+            self.profiler.count('installed packages', len(self._installed_index))
+        return self._installed_index
+
+    @property
+    def dependency_graph(self):
+        """ DependencyGraph of installed distributions """
+        if self._dependency_graph is None:
+            if self._installed is not None:
+                self._dependency_graph = DependencyGraph(self.markers)
+                return self._dependency_graph
+            with self.profiler.phase('dependency graph'):
+                self._dependency_graph = DependencyGraph.from_paths(self.search_paths,
+                                                                    self.markers)
+        return self._dependency_graph
+
+    def get_pip_command(self):
+        """ Get the command running pip for the target interpreter. Without one, this is the
+            interpreter running pipwrap, whose packages are the ones inspected, rather than
+            whichever pip comes first on PATH.
+        :return: List of arguments
+        """
+        return [self.python or sys.executable, '-m', 'pip']
+
+    def uninstall(self, package_names, batch_size=50):
+        """ Uninstall packages with pip, several per pip invocation
+        :param package_names: Names of the packages to uninstall
+        :param batch_size: Maximum number of packages per pip invocation
+        """
+        import subprocess
+        for start in range(0, len(package_names), batch_size):
+            args = self.get_pip_command() + [
+                "uninstall",
+                "-y",
+            ]
+            args.extend(package_names[start:start + batch_size])
+            with self.profiler.phase('uninstall'):
+                subprocess.check_call(args)
+        self.refresh()
+
+
+class LintResult(object):
+    """ Discrepancies between requirements files and an environment """
+
+    def __init__(self, discrepancies, problems, environments):
+        self.discrepancies = discrepancies
+        self.problems = problems
+        self.environments = environments
+
+    def of_kind(self, kind):
+        return [record for record in self.discrepancies if record['kind'] == kind]
+
+    @property
+    def ok(self):
+        return not self.discrepancies and not self.problems
+
+
+class LintDiff(object):
+    """ Discrepancies and include problems introduced (new) or resolved by changes to
+        requirements files since a git revision
+    """
+
+    def __init__(self, ref, changed, new, resolved):
+        self.ref = ref
+        self.changed = changed
+        self.new = new
+        self.resolved = resolved
+
+    @property
+    def ok(self):
+        return not self.new
+
+
+class WheelhouseCheck(object):
+    """ Requirements that cannot be installed from a wheelhouse: missing ones, with no wheel of
+        a version they allow, and incompatible ones, whose wheels are all for other platforms
+    """
+
+    def __init__(self, records, wheels):
+        self.records = records
+        self.wheels = wheels
+
+    def of_kind(self, kind):
+        return [record for record in self.records if record['kind'] == kind]
+
+    @property
+    def ok(self):
+        return not self.records
+
+
+class GenerateResult(object):
+    """ Changes made (or, if unplaced is not empty, that would be made) to requirements files """
+
+    def __init__(self):
+        self.req_files = {}
+        self.added = {}
+        self.dependencies = {}
+        self.omitted = {}
+        self.redundant = {}
+        self.unplaced = []
+        self.written = []
+
+
+class RemovalPlan(object):
+    """ Installed packages missing from requirements files """
+
+    def __init__(self, remove, kept):
+        self.remove = remove
+        self.kept = kept
+
+    @property
+    def package_names(self):
+        return [package.name for package in sorted(self.remove, key=requirement_key)
+                if package.name]
+
+    @property
+    def unnamed(self):
+        return [package for package in sorted(self.remove, key=requirement_key)
+                if not package.name]
+
+
+class Project(object):
+    """ Requirements files in one requirements directory. Files are parsed once and reused by
+        every lint, generate and removal plan until reload() is called, so one Project can be
+        checked against many environments cheaply. Nothing is printed, and nothing is written
+        except by generate().
+
+        By default every file in the directory is a requirements file. To read only some of
+        them, e.g. requirements*.txt next to other project files, pass their names in filenames.
+    """
+
+    def __init__(self, requirements_dir, cache=None, req_files=None, profiler=NULL_PROFILER,
+                 filenames=None):
+        self.requirements_dir = requirements_dir
+        self.filenames = filenames
+        self.cache = cache
+        self.profiler = profiler
+        self.version_checker = VersionChecker()
+        self._injected_req_files = req_files
+        self.reload()
+
+    def reload(self):
+        """ Forget parsed requirements files, so they are read again on next use """
+        self._req_files = self._injected_req_files
+        self._include_graph = None
+
+    @property
+    def req_files(self):
+        """ Dictionary, keyed by filename, of RequirementsFile """
+        if self._req_files is None:
+            self._req_files = self._read_requirements_files()
+        return self._req_files
+
+    def _read_requirements_files(self):
+        req_files = {}
+        if not os.path.isdir(self.requirements_dir):
+            return req_files
+        filenames = self.filenames
+        if filenames is None:
+            filenames = os.listdir(self.requirements_dir)
+        for req_filename in filenames:
+            # Skip hidden files, including temporary files from interrupted writes
+            if req_filename.startswith('.'):
+                continue
+            req_files[req_filename] = read_requirements_file(
+                os.path.join(self.requirements_dir, req_filename), self.cache, self.profiler)
+        return req_files
+
+    @property
+    def include_graph(self):
+        """ IncludeGraph of the requirements files """
+        if self._include_graph is None:
+            self._include_graph = IncludeGraph(self.requirements_dir, self.req_files)
+        return self._include_graph
+
+    def _format_specs(self, package):
+        if not package.specs:
+            return None
+        return ','.join('%s%s' % (spec[0], spec[1]) for spec in package.specs)
+
+    def iter_discrepancies(self, environment):
+        """ Compare installed packages and requirements, without updating requirements.
+            Requirements whose markers exclude the environment are not reported as missing.
+        :param environment: Environment to compare against
+        :return: Generator of discrepancy records, as dictionaries
+        """
+        installed_index = environment.installed_index
+        req_files = self.req_files
+        constraint_files = self.include_graph.constraint_files()
+        matched = set()
+        for req_filename in sorted(req_files):
+            for record in self._iter_file_discrepancies(
+                    req_filename, req_files[req_filename], environment,
+                    set() if req_filename in constraint_files else matched,
+                    req_filename in constraint_files):
+                yield record
+        for installed in sorted(installed_index.packages - matched, key=requirement_key):
+            yield self._extra_record(installed)
+
+    def _iter_file_discrepancies(self, req_filename, req_file, environment, matched,
+                                 constraints=False):
+        """ Compare the requirements of one file with installed packages
+        :param req_filename: Name of the requirements file
+        :param req_file: RequirementsFile
+        :param environment: Environment to compare against
+        :param matched: Set the installed packages required by the file are added to
+        :param constraints: If True, the file is only included with -c, so packages that are
+            not installed are not missing
+        :return: Generator of missing and version-mismatch records
+        """
+        installed_index = environment.installed_index
+        markers = environment.markers
+        self.profiler.count('comparisons', len(req_file.packages))
+        for requirement in sorted(req_file.packages, key=requirement_key):
+            installed = installed_index.find(requirement)
+            if not markers.applies(requirement.markers):
+                self.profiler.count('excluded by markers')
+                if installed is not None:
+                    matched.add(installed)
+                continue
+            if installed is None:
+                if constraints:
+                    continue
+                yield {
+                    'kind': 'missing',
+                    'package': get_package_text(requirement),
+                    'file': req_filename,
+                    'installed_version': None,
+                    'required_spec': self._format_specs(requirement),
+                }
+                continue
+            matched.add(installed)
+            required_spec = self._format_specs(requirement)
+            installed_version = get_installed_version(installed)
+            if (required_spec and installed_version and
+                    self.version_checker.satisfies(installed_version, required_spec) is False):
+                yield {
+                    'kind': 'version-mismatch',
+                    'package': get_package_text(requirement),
+                    'file': req_filename,
+                    'installed_version': installed_version,
+                    'required_spec': required_spec,
+                }
+
+    def _extra_record(self, installed):
+        return {
+            'kind': 'extra',
+            'package': get_package_text(installed),
+            'file': None,
+            'installed_version': get_installed_version(installed),
+            'required_spec': None,
+        }
+
+    def find_include_problems(self):
+        """ Find missing included files, include cycles, and packages listed more than once in
+            an environment
+        :return: List of (filename, problem description)
+        """
+        with self.profiler.phase('includes'):
+            return self._find_include_problems(self.include_graph)
+
+    def _find_include_problems(self, include_graph):
+        include_graph.environments()
+        problems = []
+        for filename in sorted(include_graph.missing):
+            for path in include_graph.missing[filename]:
+                problems.append((filename, 'included file %s not found' % path))
+        for cycle in include_graph.cycles:
+            problems.append((cycle[0], 'include cycle %s' % ' -> '.join(cycle)))
+        for filename in include_graph.roots():
+            for key, filenames in include_graph.duplicates(filename):
+                problems.append((filename, '%s listed in %s' % (key, ', '.join(filenames))))
+        return problems
+
+    def lint(self, environment):
+        """ Find discrepancies between the requirements files and an environment
+        :param environment: Environment to compare against
+        :return: LintResult
+        """
+        # Read files and find installed packages first, so that matching is timed on its own
+        self.req_files
+        environment.installed_index
+        with self.profiler.phase('matching'):
+            discrepancies = list(self.iter_discrepancies(environment))
+        return LintResult(discrepancies, self.find_include_problems(),
+                          self.include_graph.environments())
+
+    def _is_requirements_filename(self, filename):
+        if filename.startswith('.'):
+            return False
+        return self.filenames is None or filename in self.filenames
+
+    def _read_base_files(self, ref):
+        """ Find the requirements files changed since a git revision, and read their earlier
+            versions
+        :param ref: Git revision
+        :return: Tuple of (changed, base_files): the status of each changed file, keyed by
+            filename, and a dictionary of RequirementsFile of those that existed at ref
+        :raises: GitError
+        """
+        from . import git
+        with self.profiler.phase('git'):
+            commit = git.resolve_commit(self.requirements_dir, ref)
+            changed = dict((filename, status) for filename, status
+                           in git.changed_files(self.requirements_dir, commit).items()
+                           if self._is_requirements_filename(filename))
+            contents = git.read_files(self.requirements_dir, commit,
+                                      sorted(filename for filename, status in changed.items()
+                                             if status != 'A'))
+        base_files = {}
+        for filename in sorted(contents):
+            base_files[filename] = read_requirements_file(
+                os.path.join(self.requirements_dir, filename), self.cache, self.profiler,
+                data=contents[filename])
+        return changed, base_files
+
+    def _lint_changed_files(self, environment, req_files, changed, candidates):
+        """ Find the discrepancies and include problems of one version of the requirements files
+            that changes to some of them could have caused
+        :param environment: Environment to compare against
+        :param req_files: Dictionary, keyed by filename, of RequirementsFile
+        :param changed: Names of the changed files
+        :param candidates: Installed packages required by any version of the changed files,
+            i.e. those that can have become extra or stopped being extra
+        :return: List of records
+        """
+        records = []
+        include_graph = IncludeGraph(self.requirements_dir, req_files)
+        constraint_files = include_graph.constraint_files()
+        with self.profiler.phase('matching'):
+            for req_filename in sorted(changed):
+                if req_filename in req_files:
+                    records.extend(self._iter_file_discrepancies(
+                        req_filename, req_files[req_filename], environment, set(),
+                        req_filename in constraint_files))
+            installed_index = environment.installed_index
+            matched = set()
+            for req_filename, req_file in req_files.items():
+                if req_filename in constraint_files:
+                    continue
+                for requirement in req_file.packages:
+                    installed = installed_index.find(requirement)
+                    if installed in candidates:
+                        matched.add(installed)
+            for installed in sorted(candidates - matched, key=requirement_key):
+                records.append(self._extra_record(installed))
+        with self.profiler.phase('includes'):
+            for filename, problem in self._find_include_problems(include_graph):
+                records.append({'kind': 'include', 'file': filename, 'message': problem})
+        return records
+
+    def lint_since(self, environment, ref):
+        """ Find the discrepancies and include problems that changes to the requirements files
+            since a git revision introduced or resolved. Only the requirements in changed files
+            are compared with the environment, and only changed files are read from git;
+            unchanged files are shared between both versions.
+        :param environment: Environment to compare against
+        :param ref: Git revision, e.g. 'origin/master'
+        :return: LintDiff
+        :raises: GitError if the requirements directory is not in a git work tree or ref does
+            not exist
+        """
+        changed, base_files = self._read_base_files(ref)
+        if not changed:
+            return LintDiff(ref, changed, [], [])
+        head_files = self.req_files
+        for filename in head_files:
+            if filename not in changed:
+                base_files[filename] = head_files[filename]
+
+        installed_index = environment.installed_index
+        candidates = set()
+        for req_files in (base_files, head_files):
+            for filename in changed:
+                if filename in req_files:
+                    for requirement in req_files[filename].packages:
+                        installed = installed_index.find(requirement)
+                        if installed is not None:
+                            candidates.add(installed)
+
+        base_records = self._lint_changed_files(environment, base_files, changed, candidates)
+        head_records = self._lint_changed_files(environment, head_files, changed, candidates)
+        base_keys = set(tuple(sorted(record.items())) for record in base_records)
+        head_keys = set(tuple(sorted(record.items())) for record in head_records)
+        new = [record for record in head_records
+               if tuple(sorted(record.items())) not in base_keys]
+        resolved = [record for record in base_records
+                    if tuple(sorted(record.items())) not in head_keys]
+        return LintDiff(ref, changed, new, resolved)
+
+    def _check_wheels(self, requirement, wheelhouse, environment):
+        """ Find the wheels a requirement could be installed from
+        :param requirement: Named requirement
+        :param wheelhouse: WheelhouseIndex
+        :param environment: Environment whose interpreter the wheels must support
+        :return: Tuple of (kind, available): None and the compatible wheels, 'missing' and the
+            versions of the project's wheels, or 'incompatible' and the filenames of the wheels
+            of allowed versions
+        """
+        required_spec = self._format_specs(requirement)
+        wheels = wheelhouse.find(requirement.name)
+        allowed = [wheel for wheel in wheels if not required_spec or
+                   self.version_checker.satisfies(wheel[0], required_spec) is not False]
+        if not allowed:
+            return 'missing', sorted(set(wheel[0] for wheel in wheels))
+        supported_tags = environment.supported_tags
+        compatible = [wheel for wheel in allowed if not supported_tags.isdisjoint(wheel[2])]
+        if not compatible:
+            return 'incompatible', [wheel[1] for wheel in allowed]
+        return None, [wheel[1] for wheel in compatible]
+
+    def check_wheelhouse(self, environment, wheelhouse):
+        """ Check that every requirement can be installed from a wheelhouse without network
+            access, by the target interpreter of an environment. Requirements whose markers
+            exclude the environment are skipped, as are VCS, URL and path requirements, which
+            are not installed from the wheelhouse. Each distinct requirement is only checked
+            once, however many files list it. Packages in files only included with -c are only
+            checked if a requirements file also lists them.
+        :param environment: Environment to check for; installed packages are not needed
+        :param wheelhouse: WheelhouseIndex of the available wheels
+        :return: WheelhouseCheck
+        """
+        markers = environment.markers
+        req_files = self.req_files
+        constraint_files = self.include_graph.constraint_files()
+        required = set(requirement_key(requirement)
+                       for req_filename in req_files if req_filename not in constraint_files
+                       for requirement in req_files[req_filename].packages)
+        checked = {}
+        records = []
+        with self.profiler.phase('matching'):
+            for req_filename in sorted(req_files):
+                self.profiler.count('comparisons', len(req_files[req_filename].packages))
+                for requirement in sorted(req_files[req_filename].packages, key=requirement_key):
+                    if (not requirement.name or requirement.editable or requirement.uri or
+                            requirement.path or not markers.applies(requirement.markers)):
+                        continue
+                    if (req_filename in constraint_files and
+                            requirement_key(requirement) not in required):
+                        continue
+                    required_spec = self._format_specs(requirement)
+                    key = (requirement_key(requirement), required_spec)
+                    if key not in checked:
+                        checked[key] = self._check_wheels(requirement, wheelhouse, environment)
+                    kind, available = checked[key]
+                    if kind is not None:
+                        records.append({
+                            'kind': kind,
+                            'package': get_package_text(requirement),
+                            'file': req_filename,
+                            'required_spec': required_spec,
+                            'available': available,
+                        })
+        return WheelhouseCheck(records, len(wheelhouse))
+
+    def iter_locked(self, environment):
+        """ Pin the effective requirements of each environment, and everything they depend on,
+            to the versions installed, one environment at a time
+        :param environment: Environment to take installed versions from
+        :return: Generator of (root filename, installed packages sorted by requirement key,
+            requirements that are not installed)
+        """
+        installed_index = environment.installed_index
+        markers = environment.markers
+        graph = environment.dependency_graph
+        include_graph = self.include_graph
+        for root in include_graph.roots():
+            effective = include_graph.resolve(root)
+            locked = {}
+            missing = []
+            roots = []
+            for key in sorted(effective):
+                requirement = effective[key][0][1]
+                if not markers.applies(requirement.markers):
+                    continue
+                installed = installed_index.find(requirement)
+                if installed is None:
+                    missing.append(requirement)
+                    continue
+                locked[requirement_key(installed)] = installed
+                if installed.name:
+                    roots.append((requirement_key(installed), requirement.extras))
+            for key in graph.reachable(roots):
+                installed = installed_index.by_name.get(key)
+                if installed is not None:
+                    locked.setdefault(key, installed)
+            yield root, [locked[key] for key in sorted(locked)], missing
+
+    def compare(self, installed_index, req_files, markers=None):
+        """ Updates required versions to installed versions, and finds all installed packages
+            that are not in requirements
+        :param installed_index: InstalledIndex of installed packages
+        :param req_files: Dictionary of required packages, keyed by filename
+        :param markers: Optional MarkerEvaluator. Requirements whose markers exclude the
+            environment are kept as they are, and count as found.
+        :return: Tuple of (updated_installed_set, installed_not_in_requirements). Packages in
+            files only included with -c are pinned to installed versions and always kept, but
+            do not count as required.
+        """
+        with self.profiler.phase('matching'):
+            return self._compare(installed_index, req_files, markers)
+
+    def _compare(self, installed_index, req_files, markers):
+        missing_set = installed_index.packages.copy()
+        constraint_files = IncludeGraph(self.requirements_dir, req_files).constraint_files()
+        for req_filename in req_files:
+            req_file = req_files[req_filename]
+            self.profiler.count('comparisons', len(req_file.packages))
+            for requirement in req_file.packages:
+                installed = installed_index.find(requirement)
+                if req_filename in constraint_files:
+                    req_file.found.add(requirement.line)
+                    if installed is not None:
+                        requirement.specs = installed.specs
+                    continue
+                if markers is not None and not markers.applies(requirement.markers):
+                    req_file.found.add(requirement.line)
+                    missing_set.discard(installed)
+                    continue
+                if installed is not None:
+                    req_file.found.add(requirement.line)
+                    requirement.specs = installed.specs
+                    missing_set.discard(installed)
+        return req_files, missing_set
+
+    def _get_roots(self, installed_index, packages):
+        """ Get the installed distributions a set of requirements refers to
+        :param installed_index: InstalledIndex of installed packages
+        :param packages: Iterable of requirements
+        :return: List of (canonical name, extras) of installed distributions
+        """
+        roots = []
+        for requirement in packages:
+            installed = installed_index.find(requirement)
+            if installed is not None and installed.name:
+                roots.append((requirement_key(installed), requirement.extras))
+        return roots
+
+    def _place_dependencies(self, graph, installed_index, req_files, packages):
+        """ Find the requirements file for each package that a required package depends on. If
+            packages in several files depend on it, choose the file that the others include.
+        :param graph: DependencyGraph of installed distributions
+        :param installed_index: InstalledIndex of installed packages
+        :param req_files: Dictionary of required packages, keyed by filename
+        :param packages: Installed packages that are not in requirements files
+        :return: Dictionary, keyed by package, of (filename, name of top-level required package)
+        """
+        include_graph = IncludeGraph(self.requirements_dir, req_files)
+        constraint_files = include_graph.constraint_files()
+        reachable = {}
+        for req_filename in req_files:
+            if req_filename in constraint_files:
+                continue
+            roots = self._get_roots(installed_index, req_files[req_filename].packages)
+            reachable[req_filename] = graph.reachable(roots)
+
+        placement = {}
+        for package in packages:
+            if not package.name:
+                continue
+            key = requirement_key(package)
+            candidates = [req_filename for req_filename in sorted(reachable)
+                          if key in reachable[req_filename]]
+            for candidate in candidates:
+                if all(candidate in include_graph.closure(other) for other in candidates):
+                    parents = reachable[candidate]
+                    parent = parents[key]
+                    while parents[parent] is not None:
+                        parent = parents[parent]
+                    placement[package] = (candidate, parent)
+                    break
+        return placement
+
+    def _find_redundant_requirements(self, graph, installed_index, req_file):
+        """ Find requirements that other requirements in the same file already depend on
+        :param graph: DependencyGraph of installed distributions
+        :param installed_index: InstalledIndex of installed packages
+        :param req_file: RequirementsFile
+        :return: Dictionary, keyed by requirement, of the name of a package depending on it
+        """
+        listed = {}
+        for requirement in req_file.packages:
+            installed = installed_index.find(requirement)
+            if installed is not None and installed.name:
+                listed[requirement_key(installed)] = requirement
+        redundant = {}
+        # Check one at a time, so that packages depending on each other are not all removed
+        for key in sorted(listed):
+            others = [(other, listed[other].extras) for other in listed
+                      if other != key and listed[other] not in redundant]
+            parents = graph.dependencies_of(others)
+            if key in parents:
+                redundant[listed[key]] = parents[key]
+        return redundant
+
+    def generate(self, environment, placement_rules=None, clean=False,
+                 ignore_dependencies=False, omit_dependencies=False, choose_file=None):
+        """ Create or update requirements files from the packages installed in an environment.
+            Packages are placed with the packages that depend on them, then by placement rules,
+            then by choose_file. If any package remains unplaced, nothing is written.
+        :param environment: Environment to take installed packages from
+        :param placement_rules: PlacementRules for packages missing from requirements files
+        :param clean: If True, remove packages that are not installed
+        :param ignore_dependencies: If True, place dependencies like any other package
+        :param omit_dependencies: If True, leave dependencies out (and remove them with clean)
+        :param choose_file: Optional callable taking a package and a sorted list of filenames,
+            returning the filename the package should go into
+        :return: GenerateResult
+        """
+        if placement_rules is None:
+            placement_rules = PlacementRules()
+        installed_index = environment.installed_index
+        req_files, missing_reqs = self.compare(installed_index,
+                                               _copy_requirements_files(self.req_files),
+                                               environment.markers)
+
+        result = GenerateResult()
+        result.req_files = req_files
+
+        graph = None
+        dependency_placement = {}
+        if not ignore_dependencies:
+            graph = environment.dependency_graph
+            dependency_placement = self._place_dependencies(graph, installed_index, req_files,
+                                                            missing_reqs)
+
+        # New packages are requirements, so they never go into files only included with -c
+        constraint_files = IncludeGraph(self.requirements_dir, req_files).constraint_files()
+        filename_list = sorted(set(req_files) - constraint_files)
+        if len(filename_list) < 1:
+            req_files[DEFAULT_REQUIREMENTS_FILE] = RequirementsFile()
+            filename_list.append(DEFAULT_REQUIREMENTS_FILE)
+
+        # Add missing requirements to the file of the package that depends on them, or the file
+        # chosen by placement rules, or by the caller
+        for requirement in sorted(missing_reqs, key=requirement_key):
+            if requirement in dependency_placement:
+                filename, parent = dependency_placement[requirement]
+                if omit_dependencies:
+                    result.omitted[requirement] = parent
+                    continue
+                result.dependencies[requirement] = (filename, parent)
+            else:
+                filename = placement_rules.match(requirement)
+            if filename is None and choose_file is not None:
+                filename = choose_file(requirement, filename_list)
+            if filename is None:
+                result.unplaced.append(requirement)
+                continue
+            req_file = req_files.setdefault(filename, RequirementsFile())
+            req_file.found.add(requirement.line)
+            req_file.packages.add(requirement)
+            result.added.setdefault(filename, []).append(requirement)
+
+        if result.unplaced:
+            return result
+
+        if graph is not None and clean and omit_dependencies:
+            for req_filename in sorted(req_files):
+                req_file = req_files[req_filename]
+                redundant = self._find_redundant_requirements(graph, installed_index, req_file)
+                for requirement in redundant:
+                    result.redundant[req_filename, requirement] = redundant[requirement]
+                    req_file.found.discard(requirement.line)
+
+        result.written = self._write_requirements_files(req_files, clean)
+
+        if clean:
+            for req_file in req_files.values():
+                req_file.packages = set(package for package in req_file.packages
+                                        if package.line in req_file.found)
+        self.reload()
+        return result
+
+    def write_requirements_file(self, filename, content):
+        """ Write one requirements file, leaving it untouched if its content is unchanged
+        :return: True if the file changed
+        """
+        return write_atomic(os.path.join(self.requirements_dir, filename), content)
+
+    def _write_requirements_files(self, req_files, clean):
+        """ Write requirements files, in parallel if there are many of them
+        :param req_files: Dictionary of required packages, keyed by filename
+        :param clean: If True, only write packages found installed
+        :return: Sorted list of filenames that changed
+        """
+        if not os.path.exists(self.requirements_dir):
+            os.makedirs(self.requirements_dir)
+        filenames = sorted(req_files)
+
+        def write(filename):
+            content = render_requirements_file(req_files[filename], clean)
+            with self.profiler.phase('writing'):
+                return self.write_requirements_file(filename, content)
+
+        if len(filenames) > PARALLEL_WRITE_THRESHOLD:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(len(filenames), WRITE_THREADS))
+            try:
+                written = pool.map(write, filenames)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            written = [write(filename) for filename in filenames]
+        return [filename for filename, changed in zip(filenames, written) if changed]
+
+    def removal_plan(self, environment, ignore_dependencies=False):
+        """ Determine which installed packages missing from requirements files can be removed,
+            keeping those that required packages depend on
+        :param environment: Environment to remove packages from
+        :param ignore_dependencies: If True, also remove packages required packages depend on
+        :return: RemovalPlan
+        """
+        installed_index = environment.installed_index
+        req_files = _copy_requirements_files(self.req_files)
+
+        constraint_files = IncludeGraph(self.requirements_dir, req_files).constraint_files()
+        roots = []
+        for req_filename, req_file in req_files.items():
+            if req_filename not in constraint_files:
+                roots.extend(self._get_roots(installed_index, req_file.packages))
+
+        req_files, extra_set = self.compare(installed_index, req_files, environment.markers)
+        if ignore_dependencies:
+            return RemovalPlan(extra_set, {})
+
+        parents = environment.dependency_graph.reachable(roots)
+        removal_set = set()
+        kept = {}
+        for package in extra_set:
+            key = requirement_key(package)
+            if package.name and key in parents:
+                kept[package] = parents[key]
+            else:
+                removal_set.add(package)
+        return RemovalPlan(removal_set, kept)
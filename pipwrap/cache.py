@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+
+from .discovery import is_distribution_entry
+from .writing import write_atomic
+
+
+DEFAULT_MAX_ENTRIES = 32
+
+
+def get_default_cache_dir():
+    """ Get the default cache directory, following the XDG base directory convention
+    :return: Path to the pipwrap cache directory
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'pipwrap')
+
+
+def fingerprint_environment(paths, *extra):
+    """ Cheaply fingerprint installed distributions, without reading any metadata
+    :param paths: Directories searched for installed distributions
+    :param extra: Additional values that identify the environment, e.g. the interpreter path
+    :return: Hex digest that changes whenever a distribution is added, removed or reinstalled
+    """
+    digest = hashlib.sha1()
+    for value in extra:
+        digest.update(('%s\n' % value).encode('utf-8'))
+    for path in paths:
+        try:
+            entries = sorted(os.listdir(path))
+        except OSError:
+            continue
+        digest.update(('%s\n' % path).encode('utf-8'))
+        for entry in entries:
+            if not is_distribution_entry(entry):
+                continue
+            try:
+                stat = os.stat(os.path.join(path, entry))
+            except OSError:
+                continue
+            digest.update(('%s %d %r\n' % (entry, stat.st_ino, stat.st_mtime)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Cache(object):
+    """ Directory of text entries keyed by digest, evicting least recently used entries once
+        there are more than max_entries.
+    """
+
+    def __init__(self, cache_dir, namespace, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = os.path.join(cache_dir, namespace)
+        self.max_entries = max_entries
+
+    def _get_filename(self, key):
+        return os.path.join(self.cache_dir, '%s.cache' % key)
+
+    def get(self, key):
+        """ Get a cached entry
+        :param key: Digest identifying the entry
+        :return: Cached text, or None if not cached
+        """
+        filename = self._get_filename(key)
+        try:
+            with io.open(filename, encoding='utf-8') as cache_file:
+                content = cache_file.read()
+            os.utime(filename, None)
+        except (IOError, OSError):
+            return None
+        return content
+
+    def set(self, key, content):
+        """ Atomically store an entry, ignoring errors since caching is only an optimization
+        :param key: Digest identifying the entry
+        :param content: Text to cache
+        """
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            write_atomic(self._get_filename(key), content)
+            self._evict()
+        except (IOError, OSError):
+            pass
+
+    def _evict(self):
+        entries = []
+        for entry in os.listdir(self.cache_dir):
+            if entry.endswith('.cache'):
+                filename = os.path.join(self.cache_dir, entry)
+                entries.append((os.path.getmtime(filename), filename))
+        entries.sort(reverse=True)
+        for mtime, filename in entries[self.max_entries:]:
+            os.remove(filename)
@@ -1,10 +1,9 @@
 from __future__ import absolute_import
 
 import argparse
-import pkg_resources
 import sys
 
-from .command import Command
+from .markers import parse_marker_overrides
 
 
 def create_parser():
@@ -29,18 +28,211 @@ def create_parser():
     parser.add_argument('-l', '--lint', action='store_true', default=False,
                         help='Show discrepancies between requirements files and virtualenv.')
 
+    parser.add_argument('-w', '--wheelhouse', action='append', default=[], metavar='DIR',
+                        help='Check that every requirement can be installed offline from the '
+                             'wheels in DIR by the target interpreter (may be repeated).')
+
+    parser.add_argument('--dry-run', action='store_true', default=False,
+                        help='Show which packages would be removed, without removing them (only '
+                             'valid with -x).')
+
+    parser.add_argument('--ignore-dependencies', action='store_true', default=False,
+                        help='Treat packages that required packages depend on like any other '
+                             'package: remove them with -x, or ask where they go with -r.')
+
+    parser.add_argument('--omit-dependencies', action='store_true', default=False,
+                        help='Leave packages that required packages depend on out of '
+                             'requirements files; with -c, also remove them (only valid with '
+                             '-r).')
+
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='Maximum number of packages per pip uninstall (default: 50).')
+
+    parser.add_argument('--format', choices=['text', 'json', 'jsonl'], default='text',
+                        help='Output format for -l and -w: text (default), a JSON document, or '
+                             'JSON Lines with one record per discrepancy and a final summary.')
+
+    parser.add_argument('--watch', action='store_true', default=False,
+                        help='Keep running, and lint again whenever requirements files or '
+                             'installed packages change (only valid with -l).')
+
+    parser.add_argument('--watch-interval', type=float, default=0.5,
+                        help='Seconds between checks for changes with --watch (default: 0.5).')
+
+    parser.add_argument('--rules', default=None,
+                        help='File of rules placing packages into requirements files, e.g. '
+                             '"pytest-* test.txt" (only valid with -r).')
+
+    parser.add_argument('--default-file', default=None,
+                        help='Requirements file for packages not matched by any rule (only '
+                             'valid with -r).')
+
+    parser.add_argument('--no-input', action='store_true', default=False,
+                        help='Never prompt; fail if a package matches no rule (only valid with '
+                             '-r).')
+
+    parser.add_argument('--lock', action='store_true', default=False,
+                        help='Also write a lock file per environment, pinning every required '
+                             'package and its dependencies to the installed version (only valid '
+                             'with -r).')
+
+    parser.add_argument('--lock-dir', default=None,
+                        help='Directory for lock files (default: requirements-lock next to the '
+                             'requirements directory).')
+
+    parser.add_argument('--hash-dir', action='append', default=[],
+                        help='Directory of wheels and sdists, e.g. a wheelhouse, to add --hash '
+                             'options to lock files from (may be repeated, only valid with '
+                             '--lock). Lock files with packages not found there are not '
+                             'written.')
+
+    parser.add_argument('--discovery', choices=['metadata', 'freeze'], default='metadata',
+                        help='How to find installed packages: read distribution metadata '
+                             'directly (default), or run pip freeze.')
+
+    parser.add_argument('--python', action='append', default=[],
+                        help='Interpreter of the virtualenv to inspect, if not the current one '
+                             '(may be repeated with -l to check several virtualenvs).')
+
+    parser.add_argument('--serve', action='store_true', default=False,
+                        help='Run a daemon that keeps requirements files and installed packages '
+                             'in memory and answers -l for other pipwrap processes, until '
+                             'interrupted.')
+
+    parser.add_argument('--socket', default=None,
+                        help='Unix socket of the daemon (default: pipwrap.sock in '
+                             '$XDG_RUNTIME_DIR, or else in the cache directory).')
+
+    parser.add_argument('--no-daemon', action='store_true', default=False,
+                        help='Lint in this process, even if a daemon is running.')
+
+    parser.add_argument('--monorepo', default=None, metavar='ROOT',
+                        help='Lint every project under ROOT against one virtualenv, finding '
+                             'their requirements directories and files with --project-glob '
+                             '(only valid with -l).')
+
+    parser.add_argument('--project-glob', action='append', default=[],
+                        help='Glob of requirements directories or files to find with '
+                             '--monorepo, matched against names, or against paths relative to '
+                             'ROOT if it contains a / (may be repeated; default: requirements '
+                             'and requirements*.txt).')
+
+    parser.add_argument('--since', default=None, metavar='REF',
+                        help='Only report discrepancies that changes to the requirements files '
+                             'since git revision REF introduced or resolved, comparing only the '
+                             'changed files (only valid with -l).')
+
+    parser.add_argument('--marker-env', action='append', default=[],
+                        help='Evaluate environment markers such as sys_platform == "win32" with '
+                             'these comma-separated name=value variables instead of the '
+                             'interpreter\'s, e.g. sys_platform=win32,python_version=3.6 (only '
+                             'valid with -l; may be repeated to check several platforms).')
+
+    parser.add_argument('--site-packages', action='append', default=[],
+                        help='Site-packages directory to inspect (may be repeated, only valid '
+                             'with --discovery metadata, and with -x only together with '
+                             '--python, whose pip removes the packages).')
+
+    parser.add_argument('--profile', action='store_true', default=False,
+                        help='Report how long each phase took, and how much work it did, on '
+                             'stderr.')
+
+    parser.add_argument('--profile-output', default=None,
+                        help='Also write profiling data to a file: a Chrome trace if it ends in '
+                             '.json, otherwise cProfile statistics for pstats.')
+
+    parser.add_argument('--no-cache', action='store_true', default=False,
+                        help='Do not read or write cached installed packages and parsed '
+                             'requirements files.')
+
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory for cached data (default: ~/.cache/pipwrap).')
+
     return parser
 
 
 def verify_args(args):
-    has_one_option = (bool(args.requirements_files) ^ bool(args.remove_extra) ^ bool(args.lint))
-    if not has_one_option:
-        return 'Must specify --requirements-files (-r) or --remove-missing (-x) or --lint (-l).'
+    if args.serve:
+        if args.requirements_files or args.remove_extra or args.lint or args.wheelhouse:
+            return '--serve cannot be combined with -r, -x, -l or -w'
+        return None
+    modes = [args.requirements_files, args.remove_extra, args.lint, args.wheelhouse]
+    if len([mode for mode in modes if mode]) != 1:
+        return ('Must specify --requirements-files (-r) or --remove-missing (-x) or --lint (-l) '
+                'or --wheelhouse (-w).')
     if args.clean and not args.requirements_files:
         return '-c is only supported with -r'
+    if (args.rules or args.default_file or args.no_input) and not args.requirements_files:
+        return '--rules, --default-file and --no-input are only supported with -r'
+    if args.dry_run and not args.remove_extra:
+        return '--dry-run is only supported with -x'
+    if args.ignore_dependencies and not (args.remove_extra or args.requirements_files):
+        return '--ignore-dependencies is only supported with -x or -r'
+    if args.omit_dependencies and not args.requirements_files:
+        return '--omit-dependencies is only supported with -r'
+    if args.omit_dependencies and args.ignore_dependencies:
+        return '--omit-dependencies and --ignore-dependencies are mutually exclusive'
+    if args.lock and not args.requirements_files:
+        return '--lock is only supported with -r'
+    if (args.lock_dir or args.hash_dir) and not args.lock:
+        return '--lock-dir and --hash-dir are only supported with --lock'
+    if args.batch_size < 1:
+        return '--batch-size must be at least 1'
+    if args.format != 'text' and not (args.lint or args.wheelhouse):
+        return '--format is only supported with -l or -w'
+    if args.watch and not (args.lint and args.format == 'text' and len(args.python) < 2 and
+                           args.discovery == 'metadata'):
+        return ('--watch is only supported with -l, text output, a single virtualenv and '
+                '--discovery metadata')
+    if args.marker_env and not args.lint:
+        return '--marker-env is only supported with -l'
+    if args.project_glob and not args.monorepo:
+        return '--project-glob is only supported with --monorepo'
+    if args.monorepo and not (args.lint and not args.watch and len(args.python) < 2 and
+                              len(args.marker_env) < 2):
+        return ('--monorepo is only supported with -l, a single virtualenv and marker '
+                'environment, and without --watch')
+    if args.since and not (args.lint and not args.watch and not args.monorepo and
+                           len(args.python) < 2 and len(args.marker_env) < 2):
+        return ('--since is only supported with -l, a single virtualenv and marker '
+                'environment, and without --watch or --monorepo')
+    if args.watch and len(args.marker_env) > 1:
+        return 'Multiple --marker-env options are not supported with --watch'
+    for marker_env in args.marker_env:
+        try:
+            parse_marker_overrides(marker_env)
+        except ValueError as e:
+            return 'Invalid --marker-env: %s' % e
+    if len(args.python) > 1 and not args.lint:
+        return 'Multiple --python options are only supported with -l'
+    if len(args.python) > 1 and args.site_packages:
+        return '--site-packages is not supported with multiple --python options'
+    if args.site_packages and args.discovery != 'metadata':
+        return '--site-packages is only supported with --discovery metadata'
+    if args.site_packages and args.remove_extra and not args.python:
+        return '-x with --site-packages requires --python, to uninstall packages with its pip'
     return None
 
 
+def get_version():
+    """ Get the installed version of pipwrap, without scanning every installed distribution
+        the way pkg_resources does on import
+    :return: Version, or 'unknown' if pipwrap is run without being installed
+    """
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # python < 3.8
+        import pkg_resources
+        try:
+            return pkg_resources.require('pipwrap')[0].version
+        except pkg_resources.DistributionNotFound:
+            return 'unknown'
+    try:
+        return version('pipwrap')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
 def error(parser, message):
     parser.print_help()
     parser.exit(message="\nERROR: %s\n" % message)
@@ -52,15 +244,14 @@ def main():
         parsed_args = parser.parse_args()
 
         if parsed_args.version:
-            parser.exit("pipwrap %s" % pkg_resources.require("pipwrap")[0].version)
+            parser.exit("pipwrap %s" % get_version())
 
         error_message = verify_args(parsed_args)
         if error_message:
             error(parser, error_message)
+        # Imported here so that --version and argument errors don't pay for loading it
+        from .command import Command
         command = Command(parsed_args)
         return command.run()
     except KeyboardInterrupt:
         sys.exit()
-
-
-# TODO work from requirements*.txt?
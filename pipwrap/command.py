@@ -1,5 +1,6 @@
 import os
-import subprocess
+import sys
+import time
 
 # In python 3, raw_input has been renamed to input
 try:
@@ -7,22 +8,26 @@ try:
 except NameError:
     pass
 
-import requirements
-
-
-def get_key(requirement):
-    key = requirement.name
-    if not key:
-        key = requirement.path
-    return key
-
-
-class RequirementsFile(object):
-
-    def __init__(self):
-        self.included_files = []
-        self.packages = set()
-        self.found = set()
+from .api import (Environment, Project, get_installed_version, get_package_text,
+                  render_lockfile)
+from .cache import Cache, DEFAULT_MAX_ENTRIES, get_default_cache_dir
+from .daemon import Daemon, get_default_socket_path, query
+from .git import GitError
+from .hashes import ArchiveHasher, find_archives
+from .index import requirement_key
+from .markers import parse_marker_overrides
+from .monorepo import DEFAULT_PROJECT_PATTERNS, Monorepo
+from .profiling import NULL_PROFILER, Profiler
+from .report import get_reporter
+from .rules import PlacementRules, RulesError
+from .watch import WatchedEnvironment
+from .wheelhouse import WheelhouseIndex
+from .writing import write_atomic
+
+PARSED_CACHE_MAX_ENTRIES = 256
+MONOREPO_PARSED_CACHE_MAX_ENTRIES = 4096
+HASH_CACHE_MAX_ENTRIES = 4096
+DISCOVERY_THREADS = 8
 
 
 class Command(object):
@@ -30,17 +35,17 @@ class Command(object):
     def __init__(self, args, base_dir='.'):
         self.args = args
         self.requirements_dir = os.path.join(base_dir, 'requirements')
-        if not os.path.exists(self.requirements_dir):
+        self.profiler = NULL_PROFILER
+        if args.profile or args.profile_output:
+            self.profiler = Profiler()
+        if not (args.monorepo or args.serve) and not os.path.exists(self.requirements_dir):
             os.makedirs(self.requirements_dir)
 
     def _get_filename_key(self, prompt):
         return input(prompt)  # pragma nocover
 
     def _get_package_text(self, package):
-        package_text = package.name
-        if not package_text:
-            package_text = package.line
-        return package_text
+        return get_package_text(package)
 
     def _get_filename(self, package, filenames, filename_text):
         package_text = self._get_package_text(package)
@@ -55,167 +60,704 @@ class Command(object):
                 print("'%s' is not a valid filename. %s" % (filename_key, filename_text))
         return filename
 
-    def _format_requirements_line(self, package):
-        if package.uri or package.path:
-            text = package.line
-        else:
-            specs = ['%s%s' % (spec[0], spec[1]) for spec in package.specs]
-            text = '%s%s' % (package.name, ','.join(specs))
-        return '%s\n' % text
-
-    def _write_requirements_file(self, req_file, filename):
-        filename = os.path.join(self.requirements_dir, filename)
-        with open(filename, 'w+') as req_output_file:
-            req_output_file.writelines(req_file.included_files)
-            for package in sorted(req_file.packages, key=get_key):
-                # If clean isn't specified, write all packages originally in requirements
-                if not self.args.clean or package.line in req_file.found:
-                    req_output_file.write(self._format_requirements_line(package))
-
-    def _get_installed_packages(self):
+    def _choose_file(self, package, filename_list):
+        filenames = dict(enumerate(filename_list))
+        filename_text = ' / '.join('%s. %s' % (i, filename)
+                                   for i, filename in enumerate(filename_list))
+        return self._get_filename(package, filenames, filename_text)
+
+    def _get_cache(self, namespace, max_entries=DEFAULT_MAX_ENTRIES):
+        """ Get the on-disk cache for a kind of data
+        :param namespace: Name of the kind of data cached
+        :param max_entries: Maximum number of entries kept
+        :return: Cache, or None if caching is disabled
+        """
+        if self.args.no_cache:
+            return None
+        return Cache(self.args.cache_dir or get_default_cache_dir(), namespace, max_entries)
+
+    def _get_python(self):
+        """ Get the interpreter of the single target virtualenv
+        :return: Path to the interpreter, or None for the current one
+        """
+        if self.args.python:
+            return self.args.python[0]
+        return None
+
+    def _get_environment(self, python=None):
+        """ Get the target virtualenv
+        :param python: Path to the target interpreter, or None for the current one
+        :return: Environment
+        """
+        return Environment(python, paths=self.args.site_packages or None,
+                           discovery=self.args.discovery, cache=self._get_cache('installed'),
+                           profiler=self.profiler)
+
+    def _get_installed_packages(self, python=None):
         """ Get a set of installed packages
+        :param python: Path to the target interpreter, or None for the current one
         :return: Set of installed packages
         """
-        args = [
-            "pip",
-            "freeze",
-        ]
-        installed = subprocess.check_output(args, universal_newlines=True)
-        return set(requirements.parse(installed))
-
-    def _get_requirements_from_files(self):
-        """ Get a dictionary, keyed by filename, of requirements per file
-        :return: Dictionary, keyed by filename, of requirements per file
-        """
-        req_files = {}
-        for req_filename in os.listdir(self.requirements_dir):
-            with open(os.path.join(self.requirements_dir, req_filename)) as requirements_file:
-                req_file = RequirementsFile()
-                for line in requirements_file.readlines():
-                    if line.strip().startswith('-r'):
-                        req_file.included_files.append(line)
-                    requirements_file.seek(0)
-                req_file.packages = set(requirements.parse(requirements_file))
-            req_files[req_filename] = req_file
-        return req_files
-
-    def _compare_installed_and_required(self, installed_set, requirement_files):
-        """ Updates required versions to installed versions, and finds all installed packages
-            that are not in requirements
-        :param installed_set: Set of installed packages
-        :param requirement_files: Dictionary of required packages, keyed by filename
-        :return: Tuple of (updated_installed_set, installed_not_in_requirements)
-        """
-        missing_set = installed_set.copy()
-        for req_filename in requirement_files:
-            for requirement in requirement_files[req_filename].packages:
-                for installed in installed_set:
-                    if ((installed.name and installed.name == requirement.name) or
-                            (installed.line == requirement.line)):
-                        requirement_files[req_filename].found.add(requirement.line)
-                        requirement.specs = installed.specs
-                        missing_set.discard(installed)
-                        break
-        return requirement_files, missing_set
+        return self._get_environment(python).installed_index.packages
+
+    def _get_environments(self, pythons):
+        """ Find installed packages in several virtualenvs concurrently
+        :param pythons: Paths to the interpreters of the target virtualenvs
+        :return: List of Environment, in the same order as pythons
+        """
+        from multiprocessing.pool import ThreadPool
+        environments = [self._get_environment(python) for python in pythons]
+        pool = ThreadPool(min(len(pythons), DISCOVERY_THREADS))
+        try:
+            pool.map(lambda environment: environment.installed_index, environments)
+        finally:
+            pool.close()
+            pool.join()
+        return environments
+
+    def _get_lint_environments(self, pythons):
+        """ Get the environments to lint: each virtualenv under each --marker-env, sharing
+            the installed packages found once per virtualenv
+        :param pythons: Paths to the interpreters of the target virtualenvs, or [None] for the
+            current one
+        :return: List of (label, Environment)
+        """
+        environments = self._get_environments(pythons)
+        if not self.args.marker_env:
+            return list(zip(pythons, environments))
+        lint_environments = []
+        for python, environment in zip(pythons, environments):
+            for marker_env in self.args.marker_env:
+                label = marker_env if python is None else '%s [%s]' % (python, marker_env)
+                lint_environments.append(
+                    (label, environment.with_markers(parse_marker_overrides(marker_env))))
+        return lint_environments
+
+    def _get_project(self):
+        return Project(self.requirements_dir,
+                       cache=self._get_cache('parsed', max_entries=PARSED_CACHE_MAX_ENTRIES),
+                       profiler=self.profiler)
+
+    def _get_placement_rules(self):
+        """ Load the placement rules for packages missing from requirements files
+        :return: PlacementRules
+        """
+        if self.args.rules:
+            placement_rules = PlacementRules.load(self.args.rules)
+        else:
+            placement_rules = PlacementRules()
+        if self.args.default_file:
+            placement_rules.default = self.args.default_file
+        return placement_rules
 
     def generate_requirements_files(self):
         """ Create or update requirements files """
         print("Creating/updating requirements files\n")
 
-        installed_reqs = self._get_installed_packages()
-        req_files = self._get_requirements_from_files()
-        (req_files, missing_reqs) = self._compare_installed_and_required(installed_reqs, req_files)
-
-        filenames = {}
-        filename_text = []
-        filename_list = sorted(req_files.keys())
-        if len(filename_list) < 1:
-            default_filename = 'requirements.txt'
-            req_files[default_filename] = RequirementsFile()
-            filename_list.append(default_filename)
-        for i, filename in enumerate(filename_list):
-            filenames[i] = filename
-            filename_text.append('%s. %s' % (i, filename))
-        filename_text = ' / '.join(filename_text)
-
-        # Add missing requirements to user-selected file
-        for requirement in missing_reqs:
-            filename = self._get_filename(requirement, filenames, filename_text)
-            req_files[filename].found.add(requirement.line)
-            req_files[filename].packages.add(requirement)
-
-        for req_filename in req_files:
-            self._write_requirements_file(req_files[req_filename], req_filename)
+        try:
+            placement_rules = self._get_placement_rules()
+        except (IOError, OSError, RulesError) as e:
+            print('Invalid placement rules: %s' % e)
+            return 1
+
+        environment = self._get_environment(self._get_python())
+        choose_file = None if self.args.no_input else self._choose_file
+        result = self._get_project().generate(
+            environment, placement_rules, clean=self.args.clean,
+            ignore_dependencies=self.args.ignore_dependencies,
+            omit_dependencies=self.args.omit_dependencies, choose_file=choose_file)
+
+        for package in sorted(result.omitted, key=requirement_key):
+            print("Omitting '%s' (required by %s)" % (self._get_package_text(package),
+                                                      result.omitted[package]))
+        for package in sorted(result.dependencies, key=requirement_key):
+            filename, parent = result.dependencies[package]
+            print("Adding '%s' to %s (required by %s)" % (self._get_package_text(package),
+                                                          filename, parent))
+
+        if result.unplaced:
+            print('No placement rule for packages:')
+            for requirement in result.unplaced:
+                print(self._get_package_text(requirement))
+            return 1
+
+        for req_filename, package in sorted(result.redundant,
+                                            key=lambda item: (item[0], requirement_key(item[1]))):
+            print("Removing '%s' from %s (required by %s)"
+                  % (self._get_package_text(package), req_filename,
+                     result.redundant[req_filename, package]))
+
+        project = Project(self.requirements_dir, req_files=result.req_files)
+        self._print_environments(project)
+
+        if self.args.lock and not self._write_lockfiles(project, environment):
+            return 1
 
         return 0
 
+    def _get_lock_dir(self):
+        if self.args.lock_dir:
+            return self.args.lock_dir
+        return os.path.join(os.path.dirname(self.requirements_dir), 'requirements-lock')
+
+    def _get_hashes(self, hasher, archives, packages):
+        """ Hash the local archives of the installed versions of packages
+        :param hasher: ArchiveHasher
+        :param archives: Dictionary, keyed by (canonical name, version), of archive paths
+        :param packages: Installed packages
+        :return: Tuple of (dictionary, keyed by requirement key, of lists of hashes, list of
+            packages with no local archive)
+        """
+        paths = {}
+        unhashed = []
+        for package in packages:
+            version = get_installed_version(package)
+            key = requirement_key(package)
+            if package.name and (key, version) in archives:
+                paths[key] = archives[key, version]
+            else:
+                unhashed.append(package)
+        path_hashes = hasher.hash_paths(sorted(set(path for package_paths in paths.values()
+                                                   for path in package_paths)))
+        hashes = dict((key, sorted(set(path_hashes[path] for path in package_paths)))
+                      for key, package_paths in paths.items())
+        return hashes, unhashed
+
+    def _write_lockfiles(self, project, environment):
+        """ Write a fully pinned lock file per environment, writing each one as soon as it is
+            built. With --hash-dir, a lock file is only written if every package in it can be
+            hashed, since pip refuses to install a partially hashed file.
+        :param project: Project of requirements files
+        :param environment: Environment to take installed versions from
+        :return: True if every lock file was written
+        """
+        lock_dir = self._get_lock_dir()
+        if not os.path.exists(lock_dir):
+            os.makedirs(lock_dir)
+        archives = find_archives(self.args.hash_dir)
+        hasher = ArchiveHasher(self._get_cache('hashes', max_entries=HASH_CACHE_MAX_ENTRIES))
+
+        print('Writing lock files to %s' % lock_dir)
+        print('---------------------------------------------------')
+        written = True
+        for root, packages, missing in project.iter_locked(environment):
+            hashes = None
+            unhashed = []
+            if self.args.hash_dir:
+                with self.profiler.phase('hashing'):
+                    hashes, unhashed = self._get_hashes(hasher, archives, packages)
+            if unhashed:
+                written = False
+                print('%s: not written, no local archive to hash: %s' % (
+                    root, ', '.join(self._get_package_text(package) for package in unhashed)))
+            else:
+                with self.profiler.phase('writing'):
+                    write_atomic(os.path.join(lock_dir, root),
+                                 render_lockfile(root, packages, hashes))
+                print('%s: %d packages' % (root, len(packages)))
+            if missing:
+                print('  not installed, left out: %s'
+                      % ', '.join(self._get_package_text(package) for package in missing))
+        print('---------------------------------------------------\n')
+        return written
+
+    def _determine_removal_plan(self):
+        """ Determine which installed packages missing from requirements files can be removed,
+            keeping those that required packages depend on
+        :return: RemovalPlan
+        """
+        environment = self._get_environment(self._get_python())
+        return self._get_project().removal_plan(environment, self.args.ignore_dependencies)
+
     def _determine_extra_packages(self):
-        """ Determine all packages that are installed, but missing from requirements files
+        """ Determine all packages that are installed, but missing from requirements files and
+            not needed by any required package
         :return: Set of packages to be removed
         """
-
-        installed_set = self._get_installed_packages()
-        req_files = self._get_requirements_from_files()
-        req_files, removal_set = self._compare_installed_and_required(installed_set, req_files)
-        return removal_set
+        return self._determine_removal_plan().remove
 
     def remove_extra_packages(self):
         """ Remove all packages missing from list """
 
-        removal_set = self._determine_extra_packages()
-        if not removal_set:
+        plan = self._determine_removal_plan()
+
+        if plan.kept:
+            print("Keeping packages required by other packages:")
+            for package in sorted(plan.kept, key=requirement_key):
+                print('%s (required by %s)' % (self._get_package_text(package),
+                                               plan.kept[package]))
+            print('')
+
+        for package in plan.unnamed:
+            print("Cannot remove '%s': package name unknown" % package.line)
+
+        package_names = plan.package_names
+        if not package_names:
             print("No packages to be removed")
+        elif self.args.dry_run:
+            print("Packages that would be removed:")
+            for name in package_names:
+                print(name)
         else:
-            package_names = [package.name for package in removal_set]
             print("Removing packages\n")
-            args = [
-                "pip",
-                "uninstall",
-                "-y",
-            ]
-            args.extend(package_names)
-            subprocess.check_call(args)
+            self._get_environment(self._get_python()).uninstall(package_names,
+                                                                self.args.batch_size)
 
         return 0
 
+    def _print_environments(self, project):
+        """ Print the effective requirements of each environment, i.e. each file not included
+            by another file, counting packages from all files it includes
+        :param project: Project of requirements files
+        """
+        print('Requirements per environment:')
+        print('---------------------------------------------------')
+        environments = project.include_graph.environments()
+        for filename in sorted(environments):
+            effective = environments[filename]
+            source_filenames = set(source[0] for sources in effective.values()
+                                   for source in sources)
+            print('%s: %d packages (%s)' % (filename, len(effective),
+                                            ', '.join(sorted(source_filenames))))
+        print('---------------------------------------------------\n')
+
+    def lint_report(self, reporter, pythons):
+        """ Find discrepancies between requirements files and one or more virtualenvs or
+            marker environments, streaming each one to a reporter as it is found
+        :param reporter: Reporter for machine-readable output
+        :param pythons: Paths to the interpreters of the target virtualenvs, or [None] for the
+            current one
+        """
+        timings = {}
+        start = time.time()
+        project = self._get_project()
+        req_files = project.req_files
+        timings['parsing'] = time.time() - start
+
+        start = time.time()
+        lint_environments = self._get_lint_environments(pythons)
+        timings['discovery'] = time.time() - start
+
+        start = time.time()
+        counts = {'missing': 0, 'extra': 0, 'version-mismatch': 0, 'include': 0}
+        reporter.start()
+        with self.profiler.phase('matching'):
+            for label, environment in lint_environments:
+                for record in project.iter_discrepancies(environment):
+                    if len(lint_environments) > 1:
+                        record['environment'] = label
+                    counts[record['kind']] += 1
+                    reporter.record(record)
+
+        for filename, problem in project.find_include_problems():
+            counts['include'] += 1
+            reporter.record({'kind': 'include', 'file': filename, 'message': problem})
+        timings['comparison'] = time.time() - start
+
+        reporter.finish({
+            'counts': counts,
+            'files': len(req_files),
+            'installed': [len(environment.installed_index)
+                          for label, environment in lint_environments],
+            'timings': timings,
+        })
+
+        return 1 if any(counts.values()) else 0
+
+    def _print_matrix(self, title, rows, num_environments):
+        """ Print which environments each package is a discrepancy in
+        :param title: Heading of the section
+        :param rows: Dictionary, keyed by package text, of sets of environment numbers
+        :param num_environments: Number of environments
+        """
+        print(title)
+        print('---------------------------------------------------')
+        width = max([len(text) for text in rows] + [len('Package')])
+        column_width = len(str(num_environments))
+        numbers = [str(number).rjust(column_width) for number in range(1, num_environments + 1)]
+        print('%s  %s' % ('Package'.ljust(width), ' '.join(numbers)))
+        for text in sorted(rows):
+            cells = [('X' if number in rows[text] else '.').rjust(column_width)
+                     for number in range(1, num_environments + 1)]
+            print('%s  %s' % (text.ljust(width), ' '.join(cells)))
+        print('---------------------------------------------------\n')
+
+    def lint_environments(self, pythons):
+        """ Find discrepancies between requirements files and several virtualenvs or marker
+            environments, reading the requirements files once and finding installed packages
+            concurrently
+        :param pythons: Paths to the interpreters of the target virtualenvs, or [None] for the
+            current one
+        """
+        print("Discrepancies between requirements files and virtualenvs\n")
+
+        project = self._get_project()
+        lint_environments = self._get_lint_environments(pythons)
+
+        print('Environments:')
+        for number, (label, environment) in enumerate(lint_environments, 1):
+            print('%d. %s' % (number, label))
+        print('')
+
+        rows = {'missing': {}, 'extra': {}, 'version-mismatch': {}}
+        for number, (label, environment) in enumerate(lint_environments, 1):
+            for record in project.iter_discrepancies(environment):
+                rows[record['kind']].setdefault(record['package'], set()).add(number)
+
+        self._print_matrix('Packages present in requirements but not installed:',
+                           rows['missing'], len(lint_environments))
+        self._print_matrix('Packages installed but not present in requirements:',
+                           rows['extra'], len(lint_environments))
+        self._print_matrix('Packages installed but not satisfying requirements:',
+                           rows['version-mismatch'], len(lint_environments))
+
+        # Includes only depend on the requirements files, so they are the same everywhere
+        problems = project.find_include_problems()
+        print('Problems with included requirements files:')
+        print('---------------------------------------------------')
+        for filename, problem in problems:
+            print('%s: %s' % (filename, problem))
+        print('---------------------------------------------------\n')
+
+        return 1 if any(rows.values()) or problems else 0
+
+    def watch(self):
+        """ Lint whenever requirements files or installed packages change, keeping both in
+            memory and only re-reading what changed
+        """
+        python = self._get_python()
+        paths = self._get_environment(python).search_paths
+        cache = self._get_cache('parsed', max_entries=PARSED_CACHE_MAX_ENTRIES)
+        watched = WatchedEnvironment(self.requirements_dir, paths, cache)
+        markers = None
+        if self.args.marker_env:
+            markers = parse_marker_overrides(self.args.marker_env[0])
+        # Markers are evaluated against the target interpreter, which is only asked once
+        environment = Environment(python, paths=paths, markers=markers,
+                                  installed=lambda: watched.installed_index.packages)
+        watched.poll()
+        while True:
+            environment.refresh()
+            self._print_lint(Project(self.requirements_dir, req_files=watched.req_files),
+                             environment)
+            print('Watching for changes (press Ctrl-C to stop)\n')
+            while True:
+                time.sleep(self.args.watch_interval)
+                start = time.time()
+                if watched.poll():
+                    break
+            print('Changes found in %.1f ms\n' % ((time.time() - start) * 1000))
+
+    def _get_monorepo(self):
+        cache = self._get_cache('parsed', max_entries=MONOREPO_PARSED_CACHE_MAX_ENTRIES)
+        return Monorepo(self.args.monorepo, self.args.project_glob or DEFAULT_PROJECT_PATTERNS,
+                        cache=cache, profiler=self.profiler)
+
+    def lint_monorepo(self):
+        """ Find discrepancies between the requirements of every project in a monorepo and one
+            virtualenv, reporting installed packages as extra only if no project requires them
+        """
+        monorepo = self._get_monorepo()
+        environment = self._get_environment(self._get_python())
+        if self.args.marker_env:
+            environment = environment.with_markers(parse_marker_overrides(self.args.marker_env[0]))
+        result = monorepo.lint(environment)
+
+        if self.args.format != 'text':
+            reporter = get_reporter(self.args.format, sys.stdout)
+            counts = {'missing': 0, 'extra': 0, 'version-mismatch': 0, 'include': 0}
+            reporter.start()
+            for record in result.iter_records():
+                counts[record['kind']] += 1
+                reporter.record(record)
+            reporter.finish({
+                'counts': counts,
+                'projects': len(result.results),
+                'files': sum(len(project.req_files) for project in monorepo.projects.values()),
+                'installed': len(environment.installed_index),
+            })
+            return 0 if result.ok else 1
+
+        print("Discrepancies between requirements files and virtualenv in %d projects\n" %
+              len(result.results))
+        records = {'missing': [], 'extra': [], 'version-mismatch': [], 'include': []}
+        problem_counts = dict((name, 0) for name in result.results)
+        for record in result.iter_records():
+            records[record['kind']].append(record)
+            if record['project'] is not None:
+                problem_counts[record['project']] += 1
+
+        print('Packages present in requirements but not installed:')
+        print('---------------------------------------------------')
+        for record in records['missing']:
+            path = os.path.join(record['project'], record['file'])
+            print('%s (%s)' % (record['package'], path))
+        print('---------------------------------------------------\n')
+
+        print('Packages installed but not present in any requirements:')
+        print('---------------------------------------------------')
+        for record in records['extra']:
+            print(record['package'])
+        print('---------------------------------------------------\n')
+
+        print('Packages installed but not satisfying requirements:')
+        print('---------------------------------------------------')
+        for record in records['version-mismatch']:
+            print('%s %s (%s requires %s)' % (
+                record['package'], record['installed_version'],
+                os.path.join(record['project'], record['file']), record['required_spec']))
+        print('---------------------------------------------------\n')
+
+        print('Problems with included requirements files:')
+        print('---------------------------------------------------')
+        for record in records['include']:
+            print('%s: %s' % (os.path.join(record['project'], record['file']),
+                              record['message']))
+        print('---------------------------------------------------\n')
+
+        print('Projects:')
+        print('---------------------------------------------------')
+        for name in sorted(result.results):
+            print('%s: %d files, %d problems' % (name, len(monorepo.projects[name].req_files),
+                                                 problem_counts[name]))
+        print('---------------------------------------------------\n')
+
+        return 0 if result.ok else 1
+
+    def _format_change(self, record):
+        kind = record['kind']
+        if kind == 'missing':
+            return 'missing: %s (%s)' % (record['package'], record['file'])
+        if kind == 'extra':
+            return 'extra: %s' % record['package']
+        if kind == 'version-mismatch':
+            return 'version-mismatch: %s %s (%s requires %s)' % (
+                record['package'], record['installed_version'], record['file'],
+                record['required_spec'])
+        return 'include: %s: %s' % (record['file'], record['message'])
+
+    def lint_since(self):
+        """ Find discrepancies between requirements files and virtualenv that changes to the
+            requirements files since a git revision introduced or resolved
+        """
+        project = self._get_project()
+        environment = self._get_environment(self._get_python())
+        if self.args.marker_env:
+            environment = environment.with_markers(parse_marker_overrides(self.args.marker_env[0]))
+        try:
+            diff = project.lint_since(environment, self.args.since)
+        except GitError as e:
+            print('Cannot compare with %s: %s' % (self.args.since, e))
+            return 1
+
+        if self.args.format != 'text':
+            reporter = get_reporter(self.args.format, sys.stdout)
+            reporter.start()
+            for change, records in (('new', diff.new), ('resolved', diff.resolved)):
+                for record in records:
+                    reporter.record(dict(record, change=change))
+            reporter.finish({
+                'counts': {'new': len(diff.new), 'resolved': len(diff.resolved)},
+                'since': diff.ref,
+                'changed': sorted(diff.changed),
+            })
+            return 0 if diff.ok else 1
+
+        print('Discrepancies between requirements files and virtualenv introduced or resolved '
+              'since %s\n' % diff.ref)
+
+        print('Changed requirements files:')
+        print('---------------------------------------------------')
+        for filename in sorted(diff.changed):
+            print('%s %s' % (diff.changed[filename], filename))
+        print('---------------------------------------------------\n')
+
+        print('New discrepancies:')
+        print('---------------------------------------------------')
+        for record in diff.new:
+            print(self._format_change(record))
+        print('---------------------------------------------------\n')
+
+        print('Resolved discrepancies:')
+        print('---------------------------------------------------')
+        for record in diff.resolved:
+            print(self._format_change(record))
+        print('---------------------------------------------------\n')
+
+        return 0 if diff.ok else 1
+
+    def check_wheelhouse(self):
+        """ Find requirements that cannot be installed offline from the wheelhouse directories
+            by the target interpreter
+        """
+        wheelhouse = WheelhouseIndex.from_directories(self.args.wheelhouse,
+                                                      cache=self._get_cache('wheelhouse'))
+        project = self._get_project()
+        check = project.check_wheelhouse(self._get_environment(self._get_python()), wheelhouse)
+
+        if self.args.format != 'text':
+            reporter = get_reporter(self.args.format, sys.stdout)
+            reporter.start()
+            for record in check.records:
+                reporter.record(record)
+            reporter.finish({
+                'counts': {'missing': len(check.of_kind('missing')),
+                           'incompatible': len(check.of_kind('incompatible'))},
+                'files': len(project.req_files),
+                'wheels': check.wheels,
+            })
+            return 0 if check.ok else 1
+
+        print('Requirements that cannot be installed from %d wheels in %s\n' % (
+            check.wheels, ', '.join(self.args.wheelhouse)))
+
+        print('Packages with no wheel of a required version:')
+        print('---------------------------------------------------')
+        for record in check.of_kind('missing'):
+            print('%s%s (%s; available: %s)' % (record['package'], record['required_spec'] or '',
+                                                record['file'],
+                                                ', '.join(record['available']) or 'none'))
+        print('---------------------------------------------------\n')
+
+        print('Packages with no wheel for the target platform:')
+        print('---------------------------------------------------')
+        for record in check.of_kind('incompatible'):
+            print('%s%s (%s; available: %s)' % (record['package'], record['required_spec'] or '',
+                                                record['file'], ', '.join(record['available'])))
+        print('---------------------------------------------------\n')
+
+        return 0 if check.ok else 1
+
+    def _get_socket_path(self):
+        return self.args.socket or get_default_socket_path()
+
+    def serve(self):
+        """ Answer lint queries from other pipwrap processes until interrupted """
+        socket_path = self._get_socket_path()
+        daemon = Daemon(socket_path, self._print_lint,
+                        cache=self._get_cache('parsed', max_entries=PARSED_CACHE_MAX_ENTRIES))
+        print('Listening on %s (press Ctrl-C to stop)' % socket_path)
+        sys.stdout.flush()
+        # Exit cleanly when killed, so the socket is removed
+        import signal
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        daemon.serve_forever()
+        return 0
+
+    def _lint_with_daemon(self):
+        """ Ask a running daemon to lint, if one is running and can answer this query
+        :return: Exit status, or None to lint in this process
+        """
+        if (self.args.no_daemon or self.args.watch or self.args.marker_env or
+                len(self.args.python) > 1 or self.args.discovery != 'metadata' or
+                self.profiler.enabled):
+            return None
+        socket_path = self._get_socket_path()
+        if not os.path.exists(socket_path):
+            return None
+        python = self._get_python()
+        paths = self._get_environment(python).search_paths
+        response = query(socket_path, {
+            'command': 'lint',
+            'requirements_dir': os.path.abspath(self.requirements_dir),
+            'paths': [os.path.abspath(path) for path in paths],
+            'python': python or sys.executable,
+        })
+        if response is None or response['status'] not in (0, 1):
+            return None
+        sys.stdout.write(response['output'])
+        return response['status']
+
     def lint(self):
         """ Find discrepancies between requirements files and virtualenv """
+        if self.args.monorepo:
+            return self.lint_monorepo()
+        if self.args.since:
+            return self.lint_since()
+        if self.args.format != 'text':
+            reporter = get_reporter(self.args.format, sys.stdout)
+            return self.lint_report(reporter, self.args.python or [None])
+        if len(self.args.python) > 1 or len(self.args.marker_env) > 1:
+            return self.lint_environments(self.args.python or [None])
+        if self.args.watch:
+            return self.watch()
+        status = self._lint_with_daemon()
+        if status is not None:
+            return status
+
+        environment = self._get_environment(self._get_python())
+        if self.args.marker_env:
+            environment = environment.with_markers(parse_marker_overrides(self.args.marker_env[0]))
+        return self._print_lint(self._get_project(), environment)
+
+    def _print_lint(self, project, environment):
+        """ Print discrepancies between requirements files and virtualenv
+        :param project: Project of requirements files
+        :param environment: Environment of installed packages
+        :return: 1 if there are discrepancies, otherwise 0
+        """
         print("Discrepancies between requirements files and virtualenv\n")
 
-        installed_reqs = self._get_installed_packages()
-        req_files = self._get_requirements_from_files()
-        (req_files, missing_reqs) = self._compare_installed_and_required(installed_reqs, req_files)
-
-        result = 0
+        lint_result = project.lint(environment)
 
         print('Packages present in requirements but not installed:')
         print('---------------------------------------------------')
-        for req_filename in req_files:
-            req_file = req_files[req_filename]
-            for package in sorted(req_file.packages, key=get_key):
-                if package.line not in req_file.found:
-                    result = 1
-                    text = self._get_package_text(package)
-                    print(text)
+        for record in lint_result.of_kind('missing'):
+            print(record['package'])
         print('---------------------------------------------------\n')
 
         print('Packages installed but not present in requirements:')
         print('---------------------------------------------------')
-        if missing_reqs:
-            result = 1
-            for package in sorted(missing_reqs, key=get_key):
-                text = self._get_package_text(package)
-                print(text)
+        for record in lint_result.of_kind('extra'):
+            print(record['package'])
         print('---------------------------------------------------\n')
 
-        return result
+        print('Packages installed but not satisfying requirements:')
+        print('---------------------------------------------------')
+        for record in lint_result.of_kind('version-mismatch'):
+            print('%s %s (%s requires %s)' % (record['package'], record['installed_version'],
+                                              record['file'], record['required_spec']))
+        print('---------------------------------------------------\n')
+
+        self._print_environments(project)
+
+        print('Problems with included requirements files:')
+        print('---------------------------------------------------')
+        for filename, problem in lint_result.problems:
+            print('%s: %s' % (filename, problem))
+        print('---------------------------------------------------\n')
+
+        return 0 if lint_result.ok else 1
 
     def run(self):
+        if not self.profiler.enabled:
+            return self._run()
+        output = self.args.profile_output
+        try:
+            if output and not output.endswith('.json'):
+                import cProfile
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(self._run)
+                finally:
+                    profile.dump_stats(output)
+            return self._run()
+        finally:
+            if output and output.endswith('.json'):
+                self.profiler.write_chrome_trace(output)
+            sys.stderr.write('\nProfile:\n')
+            self.profiler.report(sys.stderr)
+
+    def _run(self):
         result = 1
-        if self.args.requirements_files:
+        if self.args.serve:
+            result = self.serve()
+        elif self.args.requirements_files:
             result = self.generate_requirements_files()
         elif self.args.remove_extra:
             result = self.remove_extra_packages()
         elif self.args.lint:
             result = self.lint()
+        elif self.args.wheelhouse:
+            result = self.check_wheelhouse()
         return result
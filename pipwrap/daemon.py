@@ -0,0 +1,200 @@
+import errno
+import json
+import os
+import sys
+import time
+
+from .api import Environment, Project
+from .cache import get_default_cache_dir
+from .watch import WatchedEnvironment
+
+
+SOCKET_NAME = 'pipwrap.sock'
+
+# Clients give up on an unresponsive daemon and lint in-process instead
+CLIENT_TIMEOUT = 30.0
+
+
+def get_default_socket_path():
+    """ Get the path of the daemon's Unix socket, in the user's runtime directory if there is
+        one, otherwise in the cache directory
+    :return: Path to the socket
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(get_default_cache_dir(), SOCKET_NAME)
+
+
+def query(socket_path, request, timeout=CLIENT_TIMEOUT):
+    """ Send a request to a running daemon
+    :param socket_path: Path to the daemon's Unix socket
+    :param request: Request, as a dictionary with a 'command' key
+    :param timeout: Seconds to wait for the response
+    :return: Response dictionary, or None if no daemon is running
+    """
+    if not os.path.exists(socket_path):
+        return None
+    import socket
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(('%s\n' % json.dumps(request)).encode('utf-8'))
+        stream = client.makefile('rb')
+        try:
+            line = stream.readline()
+        finally:
+            stream.close()
+    except (IOError, OSError):
+        return None
+    finally:
+        client.close()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+class _Registration(object):
+    """ A project's requirements files and installed packages, with its last lint output """
+
+    def __init__(self, requirements_dir, paths, python, cache):
+        self.watched = WatchedEnvironment(requirements_dir, paths, cache)
+        self.project = Project(requirements_dir, req_files=self.watched.req_files)
+        # Markers are evaluated against the client's interpreter, which is only run if a
+        # requirement has markers, and then only once
+        self.environment = Environment(python,
+                                       installed=lambda: self.watched.installed_index.packages)
+        self.response = None
+        self.queries = 0
+
+
+class Daemon(object):
+    """ Holds the requirements files and installed packages of every project it is asked about
+        in memory. Each query only stats files to find what changed since the last one, and
+        returns the previous answer if nothing did.
+
+        lint is called with a Project and an Environment to print the lint output, and returns
+        the exit status.
+    """
+
+    def __init__(self, socket_path, lint, cache=None):
+        self.socket_path = socket_path
+        self.cache = cache
+        self.lint = lint
+        self.registrations = {}
+        self.started = time.time()
+        self._server = None
+
+    def _lint(self, request):
+        requirements_dir = request['requirements_dir']
+        paths = request['paths']
+        python = request.get('python')
+        key = (requirements_dir, tuple(paths), python)
+        registration = self.registrations.get(key)
+        if registration is None:
+            registration = self.registrations[key] = _Registration(requirements_dir, paths,
+                                                                   python, self.cache)
+        registration.queries += 1
+        if not registration.watched.poll() and registration.response is not None:
+            return registration.response
+        registration.project.reload()
+        registration.environment.refresh()
+
+        from io import StringIO
+        output = StringIO()
+        stdout = sys.stdout
+        sys.stdout = output
+        try:
+            status = self.lint(registration.project, registration.environment)
+        finally:
+            sys.stdout = stdout
+        registration.response = {'status': status, 'output': output.getvalue()}
+        return registration.response
+
+    def _status(self):
+        projects = []
+        for key in sorted(self.registrations, key=lambda key: (key[0], key[1], key[2] or '')):
+            registration = self.registrations[key]
+            requirements_dir, paths, python = key
+            projects.append({
+                'requirements_dir': requirements_dir,
+                'paths': list(paths),
+                'python': python,
+                'files': len(registration.watched.req_files),
+                'installed': len(registration.watched.installed_index),
+                'queries': registration.queries,
+            })
+        return {'status': 0, 'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'projects': projects}
+
+    def handle(self, request):
+        """ Answer one request
+        :param request: Dictionary with a 'command' key: 'lint', with 'requirements_dir',
+            'paths' (the directories searched for installed distributions) and optionally
+            'python' (the interpreter markers are evaluated for), or 'status'
+        :return: Response dictionary, with a 'status' key that is 0 on success
+        """
+        command = request.get('command')
+        try:
+            if command == 'lint':
+                return self._lint(request)
+            if command == 'status':
+                return self._status()
+        except (IOError, OSError, KeyError, ValueError) as e:
+            return {'status': 2, 'error': str(e)}
+        return {'status': 2, 'error': 'unknown command %r' % command}
+
+    def _remove_stale_socket(self):
+        """ Remove a socket left behind by a daemon that is no longer running
+        :raises: OSError if another daemon is listening on the socket
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        if query(self.socket_path, {'command': 'status'}, timeout=1.0) is not None:
+            raise OSError(errno.EADDRINUSE, 'A daemon is already listening on %s' %
+                          self.socket_path)
+        os.remove(self.socket_path)
+
+    def serve_forever(self):
+        """ Listen on the socket, answering one request per connection, until interrupted """
+        try:
+            import socketserver
+        except ImportError:  # python 2
+            import SocketServer as socketserver
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    response = daemon.handle(json.loads(line.decode('utf-8')))
+                except ValueError as e:
+                    response = {'status': 2, 'error': str(e)}
+                self.wfile.write(('%s\n' % json.dumps(response)).encode('utf-8'))
+
+        directory = os.path.dirname(self.socket_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._remove_stale_socket()
+        # Only the current user may connect
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.UnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def shutdown(self):
+        """ Stop serve_forever, which must be running in another thread """
+        if self._server is not None:
+            self._server.shutdown()
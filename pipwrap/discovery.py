@@ -0,0 +1,150 @@
+import io
+import json
+import os
+import sys
+
+from .index import canonicalize_name
+
+
+# Packages pip freeze leaves out of its output by default
+FREEZE_EXCLUDES = frozenset(['pip', 'setuptools', 'wheel', 'distribute'])
+
+DISTRIBUTION_SUFFIXES = ('.dist-info', '.egg-info', '.egg-link')
+
+_SYS_PATH_SCRIPT = 'import json, sys; print(json.dumps(sys.path))'
+
+
+def get_search_paths(python=None):
+    """ Get the directories searched for installed distributions
+    :param python: Path to the interpreter of a target virtualenv, or None for the current one
+    :return: List of existing directories on the interpreter's sys.path
+    """
+    if python:
+        import subprocess
+        output = subprocess.check_output([python, '-c', _SYS_PATH_SCRIPT],
+                                         universal_newlines=True)
+        paths = json.loads(output)
+    else:
+        paths = sys.path
+    return [path for path in paths if path and os.path.isdir(path)]
+
+
+def iter_freeze(python=None):
+    """ Run pip freeze, yielding its output line by line as pip writes it rather than holding
+        all of it in memory
+    :param python: Path to the interpreter of a target virtualenv, or None to use pip on PATH
+    :return: Generator of pip freeze lines, without line endings
+    :raises: subprocess.CalledProcessError if pip fails
+    """
+    import subprocess
+    if python:
+        args = [python, '-m', 'pip', 'freeze']
+    else:
+        args = ['pip', 'freeze']
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, args)
+
+
+def _read_metadata_headers(filename):
+    name = version = None
+    with io.open(filename, encoding='utf-8', errors='replace') as metadata:
+        for line in metadata:
+            if not line.strip():
+                break
+            if line.startswith('Name:'):
+                name = line[len('Name:'):].strip()
+            elif line.startswith('Version:'):
+                version = line[len('Version:'):].strip()
+            if name and version:
+                break
+    return name, version
+
+
+def _read_direct_url(dist_info_dir):
+    try:
+        with open(os.path.join(dist_info_dir, 'direct_url.json')) as direct_url_file:
+            return json.load(direct_url_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _format_direct_url_line(direct_url, name):
+    url = direct_url.get('url')
+    if not url:
+        return None
+    vcs_info = direct_url.get('vcs_info')
+    editable = direct_url.get('dir_info', {}).get('editable', False)
+    if vcs_info:
+        line = '%s+%s@%s#egg=%s' % (vcs_info.get('vcs'), url, vcs_info.get('commit_id'), name)
+        if editable:
+            line = '-e %s' % line
+        return line
+    if editable:
+        return '-e %s#egg=%s' % (url, name)
+    return None
+
+
+def _read_egg_link(filename, name):
+    with open(filename) as egg_link:
+        project_dir = egg_link.readline().strip()
+    return '-e %s#egg=%s' % (project_dir, name)
+
+
+def get_distribution_line(directory, entry):
+    """ Get the pip freeze style line for a site-packages entry
+    :param directory: Directory containing the entry
+    :param entry: Name of the entry, e.g. 'Django-1.7.dist-info'
+    :return: Tuple of (name, line), or (None, None) if the entry is not a distribution
+    """
+    path = os.path.join(directory, entry)
+    if entry.endswith('.dist-info'):
+        name, version = _read_metadata_headers(os.path.join(path, 'METADATA'))
+        direct_url = _read_direct_url(path)
+        line = direct_url and _format_direct_url_line(direct_url, name)
+        return name, line or '%s==%s' % (name, version)
+    if entry.endswith('.egg-info'):
+        if os.path.isdir(path):
+            path = os.path.join(path, 'PKG-INFO')
+        name, version = _read_metadata_headers(path)
+        return name, '%s==%s' % (name, version)
+    if entry.endswith('.egg-link'):
+        name = entry[:-len('.egg-link')]
+        return name, _read_egg_link(path, name)
+    return None, None
+
+
+def is_distribution_entry(entry):
+    return entry.endswith(DISTRIBUTION_SUFFIXES)
+
+
+def scan_installed(paths, excludes=FREEZE_EXCLUDES):
+    """ Find installed distributions by reading their metadata directly, without running pip
+    :param paths: Directories to scan, in sys.path order
+    :param excludes: Project names to leave out, as pip freeze does
+    :return: Generator of pip freeze style requirement lines
+    """
+    seen = set(canonicalize_name(name) for name in excludes)
+    for directory in paths:
+        try:
+            entries = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                name, line = get_distribution_line(directory, entry)
+            except (IOError, OSError):
+                continue
+            if not name:
+                continue
+            key = canonicalize_name(name)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield line
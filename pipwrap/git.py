@@ -0,0 +1,98 @@
+class GitError(Exception):
+    """ A git command failed, e.g. because the directory is not in a repository or the
+        revision does not exist
+    """
+
+    def __init__(self, message, returncode=None):
+        super(GitError, self).__init__(message)
+        self.returncode = returncode
+
+
+def _run(args, cwd, input_data=None):
+    """ Run a git command
+    :param args: Arguments after 'git'
+    :param cwd: Directory to run it in
+    :param input_data: Bytes to write to its standard input
+    :return: Standard output, as bytes
+    :raises: GitError if git is not installed or the command fails
+    """
+    import subprocess
+    try:
+        process = subprocess.Popen(['git'] + args, cwd=cwd, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise GitError('cannot run git: %s' % e)
+    output, error = process.communicate(input_data)
+    if process.returncode != 0:
+        message = error.decode('utf-8', 'replace').strip()
+        raise GitError(message or 'git %s failed' % args[0], process.returncode)
+    return output
+
+
+def _split(output):
+    return [name.decode('utf-8') for name in output.split(b'\0') if name]
+
+
+def resolve_commit(directory, ref):
+    """ Resolve a revision to a commit
+    :param directory: Directory in the work tree
+    :param ref: Revision, e.g. 'origin/master' or 'HEAD~3'
+    :return: Commit hash
+    :raises: GitError if the revision is not a commit, or git cannot run in the directory
+    """
+    try:
+        return _run(['rev-parse', '--verify', '--quiet', '%s^{commit}' % ref],
+                    directory).decode('ascii').strip()
+    except GitError as e:
+        # With --quiet, git only exits with 1, saying nothing, if the revision does not resolve
+        if e.returncode == 1:
+            raise GitError('unknown revision %s' % ref, e.returncode)
+        raise
+
+
+def changed_files(directory, commit):
+    """ Find the files directly in a directory that differ between a commit and the work tree,
+        including uncommitted and untracked (but not ignored) files
+    :param directory: Directory in the work tree
+    :param commit: Commit hash
+    :return: Dictionary, keyed by filename relative to directory, of 'A' (added), 'M'
+        (modified) or 'D' (deleted)
+    """
+    # --relative limits the diff to the directory and makes paths relative to it
+    output = _split(_run(['diff', '--relative', '--no-renames', '--name-status', '-z', commit,
+                          '--', '.'], directory))
+    changed = {}
+    for i in range(0, len(output) - 1, 2):
+        status = output[i][0]
+        changed[output[i + 1]] = status if status in 'AD' else 'M'
+    for name in _split(_run(['ls-files', '--others', '--exclude-standard', '-z', '--', '.'],
+                            directory)):
+        changed[name] = 'A'
+    return dict((name, status) for name, status in changed.items() if '/' not in name)
+
+
+def read_files(directory, commit, filenames):
+    """ Read files as they were at a commit, with a single git process
+    :param directory: Directory in the work tree
+    :param commit: Commit hash
+    :param filenames: Filenames relative to directory, which must exist at the commit
+    :return: Dictionary, keyed by filename, of contents as bytes
+    """
+    if not filenames:
+        return {}
+    prefix = _run(['rev-parse', '--show-prefix'], directory).decode('utf-8').strip()
+    filenames = list(filenames)
+    batch = ''.join('%s:%s%s\n' % (commit, prefix, filename) for filename in filenames)
+    output = _run(['cat-file', '--batch'], directory, batch.encode('utf-8'))
+    contents = {}
+    position = 0
+    for filename in filenames:
+        end = output.index(b'\n', position)
+        header = output[position:end].split()
+        if len(header) != 3:
+            raise GitError('%s not found in %s' % (filename, commit))
+        size = int(header[2])
+        contents[filename] = output[end + 1:end + 1 + size]
+        # Each object is followed by a newline
+        position = end + 1 + size + 1
+    return contents
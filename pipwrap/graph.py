@@ -0,0 +1,176 @@
+import io
+import os
+
+from .discovery import is_distribution_entry
+from .index import canonicalize_name
+
+
+def _read_requires_dist(filename):
+    name = None
+    requires = []
+    with io.open(filename, encoding='utf-8', errors='replace') as metadata:
+        for line in metadata:
+            if not line.strip():
+                break
+            if line.startswith('Name:'):
+                name = line[len('Name:'):].strip()
+            elif line.startswith('Requires-Dist:'):
+                requires.append(line[len('Requires-Dist:'):].strip())
+    return name, requires
+
+
+def _read_egg_info_requires(filename):
+    """ Convert an egg-info requires.txt, with its [extra:marker] sections, to Requires-Dist
+        style requirement strings
+    """
+    requires = []
+    marker = None
+    try:
+        with io.open(filename, encoding='utf-8', errors='replace') as requires_file:
+            for line in requires_file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('['):
+                    extra, _, section_marker = line.strip('[]').partition(':')
+                    markers = []
+                    if extra:
+                        markers.append('extra == "%s"' % extra)
+                    if section_marker:
+                        markers.append('(%s)' % section_marker)
+                    marker = ' and '.join(markers) or None
+                    continue
+                requires.append('%s; %s' % (line, marker) if marker else line)
+    except (IOError, OSError):
+        pass
+    return requires
+
+
+def _read_distribution_requires(directory, entry):
+    path = os.path.join(directory, entry)
+    if entry.endswith('.dist-info'):
+        return _read_requires_dist(os.path.join(path, 'METADATA'))
+    if entry.endswith('.egg-info'):
+        if not os.path.isdir(path):
+            return _read_requires_dist(path)
+        name, requires = _read_requires_dist(os.path.join(path, 'PKG-INFO'))
+        return name, requires + _read_egg_info_requires(os.path.join(path, 'requires.txt'))
+    return None, []
+
+
+class DependencyGraph(object):
+    """ Dependencies between installed distributions, from their Requires-Dist metadata. Markers
+        are evaluated against the environment of a MarkerEvaluator, or the current interpreter.
+    """
+
+    def __init__(self, markers=None):
+        self.markers = markers
+        self.requires = {}
+        self._parsed = {}
+        self._dependencies = {}
+
+    def add(self, name, requires):
+        self.requires.setdefault(canonicalize_name(name), requires)
+
+    @classmethod
+    def from_paths(cls, paths, markers=None):
+        """ Build the graph of distributions installed in a list of directories
+        :param paths: Directories searched for installed distributions, in sys.path order
+        :param markers: Optional MarkerEvaluator of the target environment
+        :return: DependencyGraph
+        """
+        graph = cls(markers)
+        for directory in paths:
+            try:
+                entries = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not is_distribution_entry(entry):
+                    continue
+                try:
+                    name, requires = _read_distribution_requires(directory, entry)
+                except (IOError, OSError):
+                    continue
+                if name:
+                    graph.add(name, requires)
+        return graph
+
+    def _parse(self, requirement_string):
+        try:
+            return self._parsed[requirement_string]
+        except KeyError:
+            from packaging.requirements import InvalidRequirement, Requirement
+            try:
+                requirement = Requirement(requirement_string)
+            except InvalidRequirement:
+                requirement = None
+            self._parsed[requirement_string] = requirement
+            return requirement
+
+    def _is_needed(self, requirement, extras):
+        if requirement.marker is None:
+            return True
+        environment = self.markers.environment if self.markers is not None else {}
+        return any(requirement.marker.evaluate(dict(environment, extra=extra))
+                   for extra in extras)
+
+    def dependencies(self, name, extras=()):
+        """ Get the direct dependencies of an installed distribution
+        :param name: Canonical name of the distribution
+        :param extras: Extras requested for the distribution
+        :return: List of (canonical dependency name, extras requested of the dependency)
+        """
+        extras = tuple(sorted(set(canonicalize_name(extra) for extra in extras)))
+        try:
+            return self._dependencies[name, extras]
+        except KeyError:
+            pass
+        dependencies = []
+        for requirement_string in self.requires.get(name, []):
+            requirement = self._parse(requirement_string)
+            if requirement is not None and self._is_needed(requirement, ('',) + extras):
+                dependencies.append((canonicalize_name(requirement.name),
+                                     tuple(sorted(requirement.extras))))
+        self._dependencies[name, extras] = dependencies
+        return dependencies
+
+    def reachable(self, roots):
+        """ Find every distribution needed by a set of root distributions
+        :param roots: Iterable of (canonical name, extras) of the required distributions
+        :return: Dictionary, keyed by canonical name, of the name of the distribution that first
+            required it (None for roots)
+        """
+        parents = {}
+        queue = []
+        for name, extras in roots:
+            parents.setdefault(name, None)
+            queue.append((name, tuple(sorted(extras))))
+        return self._traverse(queue, parents)
+
+    def dependencies_of(self, roots):
+        """ Find every distribution needed by a set of root distributions, not counting the
+            roots themselves unless another root needs them
+        :param roots: Iterable of (canonical name, extras) of the required distributions
+        :return: Dictionary, keyed by canonical name, of the name of the distribution that first
+            required it
+        """
+        parents = {}
+        queue = []
+        for name, extras in roots:
+            for dependency, dependency_extras in self.dependencies(name, extras):
+                parents.setdefault(dependency, name)
+                queue.append((dependency, dependency_extras))
+        return self._traverse(queue, parents)
+
+    def _traverse(self, queue, parents):
+        visited = set()
+        while queue:
+            name, extras = queue.pop()
+            if (name, extras) in visited:
+                continue
+            visited.add((name, extras))
+            for dependency, dependency_extras in self.dependencies(name, extras):
+                parents.setdefault(dependency, name)
+                queue.append((dependency, dependency_extras))
+        return parents
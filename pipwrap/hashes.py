@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+
+from .index import canonicalize_name
+
+
+ARCHIVE_SUFFIXES = ('.whl', '.tar.gz', '.tar.bz2', '.zip')
+
+# Hashing in another process only pays off once there are enough files to share out
+PARALLEL_HASH_THRESHOLD = 4
+
+_SDIST_RE = re.compile(r'^(?P<name>.+?)-(?P<version>\d[^-]*)$')
+
+
+def parse_archive_filename(filename):
+    """ Get the project name and version of a wheel or sdist from its filename
+    :param filename: Archive filename, e.g. 'Django-1.7-py2.py3-none-any.whl'
+    :return: Tuple of (canonical name, version), or None if the filename is not an archive
+    """
+    if filename.endswith('.whl'):
+        parts = filename[:-len('.whl')].split('-')
+        if len(parts) < 5:
+            return None
+        return canonicalize_name(parts[0]), parts[1]
+    for suffix in ARCHIVE_SUFFIXES:
+        if filename.endswith(suffix):
+            match = _SDIST_RE.match(filename[:-len(suffix)])
+            if match is None:
+                return None
+            return canonicalize_name(match.group('name')), match.group('version')
+    return None
+
+
+def find_archives(directories):
+    """ Find wheels and sdists in local directories, e.g. a wheelhouse or pip's wheel cache
+    :param directories: Directories to search, recursively
+    :return: Dictionary, keyed by (canonical name, version), of sorted lists of paths
+    """
+    archives = {}
+    for directory in directories:
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for filename in filenames:
+                parsed = parse_archive_filename(filename)
+                if parsed is not None:
+                    archives.setdefault(parsed, []).append(os.path.join(dirpath, filename))
+    for paths in archives.values():
+        paths.sort()
+    return archives
+
+
+def hash_file(path):
+    """ Compute the sha256 of a file, in the form pip's --hash option expects
+    :param path: Path to the file
+    :return: Tuple of (path, 'sha256:<hex digest>')
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as archive:
+        for chunk in iter(lambda: archive.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return path, 'sha256:%s' % digest.hexdigest()
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    key = '%s\0%d\0%r' % (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class ArchiveHasher(object):
+    """ Hashes archives across a pool of processes, caching each hash by path, size and
+        modification time so unchanged archives are only hashed once.
+    """
+
+    def __init__(self, cache=None, processes=None):
+        self.cache = cache
+        self.processes = processes
+
+    def _hash_files(self, paths):
+        if len(paths) < PARALLEL_HASH_THRESHOLD or self.processes == 1:
+            return [hash_file(path) for path in paths]
+        import multiprocessing
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            return pool.map(hash_file, paths)
+        finally:
+            pool.close()
+            pool.join()
+
+    def hash_paths(self, paths):
+        """ Hash archives
+        :param paths: Paths to the archives
+        :return: Dictionary, keyed by path, of 'sha256:<hex digest>'
+        """
+        hashes = {}
+        uncached = []
+        keys = {}
+        for path in paths:
+            if self.cache is not None:
+                keys[path] = _cache_key(path)
+                cached = self.cache.get(keys[path])
+                if cached is not None:
+                    hashes[path] = cached
+                    continue
+            uncached.append(path)
+        for path, file_hash in self._hash_files(uncached):
+            hashes[path] = file_hash
+            if self.cache is not None:
+                self.cache.set(keys[path], file_hash)
+        return hashes
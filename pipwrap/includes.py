@@ -0,0 +1,114 @@
+import os
+
+from .index import requirement_key
+from .parsing import parse_include_line
+
+
+class IncludeGraph(object):
+    """ Graph of -r and -c includes between the files in a requirements directory. Each file's
+        effective requirements are resolved once and reused by every file that includes it.
+    """
+
+    def __init__(self, requirements_dir, req_files):
+        self.req_files = req_files
+        self.requirements = {}
+        self.constraints = {}
+        self.missing = {}
+        self.cycles = []
+        self._resolved = {}
+        for filename in sorted(req_files):
+            self.requirements[filename] = []
+            self.constraints[filename] = []
+            self.missing[filename] = []
+            for line in req_files[filename].included_files:
+                is_constraint, path = parse_include_line(line)
+                included = os.path.normpath(os.path.join(os.path.dirname(filename), path))
+                if included in req_files:
+                    edges = self.constraints if is_constraint else self.requirements
+                    edges[filename].append(included)
+                elif not os.path.exists(os.path.join(requirements_dir, included)):
+                    self.missing[filename].append(path)
+
+    def roots(self):
+        """ Get the files that no other file includes, i.e. one per environment
+        :return: Sorted list of filenames
+        """
+        included = set()
+        for edges in (self.requirements, self.constraints):
+            for targets in edges.values():
+                included.update(targets)
+        return [filename for filename in sorted(self.req_files) if filename not in included]
+
+    def constraint_files(self):
+        """ Get the files only ever included with -c. Their packages constrain versions but are
+            not required, so they are never missing and do not keep installed packages.
+        :return: Set of filenames
+        """
+        constrained = set()
+        required = set()
+        for targets in self.constraints.values():
+            constrained.update(targets)
+        for targets in self.requirements.values():
+            required.update(targets)
+        return constrained - required
+
+    def closure(self, filename):
+        """ Get a file and every file it includes with -r, directly or indirectly
+        :param filename: Name of the requirements file
+        :return: Set of filenames
+        """
+        closure = set()
+        stack = [filename]
+        while stack:
+            current = stack.pop()
+            if current not in closure:
+                closure.add(current)
+                stack.extend(self.requirements[current])
+        return closure
+
+    def resolve(self, filename):
+        """ Get the effective requirements of a file, including everything it includes with -r
+        :param filename: Name of the requirements file
+        :return: Dictionary, keyed by requirement key, of lists of (filename, requirement)
+        """
+        return self._resolve(filename, [])
+
+    def _resolve(self, filename, stack):
+        if filename in self._resolved:
+            return self._resolved[filename]
+        if filename in stack:
+            self.cycles.append(stack[stack.index(filename):] + [filename])
+            return {}
+        stack.append(filename)
+        for included in self.constraints[filename]:
+            self._resolve(included, stack)
+        effective = {}
+        for included in self.requirements[filename]:
+            for key, sources in self._resolve(included, stack).items():
+                merged = effective.get(key, [])
+                effective[key] = merged + [source for source in sources if source not in merged]
+        for package in self.req_files[filename].packages:
+            effective.setdefault(requirement_key(package), []).append((filename, package))
+        stack.pop()
+        self._resolved[filename] = effective
+        return effective
+
+    def environments(self):
+        """ Resolve every file, detecting cycles
+        :return: Dictionary, keyed by root filename, of effective requirements
+        """
+        for filename in sorted(self.req_files):
+            self.resolve(filename)
+        return dict((filename, self.resolve(filename)) for filename in self.roots())
+
+    def duplicates(self, filename):
+        """ Find requirements listed in more than one file of an environment
+        :param filename: Name of the requirements file
+        :return: Sorted list of (requirement key, sorted list of filenames)
+        """
+        duplicates = []
+        for key, sources in self.resolve(filename).items():
+            filenames = sorted(set(source[0] for source in sources))
+            if len(filenames) > 1:
+                duplicates.append((key, filenames))
+        return sorted(duplicates)
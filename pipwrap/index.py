@@ -0,0 +1,51 @@
+import re
+
+
+_CANONICAL_RE = re.compile(r'[-_.]+')
+
+
+def canonicalize_name(name):
+    """ Normalize a project name to its PEP 503 canonical form
+    :param name: Project name, e.g. 'Django_Nose'
+    :return: Canonical name, e.g. 'django-nose'
+    """
+    return _CANONICAL_RE.sub('-', name).lower()
+
+
+def requirement_key(requirement):
+    """ Get a key identifying the project a requirement refers to
+    :param requirement: Parsed requirement
+    :return: Canonical name, or the raw line for unnamed VCS/path requirements
+    """
+    if requirement.name:
+        return canonicalize_name(requirement.name)
+    return requirement.line
+
+
+class InstalledIndex(object):
+    """ Installed packages, indexed by canonical project name and by raw line so that each
+        requirement can be matched in constant time.
+    """
+
+    def __init__(self, packages):
+        self.packages = set(packages)
+        self.by_name = {}
+        self.by_line = {}
+        for package in self.packages:
+            if package.name:
+                self.by_name.setdefault(canonicalize_name(package.name), package)
+            self.by_line.setdefault(package.line, package)
+
+    def __len__(self):
+        return len(self.packages)
+
+    def find(self, requirement):
+        """ Find the installed package satisfying a requirement
+        :param requirement: Requirement from a requirements file
+        :return: Matching installed package, or None
+        """
+        if requirement.name:
+            installed = self.by_name.get(requirement_key(requirement))
+            if installed is not None:
+                return installed
+        return self.by_line.get(requirement.line)
@@ -0,0 +1,99 @@
+import json
+
+
+# Computes the PEP 508 marker environment with the standard library only, since the target
+# interpreter may not have packaging installed
+_MARKER_ENVIRONMENT_SCRIPT = '''
+import json, os, platform, sys
+if hasattr(sys, 'implementation'):
+    info = sys.implementation.version
+    version = '%d.%d.%d' % (info.major, info.minor, info.micro)
+    if info.releaselevel != 'final':
+        version += info.releaselevel[0] + str(info.serial)
+    name = sys.implementation.name
+else:
+    version, name = '0', ''
+print(json.dumps({
+    'implementation_name': name,
+    'implementation_version': version,
+    'os_name': os.name,
+    'platform_machine': platform.machine(),
+    'platform_release': platform.release(),
+    'platform_system': platform.system(),
+    'platform_version': platform.version(),
+    'python_full_version': platform.python_version(),
+    'platform_python_implementation': platform.python_implementation(),
+    'python_version': '.'.join(platform.python_version_tuple()[:2]),
+    'sys_platform': sys.platform,
+}))
+'''
+
+
+def get_marker_environment(python=None):
+    """ Get the values PEP 508 environment markers are evaluated against
+    :param python: Path to the interpreter of a target virtualenv, or None for the current one
+    :return: Dictionary of marker variables, e.g. {'sys_platform': 'linux', ...}
+    """
+    if python:
+        import subprocess
+        output = subprocess.check_output([python, '-c', _MARKER_ENVIRONMENT_SCRIPT],
+                                         universal_newlines=True)
+        return json.loads(output)
+    from packaging.markers import default_environment
+    return default_environment()
+
+
+def parse_marker_overrides(text):
+    """ Parse marker variables given on the command line
+    :param text: Comma-separated name=value pairs, e.g. 'sys_platform=win32,python_version=3.6'
+    :return: Dictionary of marker variables
+    :raises: ValueError if a pair has no name
+    """
+    overrides = {}
+    for pair in text.split(','):
+        if not pair.strip():
+            continue
+        name, separator, value = pair.partition('=')
+        if not separator or not name.strip():
+            raise ValueError('expected name=value, got %r' % pair.strip())
+        overrides[name.strip()] = value.strip()
+    return overrides
+
+
+class MarkerEvaluator(object):
+    """ Evaluates environment markers against one marker environment, parsing and evaluating
+        each distinct marker once no matter how many requirements share it. The environment may
+        be a callable, so it is only found, e.g. by running the target interpreter, if a marker
+        needs evaluating.
+    """
+
+    def __init__(self, environment):
+        self._environment = environment
+        self._results = {}
+
+    @property
+    def environment(self):
+        """ Dictionary of marker variables """
+        if callable(self._environment):
+            self._environment = self._environment()
+        return self._environment
+
+    def applies(self, marker):
+        """ Check whether a requirement with a marker applies to the environment
+        :param marker: Marker text, e.g. 'sys_platform == "win32"', or None
+        :return: True or False. Markers that cannot be parsed or evaluated apply, so the
+            requirement is still checked.
+        """
+        if not marker:
+            return True
+        try:
+            return self._results[marker]
+        except KeyError:
+            from packaging.markers import (InvalidMarker, Marker, UndefinedComparison,
+                                           UndefinedEnvironmentName)
+            try:
+                result = Marker(marker).evaluate(dict(self.environment, extra=''))
+            except (InvalidMarker, UndefinedComparison, UndefinedEnvironmentName):
+                result = True
+            self._results[marker] = result
+            return result
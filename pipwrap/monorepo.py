@@ -0,0 +1,143 @@
+import fnmatch
+import os
+
+from .api import Project
+from .profiling import NULL_PROFILER
+
+
+DEFAULT_PROJECT_PATTERNS = ('requirements', 'requirements*.txt')
+
+# Directories that never contain projects' requirements, besides hidden ones and virtualenvs
+SKIPPED_DIRECTORIES = frozenset(['node_modules', 'site-packages', '__pycache__'])
+
+PROJECT_THREADS = 8
+
+
+def _matches(relative_path, patterns):
+    name = relative_path.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        if fnmatch.fnmatch(relative_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def find_projects(root, patterns=DEFAULT_PROJECT_PATTERNS):
+    """ Find the requirements trees under a directory, without looking inside hidden
+        directories, virtualenvs or the requirements directories found
+    :param root: Directory to search
+    :param patterns: Glob patterns of requirements directories and files. Patterns containing
+        a / match paths relative to root, others match names.
+    :return: Sorted list of (directory, filenames), where filenames is None if every file in
+        the directory is a requirements file, or else a sorted list of the requirements files
+    """
+    projects = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if 'pyvenv.cfg' in filenames:
+            dirnames[:] = []
+            continue
+        relative_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        prefix = '' if relative_dir == '.' else relative_dir + '/'
+        searched = []
+        for dirname in sorted(dirnames):
+            if dirname.startswith('.') or dirname in SKIPPED_DIRECTORIES:
+                continue
+            if _matches(prefix + dirname, patterns):
+                projects.append((os.path.join(dirpath, dirname), None))
+            else:
+                searched.append(dirname)
+        dirnames[:] = searched
+        matching = sorted(filename for filename in filenames
+                          if not filename.startswith('.') and _matches(prefix + filename,
+                                                                       patterns))
+        if matching:
+            projects.append((dirpath, matching))
+    return sorted(projects)
+
+
+class MonorepoLintResult(object):
+    """ Discrepancies between the requirements of many projects and one environment. Installed
+        packages are only extra if no project requires them.
+    """
+
+    def __init__(self, results, extra):
+        self.results = results
+        self.extra = extra
+
+    def iter_records(self):
+        """ Get the discrepancies and include problems of every project, then the extra packages
+        :return: Generator of records, as dictionaries with a 'project' key
+        """
+        for name in sorted(self.results):
+            lint_result = self.results[name]
+            for record in lint_result.discrepancies:
+                if record['kind'] != 'extra':
+                    yield dict(record, project=name)
+            for filename, problem in lint_result.problems:
+                yield {'kind': 'include', 'project': name, 'file': filename, 'message': problem}
+        for record in self.extra:
+            yield dict(record, project=None)
+
+    @property
+    def ok(self):
+        return not any(True for _ in self.iter_records())
+
+
+class Monorepo(object):
+    """ Requirements trees of many projects under one root directory, checked concurrently
+        against one environment, so installed packages are found once for all of them. Projects
+        share the cache of parsed requirements files.
+    """
+
+    def __init__(self, root, patterns=DEFAULT_PROJECT_PATTERNS, cache=None,
+                 profiler=NULL_PROFILER, threads=PROJECT_THREADS):
+        self.root = root
+        self.patterns = patterns
+        self.cache = cache
+        self.profiler = profiler
+        self.threads = threads
+        self._projects = None
+
+    @property
+    def projects(self):
+        """ Dictionary, keyed by directory relative to root, of Project """
+        if self._projects is None:
+            with self.profiler.phase('finding projects'):
+                self._projects = {}
+                for directory, filenames in find_projects(self.root, self.patterns):
+                    name = os.path.relpath(directory, self.root)
+                    self._projects[name] = Project(directory, cache=self.cache,
+                                                   profiler=self.profiler, filenames=filenames)
+        return self._projects
+
+    def _map(self, function, names):
+        if len(names) < 2 or self.threads == 1:
+            return [function(name) for name in names]
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(len(names), self.threads))
+        try:
+            return pool.map(function, names)
+        finally:
+            pool.close()
+            pool.join()
+
+    def lint(self, environment):
+        """ Find discrepancies between every project's requirements and an environment
+        :param environment: Environment to compare against
+        :return: MonorepoLintResult
+        """
+        # Find installed packages before sharing the environment between threads
+        environment.installed_index
+        projects = self.projects
+        names = sorted(projects)
+        results = dict(zip(names, self._map(lambda name: projects[name].lint(environment),
+                                            names)))
+
+        extra = None
+        for name in names:
+            extra_records = results[name].of_kind('extra')
+            if extra is None:
+                extra = extra_records
+            else:
+                packages = set(record['package'] for record in extra_records)
+                extra = [record for record in extra if record['package'] in packages]
+        return MonorepoLintResult(results, extra or [])
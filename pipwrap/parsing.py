@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import os
+
+from .profiling import NULL_PROFILER
+from .requirement import Requirement, parse
+
+
+_REQUIREMENT_FIELDS = ('line', 'editable', 'local_file', 'specifier', 'vcs', 'name', 'key',
+                       'uri', 'path', 'revision', 'extras', 'specs', 'markers', 'source',
+                       'line_number')
+
+# Bump when _REQUIREMENT_FIELDS or parsing changes, so stale cache entries are not used
+_CACHE_FORMAT = b'2'
+
+
+_INCLUDE_OPTIONS = ('--requirement', '--constraint', '-r', '-c')
+_CONSTRAINT_OPTIONS = ('--constraint', '-c')
+
+
+def parse_include_line(line):
+    """ Parse a -r/--requirement or -c/--constraint line
+    :param line: Line from a requirements file
+    :return: Tuple of (is_constraint, included_path), or None if the line is not an include
+    """
+    stripped = line.strip()
+    for option in _INCLUDE_OPTIONS:
+        if stripped.startswith(option):
+            path = stripped[len(option):].lstrip(' \t=').split(' #')[0].strip()
+            return option in _CONSTRAINT_OPTIONS, path
+    return None
+
+
+class RequirementsFile(object):
+
+    def __init__(self):
+        self.included_files = []
+        self.packages = set()
+        self.found = set()
+
+
+def is_include_line(line):
+    return parse_include_line(line) is not None
+
+
+def serialize_requirements(packages):
+    """ Serialize parsed requirements, so they can be cached without re-parsing
+    :param packages: Iterable of parsed requirements
+    :return: JSON text
+    """
+    return json.dumps([[getattr(package, field) for field in _REQUIREMENT_FIELDS]
+                       for package in packages])
+
+
+def deserialize_requirements(text):
+    """ Rebuild parsed requirements from serialize_requirements output
+    :param text: JSON text
+    :return: List of requirements
+    """
+    packages = []
+    for values in json.loads(text):
+        package = Requirement(values[0])
+        for field, value in zip(_REQUIREMENT_FIELDS, values):
+            setattr(package, field, value)
+        package.specs = [tuple(spec) for spec in package.specs]
+        packages.append(package)
+    return packages
+
+
+def _open_binary(filename, data):
+    if data is not None:
+        return io.BytesIO(data)
+    return io.open(filename, 'rb')
+
+
+def _open_text(filename, data):
+    if data is not None:
+        return io.StringIO(data.decode('utf-8'), newline=None)
+    return io.open(filename, encoding='utf-8', newline=None)
+
+
+def _iter_lines(lines, included_files):
+    """ Pass lines on, collecting include lines on the way
+    :param lines: Iterable of lines
+    :param included_files: List the include lines are appended to
+    :return: Generator of lines
+    """
+    for line in lines:
+        if line.lstrip().startswith('-') and is_include_line(line):
+            included_files.append(line)
+        yield line
+
+
+def _scan_requirements_file(filename, data):
+    """ Hash a requirements file for the cache and find its include lines, a line at a time
+    :param filename: Path to the requirements file
+    :param data: Content of the file as bytes, or None to read it from disk
+    :return: Tuple of (cache key, included_file_lines)
+    """
+    digest = hashlib.sha1(_CACHE_FORMAT)
+    digest.update(b'\0')
+    digest.update(os.path.abspath(filename).encode('utf-8'))
+    digest.update(b'\0')
+    included_files = []
+    with _open_binary(filename, data) as requirements_file:
+        for line in requirements_file:
+            digest.update(line)
+            if line.lstrip().startswith(b'-'):
+                line = line.decode('utf-8').replace('\r\n', '\n')
+                if is_include_line(line):
+                    included_files.append(line)
+    return digest.hexdigest(), included_files
+
+
+def parse_requirements_file(filename, cache=None, profiler=NULL_PROFILER, data=None):
+    """ Read a requirements file, collecting included files and requirements. The file is
+        parsed as it is read, so only one line at a time is held in memory besides the parsed
+        requirements.
+    :param filename: Path to the requirements file
+    :param cache: Optional Cache of parsed requirements, keyed by path and content hash
+    :param profiler: Profiler timing reading and parsing
+    :param data: Content of the file as bytes, e.g. from an earlier revision, instead of reading
+        it from disk
+    :return: Tuple of (included_file_lines, requirements)
+    """
+    profiler.count('files read')
+    key = None
+    included_files = []
+    if cache is not None:
+        with profiler.phase('reading'):
+            key, included_files = _scan_requirements_file(filename, data)
+        cached = cache.get(key)
+        if cached is not None:
+            profiler.count('files from cache')
+            return included_files, deserialize_requirements(cached)
+
+    with profiler.phase('parsing'):
+        with _open_text(filename, data) as requirements_file:
+            lines = requirements_file
+            if key is None:
+                lines = _iter_lines(requirements_file, included_files)
+            # Include lines are options, which parse skips
+            packages = list(parse(lines, filename))
+    profiler.count('requirements parsed', len(packages))
+    if cache is not None:
+        cache.set(key, serialize_requirements(packages))
+    return included_files, packages
+
+
+def read_requirements_file(filename, cache=None, profiler=NULL_PROFILER, data=None):
+    """ Read a requirements file
+    :param filename: Path to the requirements file
+    :param cache: Optional Cache of parsed requirements, keyed by path and content hash
+    :param profiler: Profiler timing reading and parsing
+    :param data: Content of the file as bytes, instead of reading it from disk
+    :return: RequirementsFile
+    """
+    req_file = RequirementsFile()
+    req_file.included_files, packages = parse_requirements_file(filename, cache, profiler, data)
+    req_file.packages = set(packages)
+    return req_file
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+
+class _NullPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullProfiler(object):
+    """ Profiler that records nothing, so instrumented code costs one method call per phase
+        when profiling is disabled
+    """
+    enabled = False
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, amount=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Phase(object):
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._record(self.name, self.start, time.time() - self.start)
+        return False
+
+
+class Profiler(object):
+    """ Records how long each phase of a run takes, and counts of the work done in it """
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._start = time.time()
+
+    def phase(self, name):
+        """ Time a phase, e.g. "with profiler.phase('parsing'):"
+        :param name: Name of the phase
+        :return: Context manager
+        """
+        return _Phase(self, name)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def _record(self, name, start, duration):
+        with self._lock:
+            self.spans.append((name, start, duration, threading.current_thread().ident))
+
+    def totals(self):
+        """ Total time and number of calls of each phase
+        :return: Dictionary, keyed by phase, of (calls, seconds)
+        """
+        totals = {}
+        for name, start, duration, thread_id in self.spans:
+            calls, seconds = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, seconds + duration)
+        return totals
+
+    def report(self, stream):
+        """ Write a table of phase timings and counts
+        :param stream: File-like object to write to
+        """
+        totals = self.totals()
+        width = max([len(name) for name in list(totals) + list(self.counts)] + [len('Phase')])
+        stream.write('%s  %6s  %10s\n' % ('Phase'.ljust(width), 'Calls', 'Total'))
+        # Phases run in threads can overlap, so totals may add up to more than the elapsed time
+        for name in sorted(totals, key=lambda name: -totals[name][1]):
+            calls, seconds = totals[name]
+            stream.write('%s  %6d  %8.1fms\n' % (name.ljust(width), calls, seconds * 1000))
+        stream.write('%s  %6s  %8.1fms\n' % ('elapsed'.ljust(width), '',
+                                             (time.time() - self._start) * 1000))
+        for name in sorted(self.counts):
+            stream.write('%s  %6d\n' % (name.ljust(width), self.counts[name]))
+
+    def write_chrome_trace(self, filename):
+        """ Write phases in Chrome's trace event format, viewable in chrome://tracing
+        :param filename: Path of the JSON file to write
+        """
+        events = []
+        for name, start, duration, thread_id in self.spans:
+            events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': int((start - self._start) * 1e6),
+                'dur': int(duration * 1e6),
+                'pid': os.getpid(),
+                'tid': thread_id,
+            })
+        with open(filename, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'otherData': {'counts': self.counts}}, trace_file)
@@ -0,0 +1,58 @@
+import json
+
+
+class JsonLinesReporter(object):
+    """ Writes one JSON object per line as each record is found, ending with a summary record """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def start(self):
+        pass
+
+    def record(self, record):
+        self.stream.write('%s\n' % json.dumps(record, sort_keys=True))
+        self.stream.flush()
+
+    def finish(self, summary):
+        summary = dict(summary)
+        summary['kind'] = 'summary'
+        self.record(summary)
+
+
+class JsonReporter(object):
+    """ Writes a single JSON document, {"discrepancies": [...], "summary": {...}}, streaming the
+        discrepancies as they are found rather than collecting them first
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def start(self):
+        self.stream.write('{"discrepancies": [')
+
+    def record(self, record):
+        separator = ',' if self.count else ''
+        self.stream.write('%s\n%s' % (separator, json.dumps(record, sort_keys=True)))
+        self.stream.flush()
+        self.count += 1
+
+    def finish(self, summary):
+        self.stream.write('\n], "summary": %s}\n' % json.dumps(summary, sort_keys=True))
+        self.stream.flush()
+
+
+REPORTERS = {
+    'json': JsonReporter,
+    'jsonl': JsonLinesReporter,
+}
+
+
+def get_reporter(output_format, stream):
+    """ Get a reporter for machine-readable lint output
+    :param output_format: 'json' or 'jsonl'
+    :param stream: File-like object to write to
+    :return: Reporter
+    """
+    return REPORTERS[output_format](stream)
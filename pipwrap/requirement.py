@@ -0,0 +1,218 @@
+import io
+import re
+
+from .index import canonicalize_name
+
+
+VCS = ('git', 'hg', 'svn', 'bzr')
+
+# Per-requirement options pip accepts after a specifier, e.g. "Django==1.7 --hash=sha256:..."
+_REQUIREMENT_OPTION_RE = re.compile(r'\s--[A-Za-z]')
+
+# A comment starts with # at the start of a line or after whitespace, so #egg= is not one
+_COMMENT_RE = re.compile(r'(^|\s)#.*$')
+
+_EDITABLE_RE = re.compile(r'^(-e|--editable)(\s*=\s*|\s+|(?=[^\s=]))')
+
+_URL_RE = re.compile(
+    r'^(?P<scheme>(?:(?P<vcs>git|hg|svn|bzr)\+)?[A-Za-z][A-Za-z0-9+.-]*)://(?P<rest>.*)$')
+
+_VCS_URL_RE = re.compile(
+    r'^(?P<uri>[^#@]+://(?:[^/@]+@)?[^#@]+)(?:@(?P<revision>[^#]+))?(?:#(?P<fragment>.*))?$')
+
+_EGG_RE = re.compile(r'(?:^|&)egg=(?P<name>[^&]+)')
+
+_DIRECT_REFERENCE_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*\s*(\[[^\]]*\])?\s*@')
+
+_PATH_PREFIXES = ('.', '/', '~')
+
+_NAME_RE = re.compile(r'\s*(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*')
+
+_EXTRAS_RE = re.compile(r'\[(?P<extras>[^\]]*)\]\s*')
+
+_SPEC_RE = re.compile(r'\s*(?P<op>~=|===|==|!=|<=|>=|<|>)\s*(?P<version>[^\s,;()]+)\s*')
+
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9.]+')
+
+
+class RequirementParseError(ValueError):
+    pass
+
+
+class Requirement(object):
+    """ One requirement from a requirements file or pip freeze output. Attributes match those
+        of requirements-parser, plus the normalized name, environment markers and where the
+        requirement was read from.
+    """
+    __slots__ = ('line', 'editable', 'local_file', 'specifier', 'vcs', 'name', 'key', 'uri',
+                 'path', 'revision', 'extras', 'specs', 'markers', 'source', 'line_number')
+
+    def __init__(self, line, source=None, line_number=None):
+        self.line = line
+        self.editable = False
+        self.local_file = False
+        self.specifier = False
+        self.vcs = None
+        self.name = None
+        self.key = None
+        self.uri = None
+        self.path = None
+        self.revision = None
+        self.extras = []
+        self.specs = []
+        self.markers = None
+        self.source = source
+        self.line_number = line_number
+
+    def __repr__(self):
+        return '<Requirement: "%s">' % self.line
+
+    def _set_name(self, name):
+        if name:
+            self.name = name
+            self.key = canonicalize_name(name)
+
+    def _parse_location(self, location):
+        """ Parse a VCS URL, URL or local path, with an optional #egg=name fragment """
+        url_match = _URL_RE.match(location)
+        vcs = None
+        if url_match is not None:
+            vcs = url_match.group('vcs')
+            if url_match.group('scheme') in VCS:
+                vcs = url_match.group('scheme')
+        if vcs is not None:
+            vcs_match = _VCS_URL_RE.match(location)
+            if vcs_match is None:
+                raise RequirementParseError('Invalid VCS URL: %s' % location)
+            self.uri = vcs_match.group('uri')
+            self.revision = vcs_match.group('revision')
+            self.vcs = vcs
+            fragment = vcs_match.group('fragment') or ''
+        else:
+            location, _, fragment = location.partition('#')
+            if url_match is not None:
+                self.uri = location
+                self.local_file = url_match.group('scheme') == 'file'
+            else:
+                self.path = location
+                self.local_file = True
+        egg_match = _EGG_RE.search(fragment)
+        if egg_match is not None:
+            self._set_name(egg_match.group('name'))
+
+    def _parse_specifier(self, text):
+        """ Parse a PEP 508 specifier: name, extras, versions or a URL, and markers """
+        name_match = _NAME_RE.match(text)
+        if name_match is None:
+            raise RequirementParseError('Invalid requirement: %s' % text)
+        self._set_name(_SAFE_NAME_RE.sub('-', name_match.group('name')))
+        position = name_match.end()
+
+        extras_match = _EXTRAS_RE.match(text, position)
+        if extras_match is not None:
+            self.extras = [extra.strip() for extra in extras_match.group('extras').split(',')
+                           if extra.strip()]
+            position = extras_match.end()
+
+        rest = text[position:]
+        if rest.startswith('@'):
+            # Direct reference, e.g. "name @ https://...", where markers must follow " ;"
+            parts = re.split(r'\s+;\s*', rest[1:].strip(), 1)
+            if len(parts) > 1:
+                self.markers = parts[1]
+            self._parse_location(parts[0])
+            self._set_name(_SAFE_NAME_RE.sub('-', name_match.group('name')))
+            return
+
+        self.specifier = True
+        specs, _, markers = rest.partition(';')
+        if markers.strip():
+            self.markers = markers.strip()
+        specs = specs.strip()
+        if specs.startswith('(') and specs.endswith(')'):
+            specs = specs[1:-1]
+        if specs.strip():
+            for spec in specs.split(','):
+                spec_match = _SPEC_RE.match(spec)
+                if spec_match is None or spec_match.end() != len(spec):
+                    raise RequirementParseError('Invalid version specifier in: %s' % text)
+                self.specs.append((spec_match.group('op'), spec_match.group('version')))
+
+    @classmethod
+    def parse(cls, line, source=None, line_number=None):
+        """ Parse one logical line, without comments or continuations
+        :param line: Requirement line, e.g. 'Django>=1.7,<1.8' or '-e git+https://...#egg=x'
+        :param source: Name of the file the line was read from
+        :param line_number: Line number the requirement starts on
+        :return: Requirement
+        :raises: RequirementParseError if the line is not a valid requirement
+        """
+        editable_match = _EDITABLE_RE.match(line)
+        if editable_match is not None:
+            location = line[editable_match.end():].strip()
+            requirement = cls('-e %s' % location, source, line_number)
+            requirement.editable = True
+            requirement._parse_location(location)
+            return requirement
+
+        requirement = cls(line, source, line_number)
+        if (_URL_RE.match(line) is not None or line.startswith(_PATH_PREFIXES) or
+                ('#egg=' in line and _DIRECT_REFERENCE_RE.match(line) is None)):
+            requirement._parse_location(line)
+        else:
+            requirement._parse_specifier(line)
+        return requirement
+
+
+def iter_logical_lines(lines):
+    """ Join continuation lines and strip comments, as pip does
+    :param lines: Content of a requirements file, or an iterable of its lines, e.g. an open
+        file, which is then read one line at a time
+    :return: Generator of (line number, logical line), skipping blank lines
+    """
+    if hasattr(lines, 'splitlines'):
+        lines = io.StringIO(lines, newline=None)
+    parts = []
+    start = None
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if start is None:
+            start = line_number
+        if line.endswith('\\'):
+            parts.append(line[:-1])
+            continue
+        parts.append(line)
+        logical = ''.join(parts)
+        parts = []
+        if '#' in logical:
+            logical = _COMMENT_RE.sub('', logical)
+        logical = logical.strip()
+        if logical:
+            yield start, logical
+        start = None
+    if parts:
+        logical = _COMMENT_RE.sub('', ''.join(parts)).strip()
+        if logical:
+            yield start, logical
+
+
+def parse(lines, source=None):
+    """ Parse requirements, skipping options such as -r, -c and --index-url
+    :param lines: Content of a requirements file, or pip freeze output, or an iterable of their
+        lines, which are parsed as they arrive
+    :param source: Name of the file the lines were read from, for error messages
+    :return: Generator of Requirement
+    :raises: RequirementParseError if a line is not a valid requirement
+    """
+    for line_number, line in iter_logical_lines(lines):
+        if line.startswith('-') and _EDITABLE_RE.match(line) is None:
+            continue
+        option_match = _REQUIREMENT_OPTION_RE.search(line)
+        if option_match is not None:
+            line = line[:option_match.start()].rstrip()
+        try:
+            yield Requirement.parse(line, source, line_number)
+        except RequirementParseError as e:
+            if source is not None:
+                raise RequirementParseError('%s:%d: %s' % (source, line_number, e))
+            raise
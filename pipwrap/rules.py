@@ -0,0 +1,95 @@
+import fnmatch
+import io
+import re
+
+from .index import canonicalize_name, requirement_key
+
+# A comment starts with # at the start of a line or after whitespace, so re:a#b is a pattern
+_COMMENT_RE = re.compile(r'(^|\s)#.*$')
+
+
+class RulesError(ValueError):
+    pass
+
+
+class PlacementRules(object):
+    """ Rules deciding which requirements file a package goes into, so that packages can be
+        placed without prompting. Each line of a rules file is one of:
+
+            <pattern> <filename>      Glob on package name, e.g. "pytest-* test.txt"
+            re:<regex> <filename>     Regular expression on package name
+            default <filename>        File for packages no other rule matches
+
+        Package names are canonicalized (lowercase, runs of -_. replaced by -) before matching.
+        Rules are checked in order and the first match wins. Exact names are looked up in a
+        dictionary, so only wildcard rules are tested one by one.
+    """
+
+    def __init__(self, rules=(), default=None):
+        self.default = default
+        self._targets = []
+        self._exact = {}
+        self._patterns = []
+        for pattern, filename in rules:
+            self.add(pattern, filename)
+
+    def add(self, pattern, filename):
+        index = len(self._targets)
+        self._targets.append(filename)
+        if pattern.startswith('re:'):
+            regex = re.compile(pattern[len('re:'):] + r'\Z', re.IGNORECASE)
+            self._patterns.append((index, regex))
+        elif any(char in pattern for char in '*?['):
+            # Canonicalized like the names it matches, so pytest_* matches pytest-foo
+            regex = re.compile(fnmatch.translate(canonicalize_name(pattern)))
+            self._patterns.append((index, regex))
+        else:
+            self._exact.setdefault(canonicalize_name(pattern), index)
+
+    @classmethod
+    def parse(cls, text, source='<rules>'):
+        """ Parse rules from text
+        :param text: Rules, one per line, with # comments
+        :param source: Name of the rules file, for error messages
+        :return: PlacementRules
+        """
+        placement_rules = cls()
+        for line_number, line in enumerate(text.splitlines(), 1):
+            line = _COMMENT_RE.sub('', line).strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise RulesError("%s:%d: expected '<pattern> <filename>', got '%s'"
+                                 % (source, line_number, line))
+            pattern, filename = parts
+            if pattern == 'default':
+                placement_rules.default = filename
+                continue
+            try:
+                placement_rules.add(pattern, filename)
+            except re.error as e:
+                raise RulesError("%s:%d: invalid pattern '%s': %s"
+                                 % (source, line_number, pattern, e))
+        return placement_rules
+
+    @classmethod
+    def load(cls, filename):
+        with io.open(filename, encoding='utf-8') as rules_file:
+            return cls.parse(rules_file.read(), filename)
+
+    def match(self, package):
+        """ Find the requirements file a package should go into
+        :param package: Installed package
+        :return: Filename, or None if no rule matches and there is no default
+        """
+        key = requirement_key(package)
+        exact_index = self._exact.get(key)
+        for index, regex in self._patterns:
+            if exact_index is not None and index > exact_index:
+                break
+            if regex.match(key):
+                return self._targets[index]
+        if exact_index is not None:
+            return self._targets[exact_index]
+        return self.default
@@ -0,0 +1,44 @@
+class VersionChecker(object):
+    """ Checks installed versions against requirement specifiers, compiling each distinct
+        specifier and version once no matter how many requirements share it.
+    """
+
+    def __init__(self):
+        self._specifiers = {}
+        self._versions = {}
+
+    def _get_specifier(self, spec):
+        try:
+            return self._specifiers[spec]
+        except KeyError:
+            from packaging.specifiers import InvalidSpecifier, SpecifierSet
+            try:
+                specifier = SpecifierSet(spec)
+            except InvalidSpecifier:
+                specifier = None
+            self._specifiers[spec] = specifier
+            return specifier
+
+    def _get_version(self, version):
+        try:
+            return self._versions[version]
+        except KeyError:
+            from packaging.version import InvalidVersion, Version
+            try:
+                parsed = Version(version)
+            except InvalidVersion:
+                parsed = None
+            self._versions[version] = parsed
+            return parsed
+
+    def satisfies(self, version, spec):
+        """ Check whether a version satisfies a specifier
+        :param version: Installed version, e.g. '3.2.18'
+        :param spec: Specifier, e.g. '==3.2.1' or '>=1.7,<1.8'
+        :return: True or False, or None if either could not be parsed
+        """
+        specifier = self._get_specifier(spec)
+        parsed = self._get_version(version)
+        if specifier is None or parsed is None:
+            return None
+        return specifier.contains(parsed, prereleases=True)
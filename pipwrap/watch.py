@@ -0,0 +1,105 @@
+import os
+
+from .discovery import FREEZE_EXCLUDES, get_distribution_line, is_distribution_entry
+from .index import InstalledIndex, canonicalize_name
+from .parsing import read_requirements_file
+from .requirement import Requirement
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime
+
+
+class WatchedEnvironment(object):
+    """ Requirements files and installed packages kept in memory and updated incrementally.
+        Each poll only stats files and directories; requirements files are re-parsed, and
+        distribution metadata re-read, only for entries that changed since the last poll.
+    """
+
+    def __init__(self, requirements_dir, paths, cache=None):
+        self.requirements_dir = requirements_dir
+        self.paths = paths
+        self.cache = cache
+        self.req_files = {}
+        self.installed_index = InstalledIndex([])
+        self._req_file_keys = {}
+        self._dir_mtimes = {}
+        self._distributions = dict((path, {}) for path in paths)
+
+    def _update_requirements(self):
+        changed = False
+        filenames = set(filename for filename in os.listdir(self.requirements_dir)
+                        if not filename.startswith('.'))
+        for filename in set(self.req_files) - filenames:
+            del self.req_files[filename]
+            del self._req_file_keys[filename]
+            changed = True
+        for filename in filenames:
+            path = os.path.join(self.requirements_dir, filename)
+            try:
+                key = _stat_key(path)
+            except OSError:
+                continue
+            if self._req_file_keys.get(filename) == key:
+                continue
+            self.req_files[filename] = read_requirements_file(path, self.cache)
+            self._req_file_keys[filename] = key
+            changed = True
+        return changed
+
+    def _update_directory(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if self._dir_mtimes.get(path, -1) == mtime:
+            return False
+        self._dir_mtimes[path] = mtime
+
+        distributions = self._distributions[path]
+        entries = set()
+        if mtime is not None:
+            entries = set(entry for entry in os.listdir(path) if is_distribution_entry(entry))
+        changed = False
+        for entry in set(distributions) - entries:
+            del distributions[entry]
+            changed = True
+        for entry in entries:
+            try:
+                key = _stat_key(os.path.join(path, entry))
+                if entry in distributions and distributions[entry][0] == key:
+                    continue
+                name, line = get_distribution_line(path, entry)
+            except (IOError, OSError):
+                continue
+            if name:
+                distributions[entry] = (key, name, Requirement.parse(line))
+                changed = True
+        return changed
+
+    def _rebuild_index(self):
+        # Earlier paths take precedence, as in discovery.scan_installed
+        seen = set(canonicalize_name(name) for name in FREEZE_EXCLUDES)
+        packages = []
+        for path in self.paths:
+            distributions = self._distributions[path]
+            for entry in sorted(distributions):
+                key, name, package = distributions[entry]
+                canonical_name = canonicalize_name(name)
+                if canonical_name not in seen:
+                    seen.add(canonical_name)
+                    packages.append(package)
+        self.installed_index = InstalledIndex(packages)
+
+    def poll(self):
+        """ Bring requirements files and installed packages up to date
+        :return: True if anything changed since the last poll
+        """
+        requirements_changed = self._update_requirements()
+        installed_changed = False
+        for path in self.paths:
+            installed_changed = self._update_directory(path) or installed_changed
+        if installed_changed:
+            self._rebuild_index()
+        return requirements_changed or installed_changed
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+
+from .index import canonicalize_name
+
+
+# Prefers a standalone packaging, falling back to the copy vendored in pip, which every
+# virtualenv has
+_SUPPORTED_TAGS_SCRIPT = '''
+import json
+try:
+    from packaging import tags
+except ImportError:
+    from pip._vendor.packaging import tags
+print(json.dumps([str(tag) for tag in tags.sys_tags()]))
+'''
+
+
+def get_supported_tags(python=None):
+    """ Get the wheel tags an interpreter can install
+    :param python: Path to the interpreter of a target virtualenv, or None for the current one
+    :return: List of 'python-abi-platform' tags, most preferred first
+    """
+    if python:
+        import subprocess
+        output = subprocess.check_output([python, '-c', _SUPPORTED_TAGS_SCRIPT],
+                                         universal_newlines=True)
+        return json.loads(output)
+    from packaging import tags
+    return [str(tag) for tag in tags.sys_tags()]
+
+
+def parse_wheel_filename(filename):
+    """ Get the project, version and tags of a wheel from its filename
+    :param filename: Wheel filename, e.g. 'Django-1.7-py2.py3-none-any.whl'
+    :return: Tuple of (canonical name, version, list of 'python-abi-platform' tags), or None if
+        the filename is not a wheel's
+    """
+    if not filename.endswith('.whl'):
+        return None
+    parts = filename[:-len('.whl')].split('-')
+    # name-version[-build]-python-abi-platform, where each tag may be a .-separated set
+    if len(parts) not in (5, 6):
+        return None
+    pythons, abis, platforms = parts[-3:]
+    tags = ['%s-%s-%s' % (python, abi, platform) for python in pythons.split('.')
+            for abi in abis.split('.') for platform in platforms.split('.')]
+    return canonicalize_name(parts[0]), parts[1], tags
+
+
+def _get_mtime(directory):
+    try:
+        return os.stat(directory).st_mtime
+    except OSError:
+        return None
+
+
+class WheelhouseIndex(object):
+    """ Wheels in local directories, indexed by canonical project name. The index only depends
+        on filenames, so it is cached until a wheel is added, removed or renamed, which changes
+        the modification time of its directory; reusing it only takes one stat per directory.
+    """
+
+    def __init__(self, wheels, directories=None):
+        self.wheels = wheels
+        self.directories = directories or {}
+
+    def __len__(self):
+        return sum(len(wheels) for wheels in self.wheels.values())
+
+    def find(self, name):
+        """ Find the wheels of a project
+        :param name: Project name
+        :return: List of (version, filename, tags)
+        """
+        return self.wheels.get(canonicalize_name(name), [])
+
+    @classmethod
+    def from_directories(cls, directories, cache=None):
+        """ Index the wheels in local directories
+        :param directories: Directories to search, recursively
+        :param cache: Optional Cache of indexes
+        :return: WheelhouseIndex
+        """
+        roots = [os.path.abspath(directory) for directory in directories]
+        key = hashlib.sha1('\0'.join(roots).encode('utf-8')).hexdigest()
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                index = cls(**json.loads(cached))
+                if all(_get_mtime(directory) == mtime
+                       for directory, mtime in index.directories.items()):
+                    return index
+
+        wheels = {}
+        mtimes = {}
+        for root in roots:
+            mtimes[root] = _get_mtime(root)
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                mtimes[dirpath] = _get_mtime(dirpath)
+                for filename in sorted(filenames):
+                    parsed = parse_wheel_filename(filename)
+                    if parsed is not None:
+                        name, version, tags = parsed
+                        wheels.setdefault(name, []).append((version, filename, tags))
+        index = cls(wheels, mtimes)
+        if cache is not None:
+            cache.set(key, json.dumps({'wheels': wheels, 'directories': mtimes}))
+        return index
@@ -0,0 +1,40 @@
+import errno
+import io
+import os
+import uuid
+
+
+# os.replace overwrites existing files on all platforms, but is not available in python 2
+_replace = getattr(os, 'replace', os.rename)
+
+
+def write_atomic(filename, content):
+    """ Write a file via a temporary file in the same directory, so readers never see it
+        partially written, skipping the write if the file already has the same content
+    :param filename: Path of the file to write
+    :param content: Text to write
+    :return: True if the file was written, False if it was unchanged
+    """
+    data = content.encode('utf-8')
+    try:
+        with io.open(filename, 'rb') as existing_file:
+            if existing_file.read() == data:
+                return False
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+    directory, basename = os.path.split(filename)
+    temp_filename = os.path.join(directory, '.%s.%s.tmp' % (basename, uuid.uuid4().hex))
+    # os.open applies the umask, unlike tempfile.mkstemp which always creates 0600 files
+    handle = os.open(temp_filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with io.open(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        if os.path.exists(filename):
+            os.chmod(temp_filename, os.stat(filename).st_mode & 0o7777)
+        _replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+    return True
@@ -29,7 +29,7 @@ setup(
     install_requires=install_requires,
     tests_require=tests_require,
 
-    packages=find_packages(exclude=['*test*']),
+    packages=find_packages(exclude=['*test*', 'benchmarks', 'benchmarks.*']),
 
     entry_points={
         'console_scripts': [
@@ -0,0 +1,382 @@
+import os
+from mock import ANY, MagicMock, patch
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pipwrap import api, requirement
+from pipwrap.graph import DependencyGraph
+from pipwrap.rules import PlacementRules
+from pipwrap.wheelhouse import WheelhouseIndex
+from .test_discovery import create_dist_info, freeze_process
+from .test_git import create_repository, write_files
+
+
+def _create_requirements_file(requirements_dir, filename, content):
+    with open(os.path.join(requirements_dir, filename), 'w') as req_file:
+        req_file.write(content)
+
+
+class TestEnvironment(unittest.TestCase):
+
+    def test_installed_lines(self):
+        environment = api.Environment(installed=['mock==1.1', '-e git+https://x/y.git#egg=y'])
+
+        installed_index = environment.installed_index
+
+        self.assertEqual(['-e git+https://x/y.git#egg=y', 'mock==1.1'],
+                         sorted(package.line for package in installed_index.packages))
+        self.assertTrue(environment.installed_index is installed_index)
+
+    def test_installed_callable_refresh(self):
+        source = MagicMock(return_value=list(requirement.parse('mock==1.1')))
+        environment = api.Environment(installed=source)
+
+        environment.installed_index
+        environment.installed_index
+        environment.refresh()
+        environment.installed_index
+
+        self.assertEqual(2, source.call_count)
+
+    def test_discover_metadata_cached(self):
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'mock', '1.1')
+        cache = MagicMock()
+        cache.get.return_value = None
+        environment = api.Environment(paths=[site_packages], cache=cache)
+
+        self.assertEqual(['mock==1.1'],
+                         [package.line for package in environment.installed_index.packages])
+        cache.set.assert_called_once_with(ANY, 'mock==1.1')
+
+    @patch('pipwrap.discovery.get_search_paths')
+    def test_search_paths_empty(self, mock_get_search_paths):
+        environment = api.Environment(paths=[])
+
+        self.assertEqual([], environment.search_paths)
+        self.assertEqual(0, len(environment.installed_index))
+        self.assertFalse(mock_get_search_paths.called)
+
+    @patch('subprocess.Popen')
+    def test_discover_freeze(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\n')
+        environment = api.Environment('/venv/bin/python', discovery='freeze')
+
+        self.assertEqual(['mock==1.1'],
+                         [package.line for package in environment.installed_index.packages])
+        self.assertEqual(['/venv/bin/python', '-m', 'pip', 'freeze'],
+                         mock_popen.call_args[0][0])
+
+    def test_installed_streamed(self):
+        environment = api.Environment(paths=['/site-packages'])
+        with patch('pipwrap.discovery.scan_installed',
+                   return_value=iter(['mock==1.1', 'six==1.12'])):
+            with patch('pipwrap.api.parse', side_effect=api.parse) as mock_parse:
+                packages = environment.installed_index.packages
+
+        # Lines are handed to the parser as they are found, not joined up first
+        self.assertFalse(hasattr(mock_parse.call_args[0][0], 'splitlines'))
+        self.assertEqual(['mock==1.1', 'six==1.12'],
+                         sorted(package.line for package in packages))
+
+    @patch('pipwrap.api.get_marker_environment')
+    def test_with_markers(self, mock_get_marker_environment):
+        mock_get_marker_environment.return_value = {'sys_platform': 'linux',
+                                                    'python_version': '3.11'}
+        source = MagicMock(return_value=['mock==1.1'])
+        environment = api.Environment(installed=source)
+
+        windows = environment.with_markers({'sys_platform': 'win32'})
+
+        self.assertTrue(windows.installed_index is environment.installed_index)
+        self.assertEqual(1, source.call_count)
+        self.assertEqual({'sys_platform': 'win32', 'python_version': '3.11'},
+                         windows.marker_environment)
+        self.assertTrue(environment.markers.applies('sys_platform == "linux"'))
+        self.assertFalse(windows.markers.applies('sys_platform == "linux"'))
+        self.assertEqual(1, mock_get_marker_environment.call_count)
+
+    @patch('subprocess.check_call')
+    def test_uninstall(self, mock_check_call):
+        environment = api.Environment(installed=['mock==1.1'])
+
+        environment.uninstall(['mock', 'nose', 'six'], batch_size=2)
+
+        self.assertEqual([([sys.executable, '-m', 'pip', 'uninstall', '-y', 'mock', 'nose'],),
+                          ([sys.executable, '-m', 'pip', 'uninstall', '-y', 'six'],)],
+                         [call[0] for call in mock_check_call.call_args_list])
+
+    @patch('subprocess.check_call')
+    def test_uninstall_target_interpreter(self, mock_check_call):
+        environment = api.Environment('/venv/bin/python', installed=['mock==1.1'])
+
+        environment.uninstall(['mock'])
+
+        mock_check_call.assert_called_once_with(['/venv/bin/python', '-m', 'pip', 'uninstall',
+                                                 '-y', 'mock'])
+
+
+class TestProject(unittest.TestCase):
+
+    def setUp(self):
+        self.requirements_dir = os.path.join(tempfile.mkdtemp(), 'requirements')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.requirements_dir), True)
+        self.graph = DependencyGraph()
+        self.graph.add('Django', ['pytz'])
+
+    def _create_project(self):
+        os.makedirs(self.requirements_dir)
+        _create_requirements_file(self.requirements_dir, 'common.txt', 'Django==1.7\nsix\n')
+        _create_requirements_file(self.requirements_dir, 'test.txt', '-r common.txt\nmock\n')
+        return api.Project(self.requirements_dir)
+
+    def _create_environment(self, installed):
+        return api.Environment(installed=installed, dependency_graph=self.graph)
+
+    def test_missing_directory(self):
+        project = api.Project(self.requirements_dir)
+
+        self.assertEqual({}, project.req_files)
+        self.assertFalse(os.path.exists(self.requirements_dir))
+
+    def test_lint(self):
+        project = self._create_project()
+        environment = self._create_environment(['Django==1.8', 'mock==1.1', 'nose==1.3'])
+
+        with patch('pipwrap.api.read_requirements_file',
+                   side_effect=api.read_requirements_file) as mock_read:
+            project.reload()
+            first = project.lint(environment)
+            second = project.lint(self._create_environment(['six==1.12']))
+
+        self.assertEqual(2, mock_read.call_count)
+        self.assertEqual([('version-mismatch', 'Django'), ('missing', 'six'),
+                          ('extra', 'nose')],
+                         [(record['kind'], record['package']) for record in first.discrepancies])
+        self.assertEqual([], first.problems)
+        self.assertEqual(['test.txt'], sorted(first.environments))
+        self.assertFalse(first.ok)
+        self.assertEqual(['Django', 'mock'],
+                         [record['package'] for record in second.of_kind('missing')])
+
+    def test_lint_since(self):
+        root = os.path.dirname(self.requirements_dir)
+        create_repository(root, {
+            'requirements/common.txt': 'Django==1.7\nsix\n',
+            'requirements/test.txt': '-r common.txt\nmock\nnose\npytz\n',
+            'requirements/docs.txt': 'sphinx\n',
+        })
+        write_files(root, {
+            'requirements/test.txt': '-r common.txt\n-r missing.txt\nmock\npytest\n',
+            'requirements/docs.txt': None,
+        })
+        project = api.Project(self.requirements_dir)
+        environment = self._create_environment(['Django==1.8', 'mock==1.1', 'nose==1.3',
+                                                'sphinx==2.0'])
+
+        with patch('pipwrap.api.read_requirements_file',
+                   side_effect=api.read_requirements_file) as mock_read:
+            diff = project.lint_since(environment, 'HEAD')
+
+        self.assertEqual({'test.txt': 'M', 'docs.txt': 'D'}, diff.changed)
+        self.assertEqual([('missing', 'pytest'), ('extra', 'nose'), ('extra', 'sphinx'),
+                          ('include', None)],
+                         [(record['kind'], record.get('package')) for record in diff.new])
+        self.assertEqual('included file missing.txt not found', diff.new[-1]['message'])
+        # Discrepancies in unchanged files, such as six missing, are not reported
+        self.assertEqual([('missing', 'pytz', 'test.txt')],
+                         [(record['kind'], record['package'], record['file'])
+                          for record in diff.resolved])
+        self.assertFalse(diff.ok)
+        # Only changed files that existed at the revision are read from git
+        self.assertEqual(2, len([call for call in mock_read.call_args_list
+                                 if call[1].get('data') is not None]))
+
+    def test_lint_since_unchanged(self):
+        root = os.path.dirname(self.requirements_dir)
+        create_repository(root, {'requirements/common.txt': 'Django\n'})
+        project = api.Project(self.requirements_dir)
+        environment = self._create_environment(['six==1.12'])
+
+        diff = project.lint_since(environment, 'HEAD')
+
+        self.assertEqual({}, diff.changed)
+        self.assertTrue(diff.ok)
+        self.assertEqual(None, project._req_files)
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['cp37-cp37m-manylinux1_x86_64', 'py3-none-any']
+        project = self._create_project()
+        _create_requirements_file(self.requirements_dir, 'production.txt',
+                                  'Django==1.7\nnumpy==1.16.0\npywin32; sys_platform == "win32"\n'
+                                  '-e git+https://github.com/org/repo.git#egg=repo\n')
+        wheelhouse = WheelhouseIndex({
+            'django': [('1.7', 'Django-1.7-py2.py3-none-any.whl', ['py3-none-any'])],
+            'numpy': [('1.16.0', 'numpy-1.16.0-cp37-cp37m-win_amd64.whl',
+                       ['cp37-cp37m-win_amd64'])],
+            'mock': [('1.0', 'mock-1.0-py3-none-any.whl', ['py3-none-any'])],
+        })
+        environment = api.Environment(markers={'sys_platform': 'linux'})
+
+        check = project.check_wheelhouse(environment, wheelhouse)
+
+        self.assertEqual([
+            ('missing', 'six', 'common.txt', []),
+            ('incompatible', 'numpy', 'production.txt', ['numpy-1.16.0-cp37-cp37m-win_amd64.whl']),
+        ], [(record['kind'], record['package'], record['file'], record['available'])
+            for record in check.records])
+        self.assertEqual(3, check.wheels)
+        self.assertFalse(check.ok)
+        mock_get_supported_tags.assert_called_once_with(None)
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse_version(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['py3-none-any']
+        project = self._create_project()
+        wheelhouse = WheelhouseIndex({
+            'django': [('1.8', 'Django-1.8-py3-none-any.whl', ['py3-none-any'])],
+            'six': [('1.12.0', 'six-1.12.0-py3-none-any.whl', ['py3-none-any'])],
+            'mock': [('1.0', 'mock-1.0-py3-none-any.whl', ['py3-none-any'])],
+        })
+
+        check = project.check_wheelhouse(api.Environment(), wheelhouse)
+
+        self.assertEqual([{'kind': 'missing', 'package': 'Django', 'file': 'common.txt',
+                           'required_spec': '==1.7', 'available': ['1.8']}], check.records)
+
+    def test_lint_markers(self):
+        project = self._create_project()
+        _create_requirements_file(self.requirements_dir, 'production.txt',
+                                  'pywin32; sys_platform == "win32"\n'
+                                  'dataclasses; python_version < "3.7"\n')
+        environment = api.Environment(installed=['dataclasses==0.6'],
+                                      markers={'sys_platform': 'linux', 'python_version': '3.11'})
+
+        lint_result = project.lint(environment)
+
+        self.assertEqual([], lint_result.of_kind('extra'))
+        self.assertEqual([], [record for record in lint_result.of_kind('missing')
+                              if record['file'] == 'production.txt'])
+
+        lint_result = project.lint(environment.with_markers({'sys_platform': 'win32'}))
+
+        self.assertEqual(['pywin32'], [record['package']
+                                       for record in lint_result.of_kind('missing')
+                                       if record['file'] == 'production.txt'])
+
+    def test_generate(self):
+        project = self._create_project()
+        environment = self._create_environment(['Django==1.8', 'pytz==2019.1', 'six==1.12',
+                                                'nose==1.3'])
+
+        result = project.generate(environment, PlacementRules([('nose', 'test.txt')]),
+                                  clean=True)
+
+        self.assertEqual(['common.txt', 'test.txt'], result.written)
+        self.assertEqual(['pytz'], [package.name for package in result.added['common.txt']])
+        self.assertEqual(['nose'], [package.name for package in result.added['test.txt']])
+        self.assertEqual([('common.txt', 'django')], list(result.dependencies.values()))
+        common_reqs = open(os.path.join(self.requirements_dir, 'common.txt'))
+        self.assertEqual('Django==1.8\npytz==2019.1\nsix==1.12\n', common_reqs.read())
+        test_reqs = open(os.path.join(self.requirements_dir, 'test.txt'))
+        self.assertEqual('-r common.txt\nnose==1.3\n', test_reqs.read())
+        self.assertEqual(['nose'],
+                         [package.name for package in project.req_files['test.txt'].packages])
+
+    def test_generate_keeps_requirements_excluded_by_markers(self):
+        project = self._create_project()
+        _create_requirements_file(self.requirements_dir, 'production.txt',
+                                  'pywin32==227; sys_platform == "win32"\nsix==1.11\n')
+        environment = api.Environment(installed=['six==1.12'], dependency_graph=self.graph,
+                                      markers={'sys_platform': 'linux'})
+
+        project.generate(environment, clean=True)
+
+        production_reqs = open(os.path.join(self.requirements_dir, 'production.txt'))
+        self.assertEqual('pywin32==227; sys_platform == "win32"\nsix==1.12\n',
+                         production_reqs.read())
+
+    def test_generate_unplaced(self):
+        project = self._create_project()
+        environment = self._create_environment(['flake8==2.5'])
+        choose_file = MagicMock(return_value=None)
+
+        result = project.generate(environment, choose_file=choose_file)
+
+        self.assertEqual(['flake8'], [package.name for package in result.unplaced])
+        choose_file.assert_called_once_with(result.unplaced[0], ['common.txt', 'test.txt'])
+        self.assertEqual([], result.written)
+        common_reqs = open(os.path.join(self.requirements_dir, 'common.txt'))
+        self.assertEqual('Django==1.7\nsix\n', common_reqs.read())
+
+    def test_generate_creates_directory(self):
+        project = api.Project(self.requirements_dir)
+
+        result = project.generate(self._create_environment(['mock==1.1']),
+                                  PlacementRules(default='dev.txt'))
+
+        self.assertEqual(['dev.txt', 'requirements.txt'], result.written)
+        dev_reqs = open(os.path.join(self.requirements_dir, 'dev.txt'))
+        self.assertEqual('mock==1.1\n', dev_reqs.read())
+
+    def test_removal_plan(self):
+        project = self._create_project()
+        environment = self._create_environment(['Django==1.8', 'pytz==2019.1', 'nose==1.3',
+                                                '-e http://example.com/repo.git'])
+
+        plan = project.removal_plan(environment)
+
+        self.assertEqual(['nose'], plan.package_names)
+        self.assertEqual(['-e http://example.com/repo.git'],
+                         [package.line for package in plan.unnamed])
+        self.assertEqual(['django'], list(plan.kept.values()))
+        django = [package for package in project.req_files['common.txt'].packages
+                  if package.name == 'Django'][0]
+        self.assertEqual([('==', '1.7')], django.specs)
+
+    @patch('pipwrap.graph.DependencyGraph.from_paths')
+    def test_removal_plan_injected_without_graph(self, mock_from_paths):
+        project = self._create_project()
+        environment = api.Environment(installed=['Django==1.8', 'pytz==2019.1'])
+
+        plan = project.removal_plan(environment)
+
+        self.assertEqual(['pytz'], plan.package_names)
+        self.assertEqual({}, plan.kept)
+        self.assertFalse(mock_from_paths.called)
+
+    def test_iter_locked(self):
+        project = self._create_project()
+        _create_requirements_file(self.requirements_dir, 'production.txt', 'Django\n')
+        environment = self._create_environment(['Django==1.8', 'pytz==2019.1', 'mock==1.1'])
+
+        locked = [(root, [package.line for package in packages],
+                   [package.line for package in missing])
+                  for root, packages, missing in project.iter_locked(environment)]
+
+        self.assertEqual([('production.txt', ['Django==1.8', 'pytz==2019.1'], []),
+                          ('test.txt', ['Django==1.8', 'mock==1.1', 'pytz==2019.1'], ['six'])],
+                         locked)
+
+    def test_render_lockfile(self):
+        packages = list(requirement.parse('Django==1.7\n-e git+https://x/y.git#egg=y\n'))
+
+        content = api.render_lockfile('common.txt', packages[:1], {'django': ['sha256:a',
+                                                                              'sha256:b']})
+
+        self.assertEqual('# Locked from common.txt by pipwrap\n'
+                         'Django==1.7 \\\n    --hash=sha256:a \\\n    --hash=sha256:b\n',
+                         content)
+        self.assertEqual('# Locked from common.txt by pipwrap\nDjango==1.7\n'
+                         '-e git+https://x/y.git#egg=y\n',
+                         api.render_lockfile('common.txt', packages))
+
+    def test_render_lockfile_partially_hashed(self):
+        packages = list(requirement.parse('Django==1.7\nmock==1.2\n'))
+
+        with self.assertRaises(ValueError):
+            api.render_lockfile('common.txt', packages, {'django': ['sha256:a']})
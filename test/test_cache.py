@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from pipwrap import cache
+from .test_discovery import create_dist_info
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.site_packages = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.site_packages, ignore_errors=True)
+
+    def test_fingerprint_unchanged(self):
+        create_dist_info(self.site_packages, 'mock', '1.2')
+
+        first = cache.fingerprint_environment([self.site_packages], 'python')
+        second = cache.fingerprint_environment([self.site_packages, '/does/not/exist'], 'python')
+
+        self.assertEqual(first, second)
+
+    def test_fingerprint_changes_on_install(self):
+        create_dist_info(self.site_packages, 'mock', '1.2')
+        before = cache.fingerprint_environment([self.site_packages])
+
+        create_dist_info(self.site_packages, 'nose', '1.3')
+
+        self.assertNotEqual(before, cache.fingerprint_environment([self.site_packages]))
+
+    def test_fingerprint_changes_with_extra(self):
+        self.assertNotEqual(cache.fingerprint_environment([self.site_packages], 'python2'),
+                            cache.fingerprint_environment([self.site_packages], 'python3'))
+
+    def test_fingerprint_ignores_other_files(self):
+        before = cache.fingerprint_environment([self.site_packages])
+
+        open(os.path.join(self.site_packages, 'module.py'), 'w').close()
+
+        self.assertEqual(before, cache.fingerprint_environment([self.site_packages]))
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = cache.Cache(self.cache_dir, 'installed', max_entries=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_get_missing(self):
+        self.assertEqual(None, self.cache.get('abc'))
+
+    def test_set_and_get(self):
+        self.cache.set('abc', u'mock==1.2\n')
+
+        self.assertEqual(u'mock==1.2\n', self.cache.get('abc'))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('first', u'1')
+        self.cache.set('second', u'2')
+        past = time.time() - 100
+        os.utime(self.cache._get_filename('first'), (past, past))
+        os.utime(self.cache._get_filename('second'), (past + 1, past + 1))
+        self.cache.get('first')
+
+        self.cache.set('third', u'3')
+
+        self.assertEqual(u'1', self.cache.get('first'))
+        self.assertEqual(None, self.cache.get('second'))
+        self.assertEqual(u'3', self.cache.get('third'))
+
+    @patch('pipwrap.writing._replace')
+    def test_set_ignores_errors(self, mock_replace):
+        mock_replace.side_effect = OSError()
+
+        self.cache.set('abc', u'mock==1.2\n')
+
+        self.assertEqual(None, self.cache.get('abc'))
+        self.assertEqual([], os.listdir(self.cache.cache_dir))
+
+    @patch.dict('os.environ', {'XDG_CACHE_HOME': '/xdg'})
+    def test_get_default_cache_dir_xdg(self):
+        self.assertEqual(os.path.join('/xdg', 'pipwrap'), cache.get_default_cache_dir())
+
+    @patch.dict('os.environ', {'XDG_CACHE_HOME': ''})
+    def test_get_default_cache_dir(self):
+        expected = os.path.join(os.path.expanduser('~'), '.cache', 'pipwrap')
+        self.assertEqual(expected, cache.get_default_cache_dir())
@@ -5,11 +5,6 @@ import unittest
 from pipwrap import cli
 
 
-class MockPackage():
-    def __init__(self):
-        self.version = 0.4
-
-
 class TestCli(unittest.TestCase):
 
     def setUp(self):
@@ -21,9 +16,24 @@ class TestCli(unittest.TestCase):
         error_message = cli.verify_args(args)
 
         expected_error = ('Must specify --requirements-files (-r) or --remove-missing (-x) '
-                          'or --lint (-l).')
+                          'or --lint (-l) or --wheelhouse (-w).')
         self.assertEqual(expected_error, error_message)
 
+    def test_verify_args_two_modes(self):
+        args = self.parser.parse_args(['-l', '-w', 'wheelhouse'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertTrue(error_message.startswith('Must specify'))
+
+    def test_verify_args_wheelhouse(self):
+        args = self.parser.parse_args(['-w', 'wheelhouse', '-w', 'vendor', '--format', 'jsonl'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual(None, error_message)
+        self.assertEqual(['wheelhouse', 'vendor'], args.wheelhouse)
+
     def test_verify_args_generate(self):
         args = self.parser.parse_args(['-r'])
 
@@ -45,6 +55,23 @@ class TestCli(unittest.TestCase):
 
         self.assertEqual(None, error_message)
 
+    def test_verify_args_remove_extra_site_packages(self):
+        args = self.parser.parse_args(['-x', '--site-packages', '/venv/lib/site-packages'])
+
+        error_message = cli.verify_args(args)
+
+        expected_error = ('-x with --site-packages requires --python, to uninstall packages '
+                          'with its pip')
+        self.assertEqual(expected_error, error_message)
+
+    def test_verify_args_remove_extra_site_packages_python(self):
+        args = self.parser.parse_args(['-x', '--site-packages', '/venv/lib/site-packages',
+                                       '--python', '/venv/bin/python'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual(None, error_message)
+
     def test_verify_args_remove_extra_clean(self):
         args = self.parser.parse_args(['-x', '-c'])
 
@@ -53,6 +80,136 @@ class TestCli(unittest.TestCase):
         expected_error = "-c is only supported with -r"
         self.assertEqual(expected_error, error_message)
 
+    def test_verify_args_rules_without_generate(self):
+        args = self.parser.parse_args(['-l', '--rules', 'rules.txt'])
+
+        error_message = cli.verify_args(args)
+
+        expected_error = '--rules, --default-file and --no-input are only supported with -r'
+        self.assertEqual(expected_error, error_message)
+
+    def test_verify_args_format_without_lint(self):
+        args = self.parser.parse_args(['-r', '--format', 'json'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--format is only supported with -l or -w', error_message)
+
+    def test_verify_args_watch_freeze(self):
+        args = self.parser.parse_args(['-l', '--watch', '--discovery', 'freeze'])
+
+        error_message = cli.verify_args(args)
+
+        expected_error = ('--watch is only supported with -l, text output, a single virtualenv '
+                          'and --discovery metadata')
+        self.assertEqual(expected_error, error_message)
+
+    def test_verify_args_marker_env_without_lint(self):
+        args = self.parser.parse_args(['-r', '--marker-env', 'sys_platform=win32'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--marker-env is only supported with -l', error_message)
+
+    def test_verify_args_marker_env_invalid(self):
+        args = self.parser.parse_args(['-l', '--marker-env', 'win32'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual("Invalid --marker-env: expected name=value, got 'win32'", error_message)
+
+    def test_verify_args_monorepo_without_lint(self):
+        args = self.parser.parse_args(['-r', '--monorepo', '.'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--monorepo is only supported with -l, a single virtualenv and marker '
+                         'environment, and without --watch', error_message)
+
+    def test_verify_args_since_with_monorepo(self):
+        args = self.parser.parse_args(['-l', '--since', 'HEAD', '--monorepo', '.'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--since is only supported with -l, a single virtualenv and marker '
+                         'environment, and without --watch or --monorepo', error_message)
+
+    def test_verify_args_since(self):
+        args = self.parser.parse_args(['-l', '--since', 'origin/master', '--format', 'json'])
+
+        self.assertEqual(None, cli.verify_args(args))
+
+    def test_verify_args_project_glob_without_monorepo(self):
+        args = self.parser.parse_args(['-l', '--project-glob', 'requirements'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--project-glob is only supported with --monorepo', error_message)
+
+    def test_verify_args_serve(self):
+        args = self.parser.parse_args(['--serve'])
+
+        self.assertEqual(None, cli.verify_args(args))
+
+    def test_verify_args_serve_with_lint(self):
+        args = self.parser.parse_args(['--serve', '-l'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--serve cannot be combined with -r, -x, -l or -w', error_message)
+
+    def test_verify_args_dry_run_without_remove(self):
+        args = self.parser.parse_args(['-l', '--dry-run'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--dry-run is only supported with -x', error_message)
+
+    def test_verify_args_hash_dir_without_lock(self):
+        args = self.parser.parse_args(['-r', '--hash-dir', 'wheels'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--lock-dir and --hash-dir are only supported with --lock', error_message)
+
+    def test_verify_args_omit_dependencies_without_generate(self):
+        args = self.parser.parse_args(['-x', '--omit-dependencies'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--omit-dependencies is only supported with -r', error_message)
+
+    def test_verify_args_batch_size(self):
+        args = self.parser.parse_args(['-x', '--batch-size', '0'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('--batch-size must be at least 1', error_message)
+
+    def test_verify_args_multiple_python(self):
+        args = self.parser.parse_args(['-r', '--python', 'python2', '--python', 'python3'])
+
+        error_message = cli.verify_args(args)
+
+        self.assertEqual('Multiple --python options are only supported with -l', error_message)
+
+    def test_verify_args_multiple_python_site_packages(self):
+        args = self.parser.parse_args(['-l', '--python', 'python2', '--python', 'python3',
+                                       '--site-packages', 'lib'])
+
+        error_message = cli.verify_args(args)
+
+        expected_error = '--site-packages is not supported with multiple --python options'
+        self.assertEqual(expected_error, error_message)
+
+    def test_verify_args_site_packages_freeze(self):
+        args = self.parser.parse_args(['-l', '--discovery', 'freeze', '--site-packages', 'lib'])
+
+        error_message = cli.verify_args(args)
+
+        expected_error = '--site-packages is only supported with --discovery metadata'
+        self.assertEqual(expected_error, error_message)
+
     @patch('argparse.ArgumentParser.exit')
     def test_error(self, mock_exit):
         cli.error(self.parser, 'An error occurred!')
@@ -76,17 +233,24 @@ class TestCli(unittest.TestCase):
         except SystemExit as e:
             self.assertEqual('0', str(e))
 
-    @patch('pkg_resources.require')
-    def test_main_version(self, mock_require):
+    @patch('importlib.metadata.version')
+    def test_main_version(self, mock_version):
         sys.argv = ['pipwrap', '--version']
-        mock_require.return_value = [MockPackage()]
+        mock_version.return_value = '0.4'
 
         try:
             cli.main()
             self.fail("Should exit on version request")
         except SystemExit as e:
             self.assertEqual('pipwrap 0.4', '{0}'.format(e))
-        mock_require.assert_called_once_with('pipwrap')
+        mock_version.assert_called_once_with('pipwrap')
+
+    @patch('importlib.metadata.version')
+    def test_get_version_not_installed(self, mock_version):
+        from importlib.metadata import PackageNotFoundError
+        mock_version.side_effect = PackageNotFoundError('pipwrap')
+
+        self.assertEqual('unknown', cli.get_version())
 
     @patch('pipwrap.command.Command.run')
     def test_main_success(self, mock_run):
@@ -1,11 +1,19 @@
+import json
 import os
+import pstats
 import sys
 from mock import MagicMock, patch
 import shutil
 import tempfile
 import unittest
 
-from pipwrap import cli, command
+from pipwrap import api, cli, command, profiling
+from .test_discovery import create_dist_info, freeze_process
+from .test_git import create_repository, write_files
+from .test_wheelhouse import create_wheels
+
+
+FREEZE_ARGS = ['--discovery', 'freeze', '--no-cache', '--ignore-dependencies']
 
 
 def get_key(requirement):
@@ -24,7 +32,7 @@ class TestCommand(unittest.TestCase):
     def setUp(self):
         self.parser = cli.create_parser()
         tempdir = tempfile.mkdtemp()
-        self.command = command.Command(self.parser.parse_args([]), tempdir)
+        self.command = command.Command(self.parser.parse_args(FREEZE_ARGS), tempdir)
         self.command._get_filename_key = MagicMock(return_value=0)
 
     def tearDown(self):
@@ -39,15 +47,15 @@ class TestCommand(unittest.TestCase):
         self.assertEqual('test.text', filename)
 
     def test_generate_requirements_files_no_data(self):
-        self.command._get_installed_packages = MagicMock(return_value=set())
+        self.command._get_environment = MagicMock(return_value=api.Environment(installed=[]))
 
         self.command.generate_requirements_files()
 
         self.assertTrue(os.path.exists(self.command.requirements_dir))
 
-    @patch('subprocess.check_output')
-    def test_generate_requirements_files_create(self, mock_check_output):
-        mock_check_output.return_value = 'mock==1.1\nflake8==2.5\n'
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_create(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\nflake8==2.5\n')
 
         self.command.generate_requirements_files()
 
@@ -55,9 +63,9 @@ class TestCommand(unittest.TestCase):
         common_reqs = open(os.path.join(self.command.requirements_dir, 'requirements.txt'))
         self.assertEqual('flake8==2.5\nmock==1.1\n', common_reqs.read())
 
-    @patch('subprocess.check_output')
-    def test_generate_requirements_files_update(self, mock_check_output):
-        mock_check_output.return_value = 'mock==1.1\nflake8==2.5\n'
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_update(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\nflake8==2.5\n')
         _create_requirements_file(self.command.requirements_dir, 'common.txt',
                                   'mock==1.2\nDjango==1.7\nnose==1.3\n')
 
@@ -67,21 +75,21 @@ class TestCommand(unittest.TestCase):
         common_reqs = open(os.path.join(self.command.requirements_dir, 'common.txt'))
         self.assertEqual('Django==1.7\nflake8==2.5\nmock==1.1\nnose==1.3\n', common_reqs.read())
 
-    @patch('subprocess.check_output')
-    def test_run_generate_requirements_files(self, mock_check_output):
+    @patch('subprocess.Popen')
+    def test_run_generate_requirements_files(self, mock_popen):
         vcs_line = ('-e git://github.com/jessamynsmith/django_coverage_plugin.git@'
                     'f03bdc0981ceface4bfea6aa3544e519a2b908aa#egg=django-coverage-plugin')
         uri_line = '-e http://example.com/some-repo.git'
         uri_line2 = '-e http://anotherexample.com/some-repo.git'
         uri_line3 = '-e http://athirdrepo.com/some-repo.git'
-        mock_check_output.return_value = ('mock==1.1\nflake8==2.5\nDjango==1.7\n%s\n%s\n%s\n'
-                                          % (uri_line, vcs_line, uri_line2))
+        mock_popen.return_value = freeze_process('mock==1.1\nflake8==2.5\nDjango==1.7\n%s\n%s\n%s\n'
+                                                 % (uri_line, vcs_line, uri_line2))
         _create_requirements_file(self.command.requirements_dir, 'common.txt',
                                   content='Django==1.7\ngunicorn\n')
         content = ('-r common.txt\nmock==1.2\n%s\nnose==1.3\n%s\n%s\n'
                    % (vcs_line, uri_line, uri_line3))
         _create_requirements_file(self.command.requirements_dir, 'development.txt', content=content)
-        self.command.args = self.parser.parse_args(['-rc'])
+        self.command.args = self.parser.parse_args(['-rc'] + FREEZE_ARGS)
 
         self.command.run()
 
@@ -92,6 +100,241 @@ class TestCommand(unittest.TestCase):
         expected = '-r common.txt\n%s\n%s\nmock==1.1\n' % (vcs_line, uri_line)
         self.assertEqual(expected, dev_reqs.read())
 
+    def test_get_installed_packages_metadata(self):
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'mock', '1.1')
+        self.command.args = self.parser.parse_args(['-l', '--no-cache', '--site-packages',
+                                                    site_packages])
+
+        installed = self.command._get_installed_packages()
+
+        self.assertEqual(['mock==1.1'], [package.line for package in installed])
+
+    @patch('pipwrap.discovery.scan_installed')
+    def test_get_installed_packages_cached(self, mock_scan_installed):
+        site_packages = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        create_dist_info(site_packages, 'mock', '1.1')
+        mock_scan_installed.return_value = ['mock==1.1']
+        self.command.args = self.parser.parse_args(['-l', '--cache-dir', cache_dir,
+                                                    '--site-packages', site_packages])
+
+        first = self.command._get_installed_packages()
+        second = self.command._get_installed_packages()
+
+        self.assertEqual(['mock==1.1'], [package.line for package in first])
+        self.assertEqual(['mock==1.1'], [package.line for package in second])
+        self.assertEqual(1, mock_scan_installed.call_count)
+
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_many(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\n')
+        for i in range(api.PARALLEL_WRITE_THRESHOLD + 1):
+            _create_requirements_file(self.command.requirements_dir, 'env%d.txt' % i,
+                                      'mock==1.%d\n' % i)
+        _create_requirements_file(self.command.requirements_dir, '.env.txt.tmp', 'nose\n')
+        unchanged_filename = os.path.join(self.command.requirements_dir, 'env1.txt')
+        os.utime(unchanged_filename, (0, 0))
+
+        self.command.generate_requirements_files()
+
+        for i in range(api.PARALLEL_WRITE_THRESHOLD + 1):
+            env_reqs = open(os.path.join(self.command.requirements_dir, 'env%d.txt' % i))
+            self.assertEqual('mock==1.1\n', env_reqs.read())
+        self.assertEqual(0, os.path.getmtime(unchanged_filename))
+        self.assertFalse(self.command._get_filename_key.called)
+
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_rules(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\nflake8==2.5\nDjango==1.7\n')
+        rules_filename = os.path.join(self.command.requirements_dir, '.rules')
+        with open(rules_filename, 'w') as rules_file:
+            rules_file.write('mock test.txt\nflake8 test.txt\n')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt', 'gunicorn\n')
+        self.command.args = self.parser.parse_args(['-r', '--rules', rules_filename,
+                                                    '--default-file', 'common.txt'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        self.assertFalse(self.command._get_filename_key.called)
+        common_reqs = open(os.path.join(self.command.requirements_dir, 'common.txt'))
+        self.assertEqual('Django==1.7\ngunicorn\n', common_reqs.read())
+        test_reqs = open(os.path.join(self.command.requirements_dir, 'test.txt'))
+        self.assertEqual('flake8==2.5\nmock==1.1\n', test_reqs.read())
+
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_no_input(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.1\nflake8==2.5\n')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt', 'gunicorn\n')
+        self.command.args = self.parser.parse_args(['-r', '--no-input'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        self.assertFalse(self.command._get_filename_key.called)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['No placement rule for packages:', 'flake8', 'mock'], lines[2:5])
+        common_reqs = open(os.path.join(self.command.requirements_dir, 'common.txt'))
+        self.assertEqual('gunicorn\n', common_reqs.read())
+
+    def _create_dependency_site_packages(self):
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'Django', '1.7', requires=['pytz'])
+        create_dist_info(site_packages, 'pytz', '2019.1')
+        create_dist_info(site_packages, 'mock', '1.2')
+        return site_packages
+
+    def test_generate_requirements_files_places_dependencies(self):
+        site_packages = self._create_dependency_site_packages()
+        _create_requirements_file(self.command.requirements_dir, 'common.txt', 'Django==1.7\n')
+        _create_requirements_file(self.command.requirements_dir, 'test.txt',
+                                  '-r common.txt\nDjango==1.7\n')
+        self.command.args = self.parser.parse_args(['-r', '--no-cache', '--default-file',
+                                                    'test.txt', '--site-packages', site_packages])
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        self.assertFalse(self.command._get_filename_key.called)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual("Adding 'pytz' to common.txt (required by django)", lines[2])
+        common_reqs = open(os.path.join(self.command.requirements_dir, 'common.txt'))
+        self.assertEqual('Django==1.7\npytz==2019.1\n', common_reqs.read())
+        test_reqs = open(os.path.join(self.command.requirements_dir, 'test.txt'))
+        self.assertEqual('-r common.txt\nDjango==1.7\nmock==1.2\n', test_reqs.read())
+
+    def test_generate_requirements_files_omit_dependencies(self):
+        site_packages = self._create_dependency_site_packages()
+        _create_requirements_file(self.command.requirements_dir, 'common.txt',
+                                  'Django==1.7\npytz\n')
+        self.command.args = self.parser.parse_args(['-rc', '--no-cache', '--omit-dependencies',
+                                                    '--default-file', 'common.txt',
+                                                    '--site-packages', site_packages])
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual("Removing 'pytz' from common.txt (required by django)", lines[2])
+        common_reqs = open(os.path.join(self.command.requirements_dir, 'common.txt'))
+        self.assertEqual('Django==1.7\nmock==1.2\n', common_reqs.read())
+
+    def _run_lock(self, wheels):
+        site_packages = self._create_dependency_site_packages()
+        wheelhouse = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, wheelhouse, True)
+        for filename in wheels:
+            with open(os.path.join(wheelhouse, filename), 'wb') as wheel:
+                wheel.write(filename.encode('utf-8'))
+        lock_dir = os.path.join(wheelhouse, 'lock')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt', 'Django\nsix\n')
+        _create_requirements_file(self.command.requirements_dir, 'test.txt',
+                                  '-r common.txt\nmock\n')
+        self.command.args = self.parser.parse_args(['-r', '--no-cache', '--lock', '--lock-dir',
+                                                    lock_dir, '--hash-dir', wheelhouse,
+                                                    '--site-packages', site_packages])
+        return self.command.run(), lock_dir
+
+    def test_generate_requirements_files_lock(self):
+        result, lock_dir = self._run_lock(['Django-1.7-py2.py3-none-any.whl',
+                                           'mock-1.2-py2.py3-none-any.whl',
+                                           'pytz-2019.1-py2.py3-none-any.whl'])
+
+        self.assertEqual(0, result)
+        self.assertEqual(['test.txt'], os.listdir(lock_dir))
+        lock = open(os.path.join(lock_dir, 'test.txt')).read().split('\n')
+        self.assertEqual('# Locked from test.txt by pipwrap', lock[0])
+        self.assertEqual(['Django==1.7 \\', 'mock==1.2 \\', 'pytz==2019.1 \\'], lock[1::2][:3])
+        for line in lock[2::2][:3]:
+            self.assertTrue(line.startswith('    --hash=sha256:'))
+        self.assertEqual('', lock[-1])
+        self.assertTrue('test.txt: 3 packages\n  not installed, left out: six\n'
+                        in sys.stdout.getvalue())
+
+    def test_generate_requirements_files_lock_not_all_hashed(self):
+        result, lock_dir = self._run_lock(['Django-1.7-py2.py3-none-any.whl'])
+
+        self.assertEqual(1, result)
+        self.assertFalse(os.path.exists(os.path.join(lock_dir, 'test.txt')))
+        self.assertTrue('test.txt: not written, no local archive to hash: mock, pytz\n'
+                        in sys.stdout.getvalue())
+
+    @patch('subprocess.Popen')
+    def test_generate_requirements_files_clean_constraints(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.8\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'constraints.txt',
+                                  'Django==1.7\npytz==2019.1\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  '-c constraints.txt\nDjango\nmock\n')
+        self.command.args = self.parser.parse_args(['-rc'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        constraints = open(os.path.join(self.command.requirements_dir, 'constraints.txt'))
+        self.assertEqual('Django==1.8\npytz==2019.1\n', constraints.read())
+        production = open(os.path.join(self.command.requirements_dir, 'production.txt'))
+        self.assertEqual('-c constraints.txt\nDjango==1.8\nnose==1.3\n', production.read())
+
+    def test_generate_requirements_files_invalid_rules(self):
+        self.command.args = self.parser.parse_args(['-r', '--rules', 'missing'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+
+    @patch('time.sleep')
+    def test_watch(self, mock_sleep):
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'mock', '1.1')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt', 'nose\n')
+
+        def install_nose(interval):
+            if mock_sleep.call_count == 2:
+                create_dist_info(site_packages, 'nose', '1.3')
+                os.utime(site_packages, (0, 0))
+            elif mock_sleep.call_count > 2:
+                raise KeyboardInterrupt()
+
+        mock_sleep.side_effect = install_nose
+        self.command.args = self.parser.parse_args(['-l', '--watch', '--no-cache',
+                                                    '--site-packages', site_packages])
+
+        self.assertRaises(KeyboardInterrupt, self.command.run)
+
+        output = sys.stdout.getvalue().split('Watching for changes (press Ctrl-C to stop)')
+        self.assertEqual(3, len(output))
+        self.assertTrue('\nnose\n---' in output[0])
+        self.assertTrue('\nmock\n---' in output[0])
+        self.assertTrue('Changes found in' in output[1])
+        self.assertFalse('\nnose\n---' in output[1])
+        self.assertEqual(3, mock_sleep.call_count)
+
+    @patch('pipwrap.api.get_marker_environment')
+    @patch('time.sleep')
+    def test_watch_target_interpreter(self, mock_sleep, mock_get_marker_environment):
+        mock_get_marker_environment.return_value = {'sys_platform': 'win32'}
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'pywin32', '224')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt',
+                                  'pywin32; sys_platform == "win32"\n')
+        mock_sleep.side_effect = KeyboardInterrupt()
+        self.command.args = self.parser.parse_args(['-l', '--watch', '--no-cache', '--python',
+                                                    '/venv/bin/python', '--site-packages',
+                                                    site_packages])
+
+        self.assertRaises(KeyboardInterrupt, self.command.run)
+
+        mock_get_marker_environment.assert_called_once_with('/venv/bin/python')
+        self.assertFalse('pywin32' in sys.stdout.getvalue())
+
     def test_run_invalid_option(self):
         result = self.command.run()
 
@@ -104,18 +347,18 @@ class TestRemoveExtra(unittest.TestCase):
     def setUp(self):
         self.parser = cli.create_parser()
         tempdir = tempfile.mkdtemp()
-        self.command = command.Command(self.parser.parse_args([]), tempdir)
+        self.command = command.Command(self.parser.parse_args(FREEZE_ARGS), tempdir)
 
     def tearDown(self):
         shutil.rmtree(self.command.requirements_dir, ignore_errors=True)
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_remove_extra_packages_with_dashe_directive(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = \
-            'mock==1.2\nDjango==1.7\nnose==1.3\n' \
-            '-e http://example.com/some-repo.git\n' \
-            'django-nose==1.0\n'
+    def test_remove_extra_packages_with_dashe_directive(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process(
+            'mock==1.2\nDjango==1.7\nnose==1.3\n'
+            '-e http://example.com/some-repo.git\n'
+            'django-nose==1.0\n')
         _create_requirements_file(self.command.requirements_dir,
                                   'mock==1.2\nDjango==1.7\nnose==1.3\n')
 
@@ -127,30 +370,32 @@ class TestRemoveExtra(unittest.TestCase):
         self.assertEqual("django-nose", extras[1].name)
         self.assertFalse(mock_check_call.called)
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_remove_extra_packages_when_none_to_remove(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = 'mock==1.2\nDjango==1.7\nnose==1.3\n'
+    def test_remove_extra_packages_when_none_to_remove(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\nnose==1.3\n')
         _create_requirements_file(self.command.requirements_dir)
 
         self.command.remove_extra_packages()
 
         self.assertFalse(mock_check_call.called)
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_remove_extra_packages_when_some_to_remove(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = 'mock==1.2\nDjango==1.7\nnose==1.3\ndjango-nose==1.0\n'
+    def test_remove_extra_packages_when_some_to_remove(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process(
+            'mock==1.2\nDjango==1.7\nnose==1.3\ndjango-nose==1.0\n')
         _create_requirements_file(self.command.requirements_dir)
 
         self.command.remove_extra_packages()
 
-        mock_check_call.assert_called_once_with(['pip', 'uninstall', '-y', 'django-nose'])
+        mock_check_call.assert_called_once_with([sys.executable, '-m', 'pip', 'uninstall', '-y',
+                                                 'django-nose'])
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_lint(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = 'mock==1.2\nDjango==1.7\nnose==1.3\n'
+    def test_lint(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\nnose==1.3\n')
         _create_requirements_file(self.command.requirements_dir)
 
         self.command.lint()
@@ -162,12 +407,46 @@ class TestRemoveExtra(unittest.TestCase):
         self.assertEqual('---------------------------------------------------', lines[8])
         self.assertFalse(mock_check_call.called)
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
+    def test_run_lint_profile(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\n')
+        _create_requirements_file(self.command.requirements_dir)
+        trace_filename = os.path.join(self.command.requirements_dir, '.trace.json')
+        self.command = command.Command(self.parser.parse_args(
+            ['-l', '--profile-output', trace_filename] + FREEZE_ARGS),
+            os.path.dirname(self.command.requirements_dir))
+
+        self.command.run()
+
+        profile = sys.stderr.getvalue()
+        self.assertTrue('\nProfile:\nPhase' in profile)
+        self.assertTrue('\ninstalled packages        2\n' in profile)
+        self.assertTrue('\nrequirements parsed       3\n' in profile)
+        with open(trace_filename) as trace_file:
+            phases = set(event['name'] for event in json.load(trace_file)['traceEvents'])
+        # Without a cache, lines are parsed as they are read, within discovery and parsing
+        self.assertEqual(set(['discovery', 'parsing', 'matching', 'includes']), phases)
+
+    @patch('subprocess.Popen')
+    def test_run_lint_cprofile(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\n')
+        _create_requirements_file(self.command.requirements_dir)
+        stats_filename = os.path.join(self.command.requirements_dir, '.lint.prof')
+        self.command.args = self.parser.parse_args(['-l', '--profile-output', stats_filename] +
+                                                   FREEZE_ARGS)
+        self.command.profiler = profiling.Profiler()
+
+        self.command.run()
+
+        stats = pstats.Stats(stats_filename)
+        self.assertTrue(any(function[2] == '_run' for function in stats.stats))
+
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_run_lint(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = 'mock==1.2\nDjango==1.7\ndjango-nose==1.0\n'
+    def test_run_lint(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\ndjango-nose==1.0\n')
         _create_requirements_file(self.command.requirements_dir)
-        self.command.args = self.parser.parse_args(['-l'])
+        self.command.args = self.parser.parse_args(['-l'] + FREEZE_ARGS)
 
         self.command.run()
 
@@ -180,13 +459,502 @@ class TestRemoveExtra(unittest.TestCase):
         self.assertEqual('---------------------------------------------------', lines[10])
         self.assertFalse(mock_check_call.called)
 
-    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
+    def test_lint_includes(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'common.txt',
+                                  'Django==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'development.txt',
+                                  '-r common.txt\n-r missing.txt\nmock==1.2\nnose==1.3\n')
+
+        result = self.command.lint()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual('Requirements per environment:', lines[14])
+        self.assertEqual('development.txt: 3 packages (common.txt, development.txt)', lines[16])
+        self.assertEqual('Problems with included requirements files:', lines[19])
+        self.assertEqual('development.txt: included file missing.txt not found', lines[21])
+        self.assertEqual('development.txt: nose listed in common.txt, development.txt',
+                         lines[22])
+
+    @patch('subprocess.Popen')
+    def test_lint_environments(self, mock_popen):
+        freeze_output = {
+            '/py2/bin/python': 'mock==1.2\nDjango==1.7\nnose==1.3\n',
+            '/py3/bin/python': 'Django==1.7\nnose==1.3\nenum34==1.0\n',
+        }
+        mock_popen.side_effect = lambda args, **kwargs: freeze_process(freeze_output[args[0]])
+        _create_requirements_file(self.command.requirements_dir)
+        self.command.args = self.parser.parse_args(['-l', '--python', '/py2/bin/python',
+                                                    '--python', '/py3/bin/python'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['1. /py2/bin/python', '2. /py3/bin/python'], lines[3:5])
+        self.assertEqual(['Packages present in requirements but not installed:',
+                          '---------------------------------------------------',
+                          'Package  1 2',
+                          'mock     . X',
+                          '---------------------------------------------------',
+                          '',
+                          'Packages installed but not present in requirements:',
+                          '---------------------------------------------------',
+                          'Package  1 2',
+                          'enum34   . X',
+                          '---------------------------------------------------'], lines[6:17])
+
+    @patch('subprocess.Popen')
+    def test_lint_environments_includes(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  '-r missing.txt\nDjango==1.7\nnose==1.3\n')
+        self.command.args = self.parser.parse_args(['-l', '--marker-env', 'sys_platform=linux',
+                                                    '--marker-env', 'sys_platform=win32'] +
+                                                   FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        self.assertTrue('Problems with included requirements files:\n'
+                        '---------------------------------------------------\n'
+                        'production.txt: included file missing.txt not found\n'
+                        in sys.stdout.getvalue())
+
+    @patch('subprocess.Popen')
+    def test_lint_marker_environments(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  'Django==1.7\npywin32; sys_platform == "win32"\nnose==1.3\n')
+        self.command.args = self.parser.parse_args(['-l', '--marker-env', 'sys_platform=linux',
+                                                    '--marker-env', 'sys_platform=win32'] +
+                                                   FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        self.assertEqual(1, mock_popen.call_count)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['1. sys_platform=linux', '2. sys_platform=win32'], lines[3:5])
+        self.assertEqual(['Packages present in requirements but not installed:',
+                          '---------------------------------------------------',
+                          'Package  1 2',
+                          'pywin32  . X',
+                          '---------------------------------------------------'], lines[6:11])
+
+    @patch('subprocess.Popen')
+    def test_lint_marker_environment(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  'Django==1.7\npywin32; sys_platform == "win32"\n')
+        self.command.args = self.parser.parse_args(['-l', '--marker-env', 'sys_platform=linux'] +
+                                                   FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+
+    @patch('subprocess.Popen')
+    def test_lint_monorepo(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\nmock==1.2\nsix==1.12\n')
+        root = os.path.dirname(self.command.requirements_dir)
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  'Django==1.8\n')
+        os.makedirs(os.path.join(root, 'web'))
+        _create_requirements_file(os.path.join(root, 'web'), 'requirements.txt',
+                                  'Django\nnose\n')
+        self.command.args = self.parser.parse_args(['-l', '--monorepo', root] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual('Discrepancies between requirements files and virtualenv in 2 projects',
+                         lines[0])
+        self.assertEqual('nose (%s)' % os.path.join('web', 'requirements.txt'), lines[4])
+        self.assertEqual(['Packages installed but not present in any requirements:',
+                          '---------------------------------------------------',
+                          'mock',
+                          'six',
+                          '---------------------------------------------------'], lines[7:12])
+        production = os.path.join('requirements', 'production.txt')
+        self.assertEqual('Django 1.7 (%s requires ==1.8)' % production, lines[15])
+        self.assertEqual(['requirements: 1 files, 1 problems', 'web: 1 files, 1 problems'],
+                         lines[24:26])
+
+    @patch('subprocess.Popen')
+    def test_lint_monorepo_jsonl(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\n')
+        root = os.path.dirname(self.command.requirements_dir)
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  'Django\nnose\n')
+        self.command.args = self.parser.parse_args(['-l', '--monorepo', root, '--project-glob',
+                                                    'requirements', '--format', 'jsonl'] +
+                                                   FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        records = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual([('missing', 'requirements', 'nose'), ('summary', None, None)],
+                         [(record['kind'], record.get('project'), record.get('package'))
+                          for record in records])
+        self.assertEqual(1, records[-1]['projects'])
+
+    @patch('pipwrap.discovery.iter_freeze')
+    def test_lint_since(self, mock_iter_freeze):
+        mock_iter_freeze.return_value = ['Django==1.7', 'mock==1.2']
+        root = os.path.dirname(self.command.requirements_dir)
+        create_repository(root, {'requirements/production.txt': 'Django==1.7\nnose\n',
+                                 'requirements/test.txt': 'mock\n'})
+        write_files(root, {'requirements/production.txt': 'Django==1.8\n'})
+        self.command.args = self.parser.parse_args(['-l', '--since', 'HEAD'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['Changed requirements files:',
+                          '---------------------------------------------------',
+                          'M production.txt',
+                          '---------------------------------------------------',
+                          '',
+                          'New discrepancies:',
+                          '---------------------------------------------------',
+                          'version-mismatch: Django 1.7 (production.txt requires ==1.8)',
+                          '---------------------------------------------------',
+                          '',
+                          'Resolved discrepancies:',
+                          '---------------------------------------------------',
+                          'missing: nose (production.txt)',
+                          '---------------------------------------------------'], lines[2:16])
+
+    @patch('pipwrap.discovery.iter_freeze')
+    def test_lint_since_jsonl(self, mock_iter_freeze):
+        mock_iter_freeze.return_value = ['Django==1.7']
+        root = os.path.dirname(self.command.requirements_dir)
+        create_repository(root, {'requirements/production.txt': 'Django\nnose\n'})
+        write_files(root, {'requirements/production.txt': 'Django\n'})
+        self.command.args = self.parser.parse_args(['-l', '--since', 'HEAD', '--format',
+                                                    'jsonl'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        records = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual([('missing', 'resolved', 'nose'), ('summary', None, None)],
+                         [(record['kind'], record.get('change'), record.get('package'))
+                          for record in records])
+        self.assertEqual(['production.txt'], records[-1]['changed'])
+
+    def test_lint_since_not_a_repository(self):
+        self.command.args = self.parser.parse_args(['-l', '--since', 'HEAD'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        output = sys.stdout.getvalue()
+        self.assertTrue(output.startswith('Cannot compare with HEAD: '))
+        self.assertTrue('not a git repository' in output)
+
+    def _create_wheelhouse(self, requirements='Django==1.7\nnumpy==1.16.0\nsix\n'):
+        _create_requirements_file(self.command.requirements_dir, 'production.txt', requirements)
+        wheelhouse = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, wheelhouse, True)
+        create_wheels(wheelhouse, ['Django-1.8-py3-none-any.whl',
+                                   'numpy-1.16.0-cp37-cp37m-win_amd64.whl',
+                                   'six-1.12.0-py2.py3-none-any.whl'])
+        return wheelhouse
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['cp37-cp37m-manylinux1_x86_64', 'py3-none-any']
+        wheelhouse = self._create_wheelhouse()
+        self.command.args = self.parser.parse_args(['-w', wheelhouse, '--no-cache'])
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual('Requirements that cannot be installed from 3 wheels in %s' % wheelhouse,
+                         lines[0])
+        self.assertEqual(['Packages with no wheel of a required version:',
+                          '---------------------------------------------------',
+                          'Django==1.7 (production.txt; available: 1.8)',
+                          '---------------------------------------------------',
+                          '',
+                          'Packages with no wheel for the target platform:',
+                          '---------------------------------------------------',
+                          'numpy==1.16.0 (production.txt; available: '
+                          'numpy-1.16.0-cp37-cp37m-win_amd64.whl)',
+                          '---------------------------------------------------'], lines[2:11])
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse_constraints(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['py3-none-any']
+        wheelhouse = self._create_wheelhouse('-c constraints.txt\nDjango\nsix\n')
+        _create_requirements_file(self.command.requirements_dir, 'constraints.txt',
+                                  'Django==1.7\nnotinstalled==1.0\nsix==1.12.0\n')
+        self.command.args = self.parser.parse_args(['-w', wheelhouse, '--no-cache', '--format',
+                                                    'jsonl'])
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        records = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual([{'kind': 'missing', 'package': 'Django', 'file': 'constraints.txt',
+                           'required_spec': '==1.7', 'available': ['1.8']}], records[:-1])
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse_jsonl(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['cp37-cp37m-manylinux1_x86_64', 'py3-none-any']
+        wheelhouse = self._create_wheelhouse()
+        self.command.args = self.parser.parse_args(['-w', wheelhouse, '--no-cache', '--format',
+                                                    'jsonl'])
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        records = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual([{'kind': 'missing', 'package': 'Django', 'file': 'production.txt',
+                           'required_spec': '==1.7', 'available': ['1.8']},
+                          {'kind': 'incompatible', 'package': 'numpy', 'file': 'production.txt',
+                           'required_spec': '==1.16.0',
+                           'available': ['numpy-1.16.0-cp37-cp37m-win_amd64.whl']},
+                          {'kind': 'summary', 'counts': {'missing': 1, 'incompatible': 1},
+                           'files': 1, 'wheels': 3}], records)
+
+    @patch('pipwrap.api.get_supported_tags')
+    def test_check_wheelhouse_json(self, mock_get_supported_tags):
+        mock_get_supported_tags.return_value = ['cp37-cp37m-win_amd64', 'py3-none-any']
+        wheelhouse = self._create_wheelhouse('Django\nnumpy==1.16.0\nsix\n')
+        self.command.args = self.parser.parse_args(['-w', wheelhouse, '--no-cache', '--format',
+                                                    'json'])
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        self.assertEqual({'discrepancies': [],
+                          'summary': {'counts': {'missing': 0, 'incompatible': 0}, 'files': 1,
+                                      'wheels': 3}},
+                         json.loads(sys.stdout.getvalue()))
+
+    @patch('pipwrap.command.query')
+    def test_lint_daemon(self, mock_query):
+        socket_path = os.path.join(self.command.requirements_dir, '.pipwrap.sock')
+        open(socket_path, 'w').close()
+        mock_query.return_value = {'status': 1, 'output': 'From the daemon\n'}
+        self.command.args = self.parser.parse_args(['-l', '--no-cache', '--socket', socket_path,
+                                                    '--site-packages', '/site-packages'])
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        self.assertEqual('From the daemon\n', sys.stdout.getvalue())
+        request = mock_query.call_args[0][1]
+        self.assertEqual(['/site-packages'], request['paths'])
+        self.assertEqual(os.path.abspath(self.command.requirements_dir),
+                         request['requirements_dir'])
+
+    @patch('pipwrap.command.query')
+    def test_lint_daemon_not_running(self, mock_query):
+        mock_query.return_value = None
+        socket_path = os.path.join(self.command.requirements_dir, '.pipwrap.sock')
+        open(socket_path, 'w').close()
+        self.command.args = self.parser.parse_args(['-l', '--no-cache', '--socket', socket_path,
+                                                    '--site-packages', '/site-packages'])
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        self.assertEqual(1, mock_query.call_count)
+        self.assertTrue(sys.stdout.getvalue().startswith(
+            'Discrepancies between requirements files and virtualenv\n'))
+
+    @patch('pipwrap.command.query')
+    def test_lint_no_daemon(self, mock_query):
+        socket_path = os.path.join(self.command.requirements_dir, '.pipwrap.sock')
+        open(socket_path, 'w').close()
+        self.command.args = self.parser.parse_args(['-l', '--no-cache', '--socket', socket_path,
+                                                    '--no-daemon', '--site-packages',
+                                                    '/site-packages'])
+
+        self.command.run()
+
+        self.assertFalse(mock_query.called)
+
+    @patch('pipwrap.command.Daemon')
+    @patch('signal.signal')
+    def test_serve(self, mock_signal, mock_daemon):
+        self.command.args = self.parser.parse_args(['--serve', '--socket', '/tmp/pipwrap.sock',
+                                                    '--no-cache'])
+
+        result = self.command.run()
+
+        self.assertEqual(0, result)
+        mock_daemon.assert_called_once_with('/tmp/pipwrap.sock', self.command._print_lint,
+                                            cache=None)
+        mock_daemon.return_value.serve_forever.assert_called_once_with()
+        self.assertEqual('Listening on /tmp/pipwrap.sock (press Ctrl-C to stop)\n',
+                         sys.stdout.getvalue())
+
+    @patch('subprocess.Popen')
+    def test_lint_constraints(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'constraints.txt',
+                                  'Django==1.7\npytz==2019.1\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  '-c constraints.txt\nDjango\nnose\n')
+
+        result = self.command.lint()
+
+        self.assertEqual(0, result)
+
+    @patch('subprocess.Popen')
+    def test_lint_constraints_version_mismatch(self, mock_popen):
+        mock_popen.return_value = freeze_process('Django==1.8\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'constraints.txt',
+                                  'Django==1.7\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  '-c constraints.txt\nDjango\n')
+
+        result = self.command.lint()
+
+        self.assertEqual(1, result)
+        output = sys.stdout.getvalue()
+        self.assertTrue('Django 1.8 (constraints.txt requires ==1.7)\n' in output)
+        self.assertTrue('Packages installed but not present in requirements:\n'
+                        '---------------------------------------------------\n'
+                        'nose\n' in output)
+
+    @patch('subprocess.Popen')
+    def test_lint_version_mismatch(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==3.2.18\nnose==1.3\n')
+        _create_requirements_file(self.command.requirements_dir, 'production.txt',
+                                  'Django==3.2.1\nmock>=1.0\nnose\n')
+
+        result = self.command.lint()
+
+        self.assertEqual(1, result)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual('Packages installed but not satisfying requirements:', lines[10])
+        self.assertEqual('Django 3.2.18 (production.txt requires ==3.2.1)', lines[12])
+        self.assertEqual('---------------------------------------------------', lines[13])
+
+    @patch('subprocess.Popen')
+    def test_lint_jsonl(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\ndjango-nose==1.0\n')
+        _create_requirements_file(self.command.requirements_dir)
+        self.command.args = self.parser.parse_args(['-l', '--format', 'jsonl'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        records = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual({'kind': 'missing', 'package': 'nose', 'file': 'packages.txt',
+                          'installed_version': None, 'required_spec': '==1.3'}, records[0])
+        self.assertEqual({'kind': 'extra', 'package': 'django-nose', 'file': None,
+                          'installed_version': '1.0', 'required_spec': None}, records[1])
+        self.assertEqual({'kind': 'include', 'file': 'packages.txt',
+                          'message': 'included file common.txt not found'}, records[2])
+        summary = records[3]
+        self.assertEqual('summary', summary['kind'])
+        self.assertEqual({'missing': 1, 'extra': 1, 'version-mismatch': 0, 'include': 1},
+                         summary['counts'])
+        self.assertEqual(1, summary['files'])
+        self.assertEqual([3], summary['installed'])
+        self.assertEqual(['comparison', 'discovery', 'parsing'], sorted(summary['timings']))
+
+    @patch('subprocess.Popen')
+    def test_lint_json_environments(self, mock_popen):
+        freeze_output = {
+            '/py2/bin/python': 'mock==1.2\nDjango==1.7\nnose==1.3\n',
+            '/py3/bin/python': 'Django==1.7\nnose==1.3\n',
+        }
+        mock_popen.side_effect = lambda args, **kwargs: freeze_process(freeze_output[args[0]])
+        _create_requirements_file(self.command.requirements_dir, content='mock\nDjango\nnose\n')
+        self.command.args = self.parser.parse_args(['-l', '--format', 'json',
+                                                    '--python', '/py2/bin/python',
+                                                    '--python', '/py3/bin/python'] + FREEZE_ARGS)
+
+        result = self.command.run()
+
+        self.assertEqual(1, result)
+        document = json.loads(sys.stdout.getvalue())
+        self.assertEqual([{'kind': 'missing', 'package': 'mock', 'file': 'packages.txt',
+                           'installed_version': None, 'required_spec': None,
+                           'environment': '/py3/bin/python'}], document['discrepancies'])
+        self.assertEqual([3, 2], document['summary']['installed'])
+
+    def _create_dependency_site_packages(self):
+        site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, site_packages, True)
+        create_dist_info(site_packages, 'Django', '1.7', requires=['pytz'])
+        create_dist_info(site_packages, 'pytz', '2019.1')
+        create_dist_info(site_packages, 'mock', '1.2')
+        create_dist_info(site_packages, 'nose', '1.3')
+        create_dist_info(site_packages, 'six', '1.12')
+        return site_packages
+
+    @patch('pipwrap.api.get_marker_environment', return_value={})
+    @patch('subprocess.check_call')
+    def test_remove_extra_packages_keeps_dependencies(self, mock_check_call, _):
+        site_packages = self._create_dependency_site_packages()
+        _create_requirements_file(self.command.requirements_dir, content='Django==1.7\n')
+        self.command.args = self.parser.parse_args(['-x', '--no-cache', '--batch-size', '2',
+                                                    '--python', '/venv/bin/python',
+                                                    '--site-packages', site_packages])
+
+        self.command.run()
+
+        pip = ['/venv/bin/python', '-m', 'pip']
+        self.assertEqual([(pip + ['uninstall', '-y', 'mock', 'nose'],),
+                          (pip + ['uninstall', '-y', 'six'],)],
+                         [call[0] for call in mock_check_call.call_args_list])
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['Keeping packages required by other packages:',
+                          'pytz (required by django)'], lines[0:2])
+
+    @patch('pipwrap.api.get_marker_environment', return_value={})
+    @patch('subprocess.check_call')
+    def test_remove_extra_packages_dry_run(self, mock_check_call, _):
+        site_packages = self._create_dependency_site_packages()
+        _create_requirements_file(self.command.requirements_dir, content='Django==1.7\nsix\n')
+        self.command.args = self.parser.parse_args(['-x', '--no-cache', '--dry-run',
+                                                    '--python', '/venv/bin/python',
+                                                    '--site-packages', site_packages])
+
+        self.command.run()
+
+        self.assertFalse(mock_check_call.called)
+        lines = sys.stdout.getvalue().split('\n')
+        self.assertEqual(['Packages that would be removed:', 'mock', 'nose'], lines[3:6])
+
+    @patch('subprocess.check_call')
+    def test_remove_extra_packages_ignore_dependencies(self, mock_check_call):
+        site_packages = self._create_dependency_site_packages()
+        _create_requirements_file(self.command.requirements_dir,
+                                  content='Django==1.7\nmock\nnose\nsix\n')
+        self.command.args = self.parser.parse_args(['-x', '--no-cache', '--ignore-dependencies',
+                                                    '--python', '/venv/bin/python',
+                                                    '--site-packages', site_packages])
+
+        self.command.run()
+
+        mock_check_call.assert_called_once_with(['/venv/bin/python', '-m', 'pip', 'uninstall',
+                                                 '-y', 'pytz'])
+
+    @patch('subprocess.Popen')
     @patch('subprocess.check_call')
-    def test_run_remove_extra_packages(self, mock_check_call, mock_check_output):
-        mock_check_output.return_value = 'mock==1.2\nDjango==1.7\nnose==1.3\ndjango-nose==1.0\n'
+    def test_run_remove_extra_packages(self, mock_check_call, mock_popen):
+        mock_popen.return_value = freeze_process(
+            'mock==1.2\nDjango==1.7\nnose==1.3\ndjango-nose==1.0\n')
         _create_requirements_file(self.command.requirements_dir)
-        self.command.args = self.parser.parse_args(['-x'])
+        self.command.args = self.parser.parse_args(['-x'] + FREEZE_ARGS)
 
         self.command.run()
 
-        mock_check_call.assert_called_once_with(['pip', 'uninstall', '-y', 'django-nose'])
+        mock_check_call.assert_called_once_with([sys.executable, '-m', 'pip', 'uninstall', '-y',
+                                                 'django-nose'])
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from mock import MagicMock, patch
+
+from pipwrap import daemon
+from .test_discovery import create_dist_info
+
+
+def _print_lint(project, environment):
+    missing = [record['package'] for record in project.iter_discrepancies(environment)
+               if record['kind'] == 'missing']
+    print('missing: %s' % ', '.join(missing))
+    return 1 if missing else 0
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir, True)
+        self.requirements_dir = os.path.join(self.tempdir, 'requirements')
+        os.makedirs(self.requirements_dir)
+        self._write_requirements('mock\nnose\n')
+        self.site_packages = os.path.join(self.tempdir, 'site-packages')
+        os.makedirs(self.site_packages)
+        create_dist_info(self.site_packages, 'mock', '1.1')
+        self.socket_path = os.path.join(self.tempdir, 'pipwrap.sock')
+        self.lint = MagicMock(side_effect=_print_lint)
+        self.daemon = daemon.Daemon(self.socket_path, self.lint)
+        self.request = {'command': 'lint', 'requirements_dir': self.requirements_dir,
+                        'paths': [self.site_packages]}
+
+    def _write_requirements(self, content):
+        filename = os.path.join(self.requirements_dir, 'production.txt')
+        with open(filename, 'w') as req_file:
+            req_file.write(content)
+        # Make sure the change is seen, however coarse the filesystem's timestamps
+        os.utime(filename, (time.time() + 10, time.time() + 10))
+
+    def test_lint(self):
+        response = self.daemon.handle(self.request)
+
+        self.assertEqual({'status': 1, 'output': 'missing: nose\n'}, response)
+
+    def test_lint_unchanged(self):
+        self.daemon.handle(self.request)
+        response = self.daemon.handle(self.request)
+
+        self.assertEqual({'status': 1, 'output': 'missing: nose\n'}, response)
+        self.assertEqual(1, self.lint.call_count)
+
+    def test_lint_changed(self):
+        self.daemon.handle(self.request)
+        self._write_requirements('mock\n')
+
+        response = self.daemon.handle(self.request)
+
+        self.assertEqual({'status': 0, 'output': 'missing: \n'}, response)
+        self.assertEqual(2, self.lint.call_count)
+
+    def test_lint_missing_directory(self):
+        self.request['requirements_dir'] = os.path.join(self.tempdir, 'missing')
+
+        response = self.daemon.handle(self.request)
+
+        self.assertEqual(2, response['status'])
+
+    def test_status(self):
+        self.daemon.handle(self.request)
+        self.daemon.handle(self.request)
+
+        response = self.daemon.handle({'command': 'status'})
+
+        self.assertEqual(0, response['status'])
+        self.assertEqual([{'requirements_dir': self.requirements_dir,
+                           'paths': [self.site_packages], 'python': None, 'files': 1,
+                           'installed': 1, 'queries': 2}], response['projects'])
+
+    def test_unknown_command(self):
+        response = self.daemon.handle({'command': 'stop'})
+
+        self.assertEqual({'status': 2, 'error': "unknown command 'stop'"}, response)
+
+    def test_serve_forever(self):
+        # A file left behind by a daemon that was killed
+        open(self.socket_path, 'w').close()
+        thread = threading.Thread(target=self.daemon.serve_forever)
+        thread.start()
+        try:
+            for _ in range(100):
+                if self.daemon._server is not None:
+                    break
+                time.sleep(0.01)
+
+            response = daemon.query(self.socket_path, self.request)
+            status = daemon.query(self.socket_path, {'command': 'status'})
+        finally:
+            self.daemon.shutdown()
+            thread.join()
+
+        self.assertEqual({'status': 1, 'output': 'missing: nose\n'}, response)
+        self.assertEqual(1, len(status['projects']))
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+class TestQuery(unittest.TestCase):
+
+    def test_query_no_daemon(self):
+        self.assertEqual(None, daemon.query('/does/not/exist.sock', {'command': 'status'}))
+
+    def test_query_refused(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir, True)
+        socket_path = os.path.join(tempdir, 'pipwrap.sock')
+        open(socket_path, 'w').close()
+
+        self.assertEqual(None, daemon.query(socket_path, {'command': 'status'}))
+
+    @patch.dict(os.environ, {'XDG_RUNTIME_DIR': '/does/not/exist', 'XDG_CACHE_HOME': '/cache'})
+    def test_get_default_socket_path(self):
+        self.assertEqual(os.path.join('/cache', 'pipwrap', 'pipwrap.sock'),
+                         daemon.get_default_socket_path())
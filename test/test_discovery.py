@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from pipwrap import discovery
+
+
+def create_dist_info(site_packages, name, version, direct_url=None, requires=()):
+    dist_info = os.path.join(site_packages, '%s-%s.dist-info' % (name.replace('-', '_'), version))
+    os.makedirs(dist_info)
+    with open(os.path.join(dist_info, 'METADATA'), 'w') as metadata:
+        metadata.write('Metadata-Version: 2.1\nName: %s\nVersion: %s\n' % (name, version))
+        for requirement in requires:
+            metadata.write('Requires-Dist: %s\n' % requirement)
+        metadata.write('\nDescription\n')
+    if direct_url:
+        with open(os.path.join(dist_info, 'direct_url.json'), 'w') as direct_url_file:
+            json.dump(direct_url, direct_url_file)
+    return dist_info
+
+
+def freeze_process(output, returncode=0):
+    """ Mock the pip freeze process started with subprocess.Popen """
+    process = MagicMock()
+    process.stdout = io.StringIO(output)
+    process.wait.return_value = returncode
+    return process
+
+
+class TestScanInstalled(unittest.TestCase):
+
+    def setUp(self):
+        self.site_packages = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.site_packages, ignore_errors=True)
+
+    def test_scan_installed_dist_info(self):
+        create_dist_info(self.site_packages, 'Django', '1.7')
+        create_dist_info(self.site_packages, 'django-nose', '1.0')
+        create_dist_info(self.site_packages, 'pip', '20.0')
+
+        lines = list(discovery.scan_installed([self.site_packages]))
+
+        self.assertEqual(['Django==1.7', 'django-nose==1.0'], lines)
+
+    def test_scan_installed_egg_info(self):
+        with open(os.path.join(self.site_packages, 'nose-1.3.egg-info'), 'w') as pkg_info:
+            pkg_info.write('Metadata-Version: 1.0\nName: nose\nVersion: 1.3\n')
+        egg_info = os.path.join(self.site_packages, 'mock-1.2.egg-info')
+        os.makedirs(egg_info)
+        with open(os.path.join(egg_info, 'PKG-INFO'), 'w') as pkg_info:
+            pkg_info.write('Metadata-Version: 1.0\nName: mock\nVersion: 1.2\n')
+
+        lines = list(discovery.scan_installed([self.site_packages]))
+
+        self.assertEqual(['mock==1.2', 'nose==1.3'], lines)
+
+    def test_scan_installed_direct_url(self):
+        create_dist_info(self.site_packages, 'plugin', '0.1', direct_url={
+            'url': 'https://github.com/example/plugin.git',
+            'vcs_info': {'vcs': 'git', 'commit_id': 'abc123'},
+            'dir_info': {'editable': True},
+        })
+        create_dist_info(self.site_packages, 'local', '0.2', direct_url={
+            'url': 'file:///src/local',
+            'dir_info': {'editable': True},
+        })
+        create_dist_info(self.site_packages, 'archive', '0.3', direct_url={
+            'url': 'https://example.com/archive.tar.gz',
+            'archive_info': {},
+        })
+
+        lines = list(discovery.scan_installed([self.site_packages]))
+
+        self.assertEqual(['archive==0.3',
+                          '-e file:///src/local#egg=local',
+                          '-e git+https://github.com/example/plugin.git@abc123#egg=plugin'],
+                         lines)
+
+    def test_scan_installed_egg_link(self):
+        with open(os.path.join(self.site_packages, 'project.egg-link'), 'w') as egg_link:
+            egg_link.write('/src/project\n.\n')
+
+        lines = list(discovery.scan_installed([self.site_packages]))
+
+        self.assertEqual(['-e /src/project#egg=project'], lines)
+
+    def test_scan_installed_first_path_wins(self):
+        other_site_packages = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_site_packages, True)
+        create_dist_info(self.site_packages, 'Django', '1.8')
+        create_dist_info(other_site_packages, 'django', '1.7')
+
+        lines = list(discovery.scan_installed([self.site_packages, other_site_packages,
+                                               '/does/not/exist']))
+
+        self.assertEqual(['Django==1.8'], lines)
+
+
+class TestSearchPaths(unittest.TestCase):
+
+    @patch('subprocess.check_output')
+    def test_get_search_paths_python(self, mock_check_output):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir, True)
+        mock_check_output.return_value = json.dumps(['', tempdir, '/does/not/exist'])
+
+        paths = discovery.get_search_paths('/venv/bin/python')
+
+        self.assertEqual([tempdir], paths)
+        self.assertEqual('/venv/bin/python', mock_check_output.call_args[0][0][0])
+
+    @patch('subprocess.Popen')
+    def test_iter_freeze(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\nDjango==1.7\n')
+
+        freeze = discovery.iter_freeze()
+
+        self.assertFalse(mock_popen.called)
+        self.assertEqual(['mock==1.2', 'Django==1.7'], list(freeze))
+        self.assertEqual(['pip', 'freeze'], mock_popen.call_args[0][0])
+        self.assertTrue(mock_popen.return_value.stdout.closed)
+
+    @patch('subprocess.Popen')
+    def test_iter_freeze_python(self, mock_popen):
+        mock_popen.return_value = freeze_process('')
+
+        list(discovery.iter_freeze('/venv/bin/python'))
+
+        self.assertEqual(['/venv/bin/python', '-m', 'pip', 'freeze'],
+                         mock_popen.call_args[0][0])
+
+    @patch('subprocess.Popen')
+    def test_iter_freeze_failed(self, mock_popen):
+        mock_popen.return_value = freeze_process('mock==1.2\n', returncode=1)
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            list(discovery.iter_freeze())
@@ -0,0 +1,100 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import git
+
+
+def create_repository(root, files):
+    """ Create a git repository with one commit
+    :param root: Directory of the work tree
+    :param files: Dictionary, keyed by path relative to root, of file contents
+    """
+    subprocess.check_call(['git', 'init', '-q', root])
+    write_files(root, files)
+    subprocess.check_call(['git', 'add', '.'], cwd=root)
+    subprocess.check_call(['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com',
+                           'commit', '-q', '-m', 'Initial commit'], cwd=root)
+
+
+def write_files(root, files):
+    for path, content in files.items():
+        filename = os.path.join(root, path)
+        if content is None:
+            os.remove(filename)
+            continue
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'w') as output:
+            output.write(content)
+
+
+class TestGit(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.requirements_dir = os.path.join(self.root, 'requirements')
+        create_repository(self.root, {
+            'requirements/production.txt': 'Django\n',
+            'requirements/test.txt': 'mock\n',
+            'requirements/old.txt': 'six\n',
+            'requirements/nested/other.txt': 'nose\n',
+            'setup.py': '',
+        })
+        self.commit = git.resolve_commit(self.requirements_dir, 'HEAD')
+
+    def test_resolve_commit_unknown(self):
+        with self.assertRaises(git.GitError) as context:
+            git.resolve_commit(self.requirements_dir, 'does-not-exist')
+
+        self.assertEqual('unknown revision does-not-exist', str(context.exception))
+
+    def test_resolve_commit_not_a_repository(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+
+        with self.assertRaises(git.GitError) as context:
+            git.resolve_commit(directory, 'HEAD')
+
+        self.assertTrue('not a git repository' in str(context.exception))
+
+    @patch('subprocess.Popen', side_effect=OSError('No such file or directory'))
+    def test_resolve_commit_git_not_installed(self, mock_popen):
+        with self.assertRaises(git.GitError) as context:
+            git.resolve_commit(self.requirements_dir, 'HEAD')
+
+        self.assertEqual('cannot run git: No such file or directory', str(context.exception))
+
+    def test_changed_files(self):
+        write_files(self.root, {
+            'requirements/production.txt': 'Django==1.8\n',
+            'requirements/old.txt': None,
+            'requirements/new.txt': 'pytz\n',
+            'requirements/nested/other.txt': 'nose==1.3\n',
+            'setup.py': 'import setuptools\n',
+        })
+
+        changed = git.changed_files(self.requirements_dir, self.commit)
+
+        self.assertEqual({'production.txt': 'M', 'old.txt': 'D', 'new.txt': 'A'}, changed)
+
+    def test_changed_files_none(self):
+        self.assertEqual({}, git.changed_files(self.requirements_dir, self.commit))
+
+    def test_read_files(self):
+        write_files(self.root, {'requirements/production.txt': 'Django==1.8\n',
+                                'requirements/old.txt': None})
+
+        contents = git.read_files(self.requirements_dir, self.commit,
+                                  ['production.txt', 'old.txt'])
+
+        self.assertEqual({'production.txt': b'Django\n', 'old.txt': b'six\n'}, contents)
+
+    def test_read_files_missing(self):
+        with self.assertRaises(git.GitError):
+            git.read_files(self.requirements_dir, self.commit, ['missing.txt'])
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipwrap.graph import DependencyGraph
+from pipwrap.markers import MarkerEvaluator
+from .test_discovery import create_dist_info
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.site_packages = tempfile.mkdtemp()
+        create_dist_info(self.site_packages, 'Django', '1.7', requires=[
+            'pytz',
+            'bcrypt; extra == "bcrypt"',
+            'enum34; python_version < "2.0"',
+        ])
+        create_dist_info(self.site_packages, 'pytz', '2019.1')
+        create_dist_info(self.site_packages, 'bcrypt', '3.1', requires=['cffi>=1.1', 'not valid!'])
+        create_dist_info(self.site_packages, 'cffi', '1.12', requires=['pycparser'])
+        create_dist_info(self.site_packages, 'pycparser', '2.19')
+        egg_info = os.path.join(self.site_packages, 'legacy-1.0.egg-info')
+        os.makedirs(egg_info)
+        with open(os.path.join(egg_info, 'PKG-INFO'), 'w') as pkg_info:
+            pkg_info.write('Metadata-Version: 1.0\nName: legacy\nVersion: 1.0\n')
+        with open(os.path.join(egg_info, 'requires.txt'), 'w') as requires:
+            requires.write('six\n\n[tests]\nnose\n\n[:python_version < "2.0"]\nfuture\n')
+        self.graph = DependencyGraph.from_paths([self.site_packages, '/does/not/exist'])
+
+    def tearDown(self):
+        shutil.rmtree(self.site_packages, ignore_errors=True)
+
+    def test_dependencies(self):
+        self.assertEqual([('pytz', ())], self.graph.dependencies('django'))
+        self.assertEqual([('pytz', ()), ('bcrypt', ())],
+                         self.graph.dependencies('django', ['bcrypt']))
+        self.assertEqual([('cffi', ())], self.graph.dependencies('bcrypt'))
+        self.assertEqual([], self.graph.dependencies('unknown'))
+
+    def test_dependencies_egg_info(self):
+        self.assertEqual([('six', ())], self.graph.dependencies('legacy'))
+        self.assertEqual([('six', ()), ('nose', ())],
+                         self.graph.dependencies('legacy', ['tests']))
+
+    def test_dependencies_marker_environment(self):
+        graph = DependencyGraph.from_paths([self.site_packages],
+                                           MarkerEvaluator({'python_version': '1.5'}))
+
+        self.assertEqual([('pytz', ()), ('enum34', ())], graph.dependencies('django'))
+        self.assertEqual([('six', ()), ('future', ())], graph.dependencies('legacy'))
+
+    def test_reachable(self):
+        parents = self.graph.reachable([('django', [])])
+
+        self.assertEqual({'django': None, 'pytz': 'django'}, parents)
+
+    def test_reachable_extras(self):
+        parents = self.graph.reachable([('django', ['bcrypt'])])
+
+        self.assertEqual({'django': None, 'pytz': 'django', 'bcrypt': 'django',
+                          'cffi': 'bcrypt', 'pycparser': 'cffi'}, parents)
+
+    def test_dependencies_of(self):
+        parents = self.graph.dependencies_of([('django', ['bcrypt']), ('pytz', [])])
+
+        self.assertEqual({'pytz': 'django', 'bcrypt': 'django', 'cffi': 'bcrypt',
+                          'pycparser': 'cffi'}, parents)
+        self.assertEqual({}, self.graph.dependencies_of([('pytz', [])]))
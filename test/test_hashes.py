@@ -0,0 +1,84 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from pipwrap import hashes
+
+
+def _create_archive(directory, filename, content=b'archive'):
+    path = os.path.join(directory, filename)
+    with open(path, 'wb') as archive:
+        archive.write(content)
+    return path
+
+
+class TestArchives(unittest.TestCase):
+
+    def setUp(self):
+        self.wheelhouse = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.wheelhouse, ignore_errors=True)
+
+    def test_parse_archive_filename(self):
+        self.assertEqual(('django', '1.7'),
+                         hashes.parse_archive_filename('Django-1.7-py2.py3-none-any.whl'))
+        self.assertEqual(('django-nose', '1.4.5'),
+                         hashes.parse_archive_filename('django-nose-1.4.5.tar.gz'))
+        self.assertEqual(None, hashes.parse_archive_filename('Django-1.7.whl'))
+        self.assertEqual(None, hashes.parse_archive_filename('notes.tar.gz'))
+        self.assertEqual(None, hashes.parse_archive_filename('README.txt'))
+
+    def test_find_archives(self):
+        os.makedirs(os.path.join(self.wheelhouse, 'sub'))
+        wheel = _create_archive(self.wheelhouse, 'Django-1.7-py2.py3-none-any.whl')
+        sdist = _create_archive(os.path.join(self.wheelhouse, 'sub'), 'Django-1.7.zip')
+        _create_archive(self.wheelhouse, 'index.html')
+
+        archives = hashes.find_archives([self.wheelhouse, '/does/not/exist'])
+
+        self.assertEqual({('django', '1.7'): sorted([wheel, sdist])}, archives)
+
+    def test_hash_file(self):
+        path = _create_archive(self.wheelhouse, 'mock-1.1.tar.gz')
+
+        self.assertEqual((path, 'sha256:%s' % hashlib.sha256(b'archive').hexdigest()),
+                         hashes.hash_file(path))
+
+
+class TestArchiveHasher(unittest.TestCase):
+
+    def setUp(self):
+        self.wheelhouse = tempfile.mkdtemp()
+        self.paths = [_create_archive(self.wheelhouse, 'package%d-1.0.zip' % i,
+                                      ('%d' % i).encode('utf-8'))
+                      for i in range(hashes.PARALLEL_HASH_THRESHOLD)]
+
+    def tearDown(self):
+        shutil.rmtree(self.wheelhouse, ignore_errors=True)
+
+    def test_hash_paths_parallel(self):
+        hasher = hashes.ArchiveHasher(processes=2)
+
+        path_hashes = hasher.hash_paths(self.paths)
+
+        self.assertEqual(dict(hashes.hash_file(path) for path in self.paths), path_hashes)
+
+    @patch('multiprocessing.Pool')
+    def test_hash_paths_cached(self, mock_pool):
+        cached = {}
+        cache = MagicMock()
+        cache.get.side_effect = cached.get
+        cache.set.side_effect = cached.__setitem__
+        hasher = hashes.ArchiveHasher(cache)
+
+        first = hasher.hash_paths(self.paths[:1])
+        second = hasher.hash_paths(self.paths[:1])
+
+        self.assertEqual(first, second)
+        self.assertEqual(1, cache.set.call_count)
+        self.assertFalse(mock_pool.called)
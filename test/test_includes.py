@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+
+from pipwrap import requirement
+from pipwrap.api import RequirementsFile
+from pipwrap.includes import IncludeGraph
+
+
+def _create_req_file(included_files, content=''):
+    req_file = RequirementsFile()
+    req_file.included_files = included_files
+    req_file.packages = set(requirement.parse(content))
+    return req_file
+
+
+class TestIncludeGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.requirements_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.requirements_dir, ignore_errors=True)
+
+    def test_resolve(self):
+        req_files = {
+            'base.txt': _create_req_file([], 'Django==1.7\n'),
+            'common.txt': _create_req_file(['-r base.txt\n'], 'gunicorn\n'),
+            'production.txt': _create_req_file(['-r common.txt\n'], 'django==1.8\n'),
+            'development.txt': _create_req_file(['-r base.txt\n', '--requirement=common.txt\n'],
+                                                'mock==1.2\n'),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        environments = graph.environments()
+
+        self.assertEqual(['development.txt', 'production.txt'], sorted(environments))
+        self.assertEqual(['django', 'gunicorn', 'mock'], sorted(environments['development.txt']))
+        self.assertEqual(1, len(environments['development.txt']['django']))
+        self.assertEqual([('django', ['base.txt', 'production.txt'])],
+                         graph.duplicates('production.txt'))
+        self.assertEqual([], graph.duplicates('development.txt'))
+        self.assertEqual([], graph.cycles)
+
+    def test_resolve_memoized(self):
+        req_files = {
+            'base.txt': _create_req_file([], 'Django==1.7\n'),
+            'a.txt': _create_req_file(['-r base.txt\n']),
+            'b.txt': _create_req_file(['-r base.txt\n']),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        self.assertTrue(graph.resolve('base.txt') is graph.resolve('base.txt'))
+        self.assertEqual(['django'], list(graph.resolve('a.txt')))
+        self.assertEqual(['django'], list(graph.resolve('b.txt')))
+
+    def test_constraints(self):
+        req_files = {
+            'constraints.txt': _create_req_file([], 'Django<2\n'),
+            'production.txt': _create_req_file(['-c constraints.txt\n'], 'gunicorn\n'),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        self.assertEqual(['production.txt'], graph.roots())
+        self.assertEqual(['gunicorn'], list(graph.resolve('production.txt')))
+        self.assertEqual({'constraints.txt'}, graph.constraint_files())
+
+    def test_constraint_files_also_required(self):
+        req_files = {
+            'constraints.txt': _create_req_file([], 'Django<2\n'),
+            'production.txt': _create_req_file(['-c constraints.txt\n'], 'gunicorn\n'),
+            'development.txt': _create_req_file(['-r constraints.txt\n'], 'mock\n'),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        self.assertEqual(set(), graph.constraint_files())
+
+    def test_cycles(self):
+        req_files = {
+            'a.txt': _create_req_file(['-r b.txt\n'], 'mock\n'),
+            'b.txt': _create_req_file(['-r a.txt\n'], 'nose\n'),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        graph.environments()
+
+        self.assertEqual([['a.txt', 'b.txt', 'a.txt']], graph.cycles)
+
+    def test_missing(self):
+        open('%s/external.txt' % self.requirements_dir, 'w').close()
+        req_files = {
+            'a.txt': _create_req_file(['-r missing.txt\n', '-r external.txt\n']),
+        }
+        graph = IncludeGraph(self.requirements_dir, req_files)
+
+        self.assertEqual({'a.txt': ['missing.txt']}, graph.missing)
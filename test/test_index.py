@@ -0,0 +1,40 @@
+import unittest
+
+from pipwrap import index, requirement
+
+
+def _parse(text):
+    return list(requirement.parse(text))
+
+
+class TestCanonicalizeName(unittest.TestCase):
+
+    def test_canonicalize_name(self):
+        self.assertEqual('django-nose', index.canonicalize_name('Django_Nose'))
+        self.assertEqual('zope-interface', index.canonicalize_name('zope.interface'))
+        self.assertEqual('a-b', index.canonicalize_name('a-_.b'))
+
+
+class TestInstalledIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.installed = _parse('Django==1.7\nmock==1.2\n-e http://example.com/some-repo.git\n')
+        self.index = index.InstalledIndex(self.installed)
+
+    def test_len(self):
+        self.assertEqual(3, len(self.index))
+
+    def test_find_by_name(self):
+        requirement = _parse('django>=1.0\n')[0]
+
+        self.assertEqual('Django', self.index.find(requirement).name)
+
+    def test_find_by_line(self):
+        requirement = _parse('-e http://example.com/some-repo.git\n')[0]
+
+        self.assertEqual(requirement.line, self.index.find(requirement).line)
+
+    def test_find_missing(self):
+        requirement = _parse('nose==1.3\n')[0]
+
+        self.assertEqual(None, self.index.find(requirement))
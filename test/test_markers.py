@@ -0,0 +1,80 @@
+import sys
+import unittest
+
+from mock import MagicMock, patch
+
+from pipwrap import markers
+
+
+class TestGetMarkerEnvironment(unittest.TestCase):
+
+    def test_get_marker_environment_current(self):
+        environment = markers.get_marker_environment()
+
+        self.assertEqual(sys.platform, environment['sys_platform'])
+        self.assertEqual('%d.%d' % sys.version_info[:2], environment['python_version'])
+
+    def test_get_marker_environment_target_interpreter(self):
+        environment = markers.get_marker_environment(sys.executable)
+
+        self.assertEqual(markers.get_marker_environment(), environment)
+
+    @patch('subprocess.check_output')
+    def test_get_marker_environment_runs_target_interpreter(self, mock_check_output):
+        mock_check_output.return_value = '{"sys_platform": "win32"}\n'
+
+        environment = markers.get_marker_environment('/venv/bin/python')
+
+        self.assertEqual({'sys_platform': 'win32'}, environment)
+        self.assertEqual('/venv/bin/python', mock_check_output.call_args[0][0][0])
+
+
+class TestParseMarkerOverrides(unittest.TestCase):
+
+    def test_parse_marker_overrides(self):
+        overrides = markers.parse_marker_overrides('sys_platform=win32, python_version=3.6,')
+
+        self.assertEqual({'sys_platform': 'win32', 'python_version': '3.6'}, overrides)
+
+    def test_parse_marker_overrides_invalid(self):
+        with self.assertRaises(ValueError):
+            markers.parse_marker_overrides('win32')
+
+
+class TestMarkerEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluator = markers.MarkerEvaluator({'sys_platform': 'linux',
+                                                  'python_version': '3.11'})
+
+    def test_applies(self):
+        self.assertTrue(self.evaluator.applies('sys_platform == "linux"'))
+        self.assertFalse(self.evaluator.applies('sys_platform == "win32"'))
+        self.assertFalse(self.evaluator.applies('python_version < "3.7"'))
+
+    def test_applies_no_marker(self):
+        self.assertTrue(self.evaluator.applies(None))
+
+    def test_applies_invalid_marker(self):
+        self.assertTrue(self.evaluator.applies('sys_platform ==='))
+
+    def test_applies_extra(self):
+        self.assertFalse(self.evaluator.applies('extra == "test"'))
+
+    def test_applies_memoized(self):
+        with patch('packaging.markers.Marker') as mock_marker:
+            mock_marker.return_value.evaluate.return_value = False
+            for _ in range(3):
+                self.assertFalse(self.evaluator.applies('sys_platform == "win32"'))
+
+        self.assertEqual(1, mock_marker.call_count)
+
+    def test_environment_callable(self):
+        get_environment = MagicMock(return_value={'sys_platform': 'win32'})
+        evaluator = markers.MarkerEvaluator(get_environment)
+
+        self.assertTrue(evaluator.applies(None))
+        self.assertFalse(get_environment.called)
+        self.assertTrue(evaluator.applies('sys_platform == "win32"'))
+        self.assertTrue(evaluator.applies('sys_platform != "linux"'))
+        self.assertEqual(1, get_environment.call_count)
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import api, monorepo
+
+
+def _write(path, content=''):
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as output:
+        output.write(content)
+
+
+class TestFindProjects(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        _write(os.path.join(self.root, 'services', 'api', 'requirements', 'production.txt'))
+        _write(os.path.join(self.root, 'services', 'api', 'requirements', 'nested',
+                            'requirements.txt'))
+        _write(os.path.join(self.root, 'services', 'web', 'requirements.txt'))
+        _write(os.path.join(self.root, 'services', 'web', 'requirements-dev.txt'))
+        _write(os.path.join(self.root, 'services', 'web', 'setup.py'))
+        _write(os.path.join(self.root, '.git', 'requirements.txt'))
+        _write(os.path.join(self.root, 'node_modules', 'requirements.txt'))
+        _write(os.path.join(self.root, 'venv', 'pyvenv.cfg'))
+        _write(os.path.join(self.root, 'venv', 'requirements.txt'))
+
+    def test_find_projects(self):
+        projects = monorepo.find_projects(self.root)
+
+        self.assertEqual([
+            (os.path.join(self.root, 'services', 'api', 'requirements'), None),
+            (os.path.join(self.root, 'services', 'web'),
+             ['requirements-dev.txt', 'requirements.txt']),
+        ], projects)
+
+    def test_find_projects_path_pattern(self):
+        projects = monorepo.find_projects(self.root, ['services/web/requirements.txt'])
+
+        self.assertEqual([(os.path.join(self.root, 'services', 'web'), ['requirements.txt'])],
+                         projects)
+
+
+class TestMonorepo(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        _write(os.path.join(self.root, 'api', 'requirements', 'production.txt'),
+               'Django==1.7\nnose\n')
+        _write(os.path.join(self.root, 'api', 'requirements', 'dev.txt'),
+               '-r production.txt\n-r missing.txt\nmock\n')
+        _write(os.path.join(self.root, 'web', 'requirements.txt'), 'six\nDjango>=1.8\n')
+        _write(os.path.join(self.root, 'web', 'README'), 'Not a requirements file\n')
+        self.environment = api.Environment(installed=['Django==1.8', 'mock==1.1', 'six==1.12',
+                                                      'pytz==2019.1'])
+
+    def test_projects(self):
+        projects = monorepo.Monorepo(self.root).projects
+
+        self.assertEqual([os.path.join('api', 'requirements'), 'web'], sorted(projects))
+        self.assertEqual(['dev.txt', 'production.txt'],
+                         sorted(projects[os.path.join('api', 'requirements')].req_files))
+        self.assertEqual(['requirements.txt'], sorted(projects['web'].req_files))
+
+    def test_lint(self):
+        result = monorepo.Monorepo(self.root).lint(self.environment)
+
+        api_project = os.path.join('api', 'requirements')
+        self.assertEqual([
+            ('version-mismatch', api_project, 'Django'),
+            ('missing', api_project, 'nose'),
+            ('include', api_project, None),
+            ('extra', None, 'pytz'),
+        ], [(record['kind'], record['project'], record.get('package'))
+            for record in result.iter_records()])
+        self.assertFalse(result.ok)
+
+    def test_lint_threads(self):
+        linted = monorepo.Monorepo(self.root, threads=1).lint(self.environment)
+
+        with patch('multiprocessing.pool.ThreadPool') as mock_pool:
+            mock_pool.return_value.map.side_effect = lambda function, names: [
+                function(name) for name in names]
+            threaded = monorepo.Monorepo(self.root, threads=4).lint(self.environment)
+
+        mock_pool.assert_called_once_with(2)
+        self.assertEqual(list(linted.iter_records()), list(threaded.iter_records()))
+
+    def test_lint_no_projects(self):
+        result = monorepo.Monorepo(os.path.join(self.root, 'web', 'README')).lint(
+            self.environment)
+
+        self.assertEqual([], list(result.iter_records()))
+        self.assertTrue(result.ok)
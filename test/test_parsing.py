@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import cache, parsing
+
+
+class TestParseRequirementsFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'development.txt')
+        with open(self.filename, 'w') as requirements_file:
+            requirements_file.write('-r common.txt\n# Comment\nmock==1.2\n'
+                                    '-e http://example.com/some-repo.git\n'
+                                    'Django[bcrypt]>=1.7,<1.8\n')
+        self.cache = cache.Cache(self.tempdir, 'parsed')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_parse_requirements_file(self):
+        included_files, packages = parsing.parse_requirements_file(self.filename)
+
+        self.assertEqual(['-r common.txt\n'], included_files)
+        self.assertEqual(['mock==1.2', '-e http://example.com/some-repo.git',
+                          'Django[bcrypt]>=1.7,<1.8'], [package.line for package in packages])
+
+    def test_parse_requirements_file_cached(self):
+        parsing.parse_requirements_file(self.filename, self.cache)
+
+        with patch('pipwrap.parsing.parse') as mock_parse:
+            included_files, packages = parsing.parse_requirements_file(self.filename, self.cache)
+
+        self.assertFalse(mock_parse.called)
+        self.assertEqual(['-r common.txt\n'], included_files)
+        django = packages[2]
+        self.assertEqual('Django', django.name)
+        self.assertEqual(['bcrypt'], django.extras)
+        self.assertEqual([('<', '1.8'), ('>=', '1.7')], sorted(django.specs))
+        self.assertTrue(packages[1].editable)
+
+    def test_parse_requirements_file_changed(self):
+        parsing.parse_requirements_file(self.filename, self.cache)
+        with open(self.filename, 'w') as requirements_file:
+            requirements_file.write('nose==1.3\n')
+
+        included_files, packages = parsing.parse_requirements_file(self.filename, self.cache)
+
+        self.assertEqual([], included_files)
+        self.assertEqual(['nose==1.3'], [package.line for package in packages])
+
+    def test_parse_requirements_file_hashes(self):
+        with open(self.filename, 'w') as requirements_file:
+            requirements_file.write('-c constraints.txt\r\nDjango==1.7 \\\n'
+                                    '    --hash=sha256:abc \\\n    --hash=sha256:def\nmock\n')
+
+        parsed = parsing.parse_requirements_file(self.filename)
+        cached = parsing.parse_requirements_file(self.filename, self.cache)
+
+        for included_files, packages in (parsed, cached):
+            self.assertEqual(['-c constraints.txt\n'], included_files)
+            self.assertEqual(['Django==1.7', 'mock'], [package.line for package in packages])
+            self.assertEqual([2, 5], [package.line_number for package in packages])
+
+    def test_parse_requirements_file_data(self):
+        included_files, packages = parsing.parse_requirements_file(
+            self.filename, self.cache, data=b'-r base.txt\nnose==1.3\n')
+
+        self.assertEqual(['-r base.txt\n'], included_files)
+        self.assertEqual(['nose==1.3'], [package.line for package in packages])
@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import profiling
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_null_profiler(self):
+        with profiling.NULL_PROFILER.phase('parsing') as phase:
+            profiling.NULL_PROFILER.count('files read')
+
+        self.assertTrue(phase is profiling.NULL_PROFILER.phase('writing'))
+        self.assertFalse(profiling.NULL_PROFILER.enabled)
+
+    @patch('time.time')
+    def test_totals_and_report(self, mock_time):
+        mock_time.side_effect = [0.0, 1.0, 1.5, 2.0, 2.25, 3.0, 4.0, 5.0]
+        profiler = profiling.Profiler()
+        with profiler.phase('parsing'):
+            profiler.count('files read')
+        with profiler.phase('parsing'):
+            profiler.count('files read')
+        with profiler.phase('discovery'):
+            profiler.count('installed packages', 40)
+        stream = io.StringIO()
+
+        profiler.report(stream)
+
+        self.assertEqual({'parsing': (2, 0.75), 'discovery': (1, 1.0)}, profiler.totals())
+        self.assertEqual(['Phase                Calls       Total',
+                          'discovery                1    1000.0ms',
+                          'parsing                  2     750.0ms',
+                          'elapsed                       5000.0ms',
+                          'files read               2',
+                          'installed packages      40',
+                          ''], stream.getvalue().split('\n'))
+
+    def test_phase_exception(self):
+        profiler = profiling.Profiler()
+
+        with self.assertRaises(ValueError):
+            with profiler.phase('parsing'):
+                raise ValueError()
+
+        self.assertEqual(['parsing'], list(profiler.totals()))
+
+    def test_write_chrome_trace(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, True)
+        filename = os.path.join(output_dir, 'trace.json')
+        profiler = profiling.Profiler()
+        with profiler.phase('matching'):
+            profiler.count('comparisons', 3)
+
+        profiler.write_chrome_trace(filename)
+
+        with open(filename) as trace_file:
+            trace = json.load(trace_file)
+        self.assertEqual(['matching'], [event['name'] for event in trace['traceEvents']])
+        self.assertEqual('X', trace['traceEvents'][0]['ph'])
+        self.assertEqual({'comparisons': 3}, trace['otherData']['counts'])
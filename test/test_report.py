@@ -0,0 +1,45 @@
+import io
+import json
+import unittest
+
+from pipwrap import report
+
+
+class TestReporters(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def test_json_lines(self):
+        reporter = report.get_reporter('jsonl', self.stream)
+
+        reporter.start()
+        reporter.record({'kind': 'extra', 'package': 'nose'})
+        reporter.record({'kind': 'missing', 'package': 'mock'})
+        reporter.finish({'counts': {'extra': 1, 'missing': 1}})
+
+        records = [json.loads(line) for line in self.stream.getvalue().splitlines()]
+        self.assertEqual([{'kind': 'extra', 'package': 'nose'},
+                          {'kind': 'missing', 'package': 'mock'},
+                          {'kind': 'summary', 'counts': {'extra': 1, 'missing': 1}}], records)
+
+    def test_json(self):
+        reporter = report.get_reporter('json', self.stream)
+
+        reporter.start()
+        reporter.record({'kind': 'extra', 'package': 'nose'})
+        reporter.record({'kind': 'missing', 'package': 'mock'})
+        reporter.finish({'counts': {'extra': 1, 'missing': 1}})
+
+        document = json.loads(self.stream.getvalue())
+        self.assertEqual([{'kind': 'extra', 'package': 'nose'},
+                          {'kind': 'missing', 'package': 'mock'}], document['discrepancies'])
+        self.assertEqual({'counts': {'extra': 1, 'missing': 1}}, document['summary'])
+
+    def test_json_empty(self):
+        reporter = report.get_reporter('json', self.stream)
+
+        reporter.start()
+        reporter.finish({})
+
+        self.assertEqual({'discrepancies': [], 'summary': {}}, json.loads(self.stream.getvalue()))
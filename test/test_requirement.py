@@ -0,0 +1,139 @@
+import unittest
+
+from pipwrap.requirement import Requirement, RequirementParseError, iter_logical_lines, parse
+
+
+class TestRequirement(unittest.TestCase):
+
+    def test_parse_specifier(self):
+        requirement = Requirement.parse('Django>=1.7,<1.8')
+
+        self.assertEqual('Django', requirement.name)
+        self.assertEqual('django', requirement.key)
+        self.assertEqual([('>=', '1.7'), ('<', '1.8')], requirement.specs)
+        self.assertTrue(requirement.specifier)
+        self.assertFalse(requirement.editable)
+        self.assertEqual(None, requirement.uri)
+        self.assertEqual(None, requirement.path)
+
+    def test_parse_name_only(self):
+        requirement = Requirement.parse('nose')
+
+        self.assertEqual('nose', requirement.name)
+        self.assertEqual([], requirement.specs)
+
+    def test_parse_safe_name(self):
+        requirement = Requirement.parse('django_nose==1.4')
+
+        self.assertEqual('django-nose', requirement.name)
+        self.assertEqual('django-nose', requirement.key)
+
+    def test_parse_extras_and_markers(self):
+        requirement = Requirement.parse('Django[bcrypt, argon2] == 1.7 ; python_version < "3"')
+
+        self.assertEqual(['bcrypt', 'argon2'], requirement.extras)
+        self.assertEqual([('==', '1.7')], requirement.specs)
+        self.assertEqual('python_version < "3"', requirement.markers)
+
+    def test_parse_parenthesized_specs(self):
+        requirement = Requirement.parse('Django (>=1.7)')
+
+        self.assertEqual([('>=', '1.7')], requirement.specs)
+
+    def test_parse_vcs(self):
+        requirement = Requirement.parse('git+https://github.com/x/y.git@v1.0#egg=y')
+
+        self.assertEqual('git', requirement.vcs)
+        self.assertEqual('git+https://github.com/x/y.git', requirement.uri)
+        self.assertEqual('v1.0', requirement.revision)
+        self.assertEqual('y', requirement.name)
+        self.assertFalse(requirement.editable)
+
+    def test_parse_vcs_with_login(self):
+        requirement = Requirement.parse('git+ssh://git@github.com/x/y.git')
+
+        self.assertEqual('git+ssh://git@github.com/x/y.git', requirement.uri)
+        self.assertEqual(None, requirement.revision)
+        self.assertEqual(None, requirement.name)
+
+    def test_parse_editable(self):
+        requirement = Requirement.parse('--editable=git+https://github.com/x/y.git#egg=y')
+
+        self.assertEqual('-e git+https://github.com/x/y.git#egg=y', requirement.line)
+        self.assertTrue(requirement.editable)
+        self.assertEqual('y', requirement.name)
+
+    def test_parse_editable_path(self):
+        requirement = Requirement.parse('-e ./src/pkg')
+
+        self.assertTrue(requirement.local_file)
+        self.assertEqual('./src/pkg', requirement.path)
+        self.assertEqual(None, requirement.name)
+
+    def test_parse_url(self):
+        requirement = Requirement.parse('https://example.com/pkg.zip#egg=pkg')
+
+        self.assertEqual('https://example.com/pkg.zip', requirement.uri)
+        self.assertEqual('pkg', requirement.name)
+        self.assertFalse(requirement.local_file)
+
+    def test_parse_file_url(self):
+        requirement = Requirement.parse('file:///tmp/pkg.tar.gz')
+
+        self.assertEqual('file:///tmp/pkg.tar.gz', requirement.uri)
+        self.assertTrue(requirement.local_file)
+
+    def test_parse_direct_reference(self):
+        requirement = Requirement.parse(
+            'pkg @ https://example.com/pkg.whl ; sys_platform == "linux"')
+
+        self.assertEqual('pkg', requirement.name)
+        self.assertEqual('https://example.com/pkg.whl', requirement.uri)
+        self.assertEqual('sys_platform == "linux"', requirement.markers)
+
+    def test_parse_invalid_name(self):
+        with self.assertRaises(RequirementParseError):
+            Requirement.parse('!nose')
+
+    def test_parse_invalid_specifier(self):
+        with self.assertRaises(RequirementParseError):
+            Requirement.parse('nose 1.3')
+
+
+class TestIterLogicalLines(unittest.TestCase):
+
+    def test_iter_logical_lines(self):
+        text = '# Comment\n\nmock==1.2  # pinned\nDjango>=1.7,\\\n<1.8\n-e ./src#egg=x\n'
+
+        self.assertEqual([(3, 'mock==1.2'), (4, 'Django>=1.7,<1.8'), (6, '-e ./src#egg=x')],
+                         list(iter_logical_lines(text)))
+
+    def test_iter_logical_lines_trailing_continuation(self):
+        self.assertEqual([(1, 'nose')], list(iter_logical_lines('nose\\')))
+
+    def test_iter_logical_lines_iterable(self):
+        lines = iter(['mock==1.2 \\\n', '    --hash=sha256:abc\r\n', 'nose\n'])
+
+        self.assertEqual([(1, 'mock==1.2     --hash=sha256:abc'), (3, 'nose')],
+                         list(iter_logical_lines(lines)))
+
+
+class TestParse(unittest.TestCase):
+
+    def test_parse(self):
+        text = ('-r common.txt\n--index-url https://example.com/simple\nmock==1.2 \\\n'
+                '    --hash=sha256:abc\n-e http://example.com/some-repo.git\n')
+
+        requirements = list(parse(text, 'development.txt'))
+
+        self.assertEqual(['mock==1.2', '-e http://example.com/some-repo.git'],
+                         [requirement.line for requirement in requirements])
+        self.assertEqual([3, 5], [requirement.line_number for requirement in requirements])
+        self.assertEqual(['development.txt'] * 2,
+                         [requirement.source for requirement in requirements])
+
+    def test_parse_error_location(self):
+        with self.assertRaises(RequirementParseError) as context:
+            list(parse('nose\n\n!mock\n', 'development.txt'))
+
+        self.assertTrue(str(context.exception).startswith('development.txt:3: '))
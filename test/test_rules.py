@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pipwrap import requirement
+from pipwrap.rules import PlacementRules, RulesError
+
+
+def _package(line):
+    return list(requirement.parse(line))[0]
+
+
+class TestPlacementRules(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = PlacementRules.parse(
+            '# Placement rules\n'
+            'Django_Debug_Toolbar development.txt\n'
+            'pytest* test.txt  # test runners\n'
+            're:(mock|nose) test.txt\n'
+            'pytest-django production.txt\n'
+            'default common.txt\n')
+
+    def test_match_exact(self):
+        self.assertEqual('development.txt',
+                         self.rules.match(_package('django-debug-toolbar==1.0')))
+
+    def test_match_glob(self):
+        self.assertEqual('test.txt', self.rules.match(_package('PyTest-Cov==2.0')))
+
+    def test_match_glob_canonicalized(self):
+        rules = PlacementRules.parse('Pytest_*  test.txt\nzope.*  common.txt\n')
+
+        self.assertEqual('test.txt', rules.match(_package('pytest-foo==1.0')))
+        self.assertEqual('common.txt', rules.match(_package('zope_interface==4.0')))
+
+    def test_match_regex(self):
+        self.assertEqual('test.txt', self.rules.match(_package('mock==1.2')))
+        self.assertEqual('common.txt', self.rules.match(_package('mockito==1.2')))
+
+    def test_match_first_rule_wins(self):
+        self.assertEqual('test.txt', self.rules.match(_package('pytest-django==3.0')))
+
+    def test_match_default(self):
+        self.assertEqual('common.txt', self.rules.match(_package('gunicorn==19.0')))
+
+    def test_match_no_default(self):
+        self.assertEqual(None, PlacementRules([('mock', 'test.txt')]).match(_package('nose')))
+
+    def test_parse_regex_with_hash(self):
+        rules = PlacementRules.parse('re:py#?test test.txt  # pytest only\n')
+
+        self.assertEqual('test.txt', rules.match(_package('pytest==4.0')))
+
+    def test_parse_invalid_line(self):
+        with self.assertRaises(RulesError) as context:
+            PlacementRules.parse('mock\n', 'rules.txt')
+        self.assertEqual("rules.txt:1: expected '<pattern> <filename>', got 'mock'",
+                         str(context.exception))
+
+    def test_parse_invalid_regex(self):
+        self.assertRaises(RulesError, PlacementRules.parse, 're:( test.txt\n')
+
+    def test_load(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir, True)
+        filename = os.path.join(tempdir, 'rules.txt')
+        with open(filename, 'w') as rules_file:
+            rules_file.write('mock test.txt\n')
+
+        self.assertEqual('test.txt', PlacementRules.load(filename).match(_package('mock')))
@@ -0,0 +1,69 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for a loaded CI runner; loading pkg_resources on a large virtualenv alone
+# used to take longer than this
+VERSION_BUDGET = 0.5
+LINT_BUDGET = 1.0
+
+_MAIN_SCRIPT = '''
+import sys
+from pipwrap import cli
+try:
+    cli.main()
+except SystemExit:
+    pass
+sys.stderr.write(repr(sorted(module for module in %r if module in sys.modules)))
+'''
+
+HEAVY_MODULES = ('pkg_resources', 'requirements', 'packaging', 'subprocess', 'multiprocessing')
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.project_dir = tempfile.mkdtemp()
+        self.site_packages = os.path.join(self.project_dir, 'site-packages')
+        os.makedirs(self.site_packages)
+        self.env = dict(os.environ, PYTHONPATH=REPO_DIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def _run(self, *args):
+        """ Run pipwrap in a new interpreter
+        :return: Tuple of (seconds taken beyond starting the interpreter, heavy modules loaded)
+        """
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', 'pass'], env=self.env)
+        baseline = time.time() - start
+
+        start = time.time()
+        process = subprocess.Popen([sys.executable, '-c', _MAIN_SCRIPT % (HEAVY_MODULES,)] +
+                                   list(args), cwd=self.project_dir, env=self.env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        stdout, stderr = process.communicate()
+        elapsed = time.time() - start
+        return elapsed - baseline, stderr.splitlines()[-1]
+
+    def test_version(self):
+        elapsed, modules = self._run('--version')
+
+        self.assertEqual('[]', modules)
+        self.assertTrue(elapsed < VERSION_BUDGET, 'pipwrap --version took %.3fs' % elapsed)
+
+    def test_lint_empty_project(self):
+        elapsed, modules = self._run('-l', '--no-cache', '--site-packages', self.site_packages)
+
+        self.assertFalse('pkg_resources' in modules)
+        self.assertFalse('requirements' in modules)
+        self.assertTrue(elapsed < LINT_BUDGET, 'pipwrap -l took %.3fs' % elapsed)
@@ -0,0 +1,32 @@
+import unittest
+
+from pipwrap.versions import VersionChecker
+
+
+class TestVersionChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.checker = VersionChecker()
+
+    def test_satisfies(self):
+        self.assertTrue(self.checker.satisfies('1.7.2', '>=1.7,<1.8'))
+        self.assertTrue(self.checker.satisfies('3.2.1', '==3.2.1'))
+        self.assertTrue(self.checker.satisfies('2.0rc1', '>=1.0'))
+
+    def test_not_satisfies(self):
+        self.assertFalse(self.checker.satisfies('3.2.18', '==3.2.1'))
+        self.assertFalse(self.checker.satisfies('1.8', '>=1.7,<1.8'))
+
+    def test_unparseable(self):
+        self.assertEqual(None, self.checker.satisfies('1.0', '=>1.0'))
+        self.assertEqual(None, self.checker.satisfies('not a version', '==1.0'))
+
+    def test_compiled_once(self):
+        self.checker.satisfies('1.0', '==1.0')
+        specifier = self.checker._specifiers['==1.0']
+        version = self.checker._versions['1.0']
+
+        self.checker.satisfies('1.0', '==1.0')
+
+        self.assertTrue(specifier is self.checker._specifiers['==1.0'])
+        self.assertTrue(version is self.checker._versions['1.0'])
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap.watch import WatchedEnvironment
+from .test_discovery import create_dist_info
+
+
+class TestWatchedEnvironment(unittest.TestCase):
+
+    def setUp(self):
+        self.requirements_dir = tempfile.mkdtemp()
+        self.site_packages = tempfile.mkdtemp()
+        self.environment = WatchedEnvironment(self.requirements_dir, [self.site_packages])
+        create_dist_info(self.site_packages, 'mock', '1.2')
+        self._write_requirements('packages.txt', 'mock==1.2\n')
+        self.assertTrue(self.environment.poll())
+
+    def tearDown(self):
+        shutil.rmtree(self.requirements_dir, ignore_errors=True)
+        shutil.rmtree(self.site_packages, ignore_errors=True)
+
+    def _write_requirements(self, filename, content):
+        with open(os.path.join(self.requirements_dir, filename), 'w') as requirements_file:
+            requirements_file.write(content)
+
+    def _installed_lines(self):
+        return sorted(package.line for package in self.environment.installed_index.packages)
+
+    def test_initial_poll(self):
+        self.assertEqual(['packages.txt'], list(self.environment.req_files))
+        self.assertEqual(['mock==1.2'], self._installed_lines())
+
+    def test_poll_unchanged(self):
+        with patch('pipwrap.watch.get_distribution_line') as mock_get_line:
+            with patch('pipwrap.watch.read_requirements_file') as mock_read:
+                self.assertFalse(self.environment.poll())
+        self.assertFalse(mock_get_line.called)
+        self.assertFalse(mock_read.called)
+
+    def test_poll_install_and_uninstall(self):
+        dist_info = create_dist_info(self.site_packages, 'nose', '1.3')
+        os.utime(self.site_packages, (0, 0))
+
+        with patch('pipwrap.watch.get_distribution_line',
+                   return_value=('nose', 'nose==1.3')) as mock_get_line:
+            self.assertTrue(self.environment.poll())
+        mock_get_line.assert_called_once_with(self.site_packages, os.path.basename(dist_info))
+        self.assertEqual(['mock==1.2', 'nose==1.3'], self._installed_lines())
+
+        shutil.rmtree(dist_info)
+        os.utime(self.site_packages, (1, 1))
+
+        self.assertTrue(self.environment.poll())
+        self.assertEqual(['mock==1.2'], self._installed_lines())
+
+    def test_poll_requirements_changed(self):
+        unchanged = self.environment.req_files['packages.txt']
+        self._write_requirements('test.txt', 'nose\n')
+
+        self.assertTrue(self.environment.poll())
+
+        self.assertTrue(unchanged is self.environment.req_files['packages.txt'])
+        self.assertEqual(['nose'], [package.line for package in
+                                    self.environment.req_files['test.txt'].packages])
+
+        os.remove(os.path.join(self.requirements_dir, 'test.txt'))
+
+        self.assertTrue(self.environment.poll())
+        self.assertEqual(['packages.txt'], list(self.environment.req_files))
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import cache, wheelhouse
+
+
+def create_wheels(directory, filenames):
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    for filename in filenames:
+        open(os.path.join(directory, filename), 'w').close()
+
+
+class TestGetSupportedTags(unittest.TestCase):
+
+    def test_get_supported_tags(self):
+        tags = wheelhouse.get_supported_tags()
+
+        self.assertIn('py3-none-any', tags)
+
+    @patch('subprocess.check_output')
+    def test_get_supported_tags_target_interpreter(self, mock_check_output):
+        mock_check_output.return_value = '["cp37-cp37m-win_amd64", "py3-none-any"]\n'
+
+        tags = wheelhouse.get_supported_tags('/venv/bin/python')
+
+        self.assertEqual(['cp37-cp37m-win_amd64', 'py3-none-any'], tags)
+        self.assertEqual('/venv/bin/python', mock_check_output.call_args[0][0][0])
+
+
+class TestParseWheelFilename(unittest.TestCase):
+
+    def test_parse_wheel_filename(self):
+        self.assertEqual(('django', '1.7', ['py2-none-any', 'py3-none-any']),
+                         wheelhouse.parse_wheel_filename('Django-1.7-py2.py3-none-any.whl'))
+
+    def test_parse_wheel_filename_build_tag(self):
+        filename = 'numpy-1.16.0-1-cp37-cp37m-manylinux1_x86_64.manylinux2010_x86_64.whl'
+
+        self.assertEqual(('numpy', '1.16.0', ['cp37-cp37m-manylinux1_x86_64',
+                                              'cp37-cp37m-manylinux2010_x86_64']),
+                         wheelhouse.parse_wheel_filename(filename))
+
+    def test_parse_wheel_filename_not_a_wheel(self):
+        self.assertEqual(None, wheelhouse.parse_wheel_filename('Django-1.7.tar.gz'))
+        self.assertEqual(None, wheelhouse.parse_wheel_filename('Django-1.7.whl'))
+
+
+class TestWheelhouseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir, True)
+        self.directory = os.path.join(self.tempdir, 'wheelhouse')
+        create_wheels(self.directory, ['Django-1.7-py2.py3-none-any.whl', 'Django-1.7.tar.gz'])
+        create_wheels(os.path.join(self.directory, 'linux'),
+                      ['numpy-1.16.0-cp37-cp37m-manylinux1_x86_64.whl'])
+        self.cache = cache.Cache(os.path.join(self.tempdir, 'cache'), 'wheelhouse')
+
+    def test_from_directories(self):
+        index = wheelhouse.WheelhouseIndex.from_directories([self.directory])
+
+        self.assertEqual(2, len(index))
+        self.assertEqual([('1.7', 'Django-1.7-py2.py3-none-any.whl',
+                           ['py2-none-any', 'py3-none-any'])], index.find('django'))
+        self.assertEqual([], index.find('six'))
+
+    def test_from_directories_missing(self):
+        index = wheelhouse.WheelhouseIndex.from_directories(
+            [os.path.join(self.tempdir, 'missing')])
+
+        self.assertEqual(0, len(index))
+
+    def test_from_directories_cached(self):
+        wheelhouse.WheelhouseIndex.from_directories([self.directory], self.cache)
+
+        with patch('os.walk') as mock_walk:
+            index = wheelhouse.WheelhouseIndex.from_directories([self.directory], self.cache)
+
+        self.assertFalse(mock_walk.called)
+        self.assertEqual(['1.7'], [wheel[0] for wheel in index.find('Django')])
+
+    def test_from_directories_cache_invalidated(self):
+        wheelhouse.WheelhouseIndex.from_directories([self.directory], self.cache)
+        linux = os.path.join(self.directory, 'linux')
+        create_wheels(linux, ['numpy-1.17.0-cp37-cp37m-manylinux1_x86_64.whl'])
+        # Make sure the change is seen, however coarse the filesystem's timestamps
+        os.utime(linux, (os.stat(linux).st_atime, os.stat(linux).st_mtime + 10))
+
+        index = wheelhouse.WheelhouseIndex.from_directories([self.directory], self.cache)
+
+        self.assertEqual(['1.16.0', '1.17.0'], [wheel[0] for wheel in index.find('numpy')])
@@ -0,0 +1,56 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from mock import patch
+
+from pipwrap import writing
+
+
+class TestWriteAtomic(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'common.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _read(self):
+        with open(self.filename) as written_file:
+            return written_file.read()
+
+    def test_write_new_file(self):
+        self.assertTrue(writing.write_atomic(self.filename, u'mock==1.2\n'))
+
+        self.assertEqual('mock==1.2\n', self._read())
+        self.assertEqual(['common.txt'], os.listdir(self.tempdir))
+
+    def test_write_unchanged(self):
+        writing.write_atomic(self.filename, u'mock==1.2\n')
+        os.utime(self.filename, (0, 0))
+
+        self.assertFalse(writing.write_atomic(self.filename, u'mock==1.2\n'))
+
+        self.assertEqual(0, os.path.getmtime(self.filename))
+
+    def test_write_changed_keeps_mode(self):
+        writing.write_atomic(self.filename, u'mock==1.2\n')
+        os.chmod(self.filename, 0o640)
+
+        self.assertTrue(writing.write_atomic(self.filename, u'mock==1.3\n'))
+
+        self.assertEqual('mock==1.3\n', self._read())
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.filename).st_mode))
+
+    def test_write_failure_leaves_original(self):
+        writing.write_atomic(self.filename, u'mock==1.2\n')
+
+        with patch('pipwrap.writing._replace') as mock_replace:
+            mock_replace.side_effect = OSError()
+            self.assertRaises(OSError, writing.write_atomic, self.filename, u'mock==1.3\n')
+
+        self.assertEqual('mock==1.2\n', self._read())
+        self.assertEqual(['common.txt'], os.listdir(self.tempdir))